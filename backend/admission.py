@@ -0,0 +1,229 @@
+"""
+Control de admisión
+Autenticación opcional por API key, límite de tasa por cliente (token bucket)
+y tope global de trabajo de inferencia en curso con una espera corta y acotada.
+El costo de una request es la cantidad de videos que procesa, así una
+secuencia de N videos consume N tokens y N unidades de capacidad.
+"""
+
+import asyncio
+import hmac
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, List, Optional
+
+
+class LimiteExcedidoError(Exception):
+    """La request no se admite ahora; el cliente puede reintentar en retry_after segundos"""
+
+    def __init__(self, mensaje: str, retry_after: int, motivo: str):
+        super().__init__(mensaje)
+        self.retry_after = max(1, retry_after)
+        self.motivo = motivo
+
+
+class CubetaTokens:
+    """Token bucket: hasta capacidad tokens, repuestos a tasa tokens por segundo"""
+
+    def __init__(self, capacidad: float, tasa: float):
+        self.capacidad = capacidad
+        self.tasa = tasa
+        self.tokens = capacidad
+        self.actualizado = time.monotonic()
+
+    def consumir(self, costo: float) -> float:
+        """
+        Descuenta costo tokens; si no alcanzan no descuenta y retorna los segundos a esperar
+        Un costo mayor que la capacidad pasa con la cubeta llena y la deja en deuda,
+        así se paga completo como si se hubiera enviado de a partes
+        """
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.actualizado) * self.tasa)
+        self.actualizado = ahora
+        necesarios = min(costo, self.capacidad)
+        if self.tokens >= necesarios:
+            self.tokens -= costo
+            return 0.0
+        return (necesarios - self.tokens) / self.tasa
+
+
+class LimitadorClientes:
+    """
+    Una cubeta por cliente (API key o IP) con por_minuto tokens por minuto y
+    ráfagas de hasta rafaga tokens. Se recuerdan los max_clientes más recientes
+    (una cubeta olvidada vuelve llena, como un cliente nuevo)
+    """
+
+    def __init__(self, por_minuto: int, rafaga: int, max_clientes: int = 10000):
+        self.tasa = por_minuto / 60.0
+        self.rafaga = max(1, rafaga)
+        self.max_clientes = max_clientes
+        self._cubetas: "OrderedDict[str, CubetaTokens]" = OrderedDict()
+        self.rechazadas = 0
+
+    def consumir(self, cliente: str, costo: int = 1):
+        """Lanza LimiteExcedidoError si el cliente no tiene tokens para costo"""
+        cubeta = self._cubetas.get(cliente)
+        if cubeta is None:
+            cubeta = self._cubetas[cliente] = CubetaTokens(self.rafaga, self.tasa)
+            if len(self._cubetas) > self.max_clientes:
+                self._cubetas.popitem(last=False)
+        else:
+            self._cubetas.move_to_end(cliente)
+
+        espera = cubeta.consumir(costo)
+        if espera > 0:
+            self.rechazadas += 1
+            raise LimiteExcedidoError(
+                f"Límite de {self.tasa * 60:g} videos por minuto excedido",
+                math.ceil(espera),
+                "tasa"
+            )
+
+    def estado(self) -> dict:
+        return {
+            "por_minuto": self.tasa * 60,
+            "rafaga": self.rafaga,
+            "clientes": len(self._cubetas),
+            "rechazadas": self.rechazadas,
+        }
+
+
+class ControlAdmision:
+    """
+    Tope de unidades de inferencia en curso (un video = una unidad)
+    Si no hay lugar, la request espera en orden de llegada hasta max_espera_s
+    en una cola de hasta max_cola requests; si no entra a tiempo se rechaza.
+    Solo se usa desde el event loop, por eso no necesita lock.
+    """
+
+    def __init__(self, max_unidades: int, max_espera_s: float, max_cola: int, retry_after: int):
+        self.max_unidades = max(1, max_unidades)
+        self.max_espera_s = max_espera_s
+        self.max_cola = max_cola
+        self.retry_after = retry_after
+        self.en_uso = 0
+        self._espera: Deque[List] = deque()
+        self.rechazadas = 0
+
+    @property
+    def esperando(self) -> int:
+        return sum(1 for _, futuro in self._espera if not futuro.done())
+
+    async def adquirir(self, costo: int = 1) -> int:
+        """
+        Reserva costo unidades (una request más grande que el tope reserva el tope)
+        Retorna las unidades reservadas, que hay que devolver con liberar()
+        """
+        unidades = max(1, min(costo, self.max_unidades))
+        if not self.esperando and self.en_uso + unidades <= self.max_unidades:
+            self.en_uso += unidades
+            return unidades
+
+        if self.max_espera_s <= 0 or self.esperando >= self.max_cola:
+            self._rechazar()
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._espera.append([unidades, futuro])
+        try:
+            await asyncio.wait_for(futuro, self.max_espera_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if futuro.done() and not futuro.cancelled():
+                # Se le asignó lugar justo al vencer la espera
+                self.liberar(unidades)
+            else:
+                self._despertar()
+            if isinstance(e, asyncio.TimeoutError):
+                self._rechazar()
+            raise
+        return unidades
+
+    def intentar(self, costo: int = 1) -> int:
+        """
+        Reserva sin esperar y solo si nadie está esperando (trabajo en segundo plano
+        que cede el lugar a las requests). Retorna las unidades reservadas o 0
+        """
+        unidades = max(1, min(costo, self.max_unidades))
+        if self.esperando or self.en_uso + unidades > self.max_unidades:
+            return 0
+        self.en_uso += unidades
+        return unidades
+
+    def liberar(self, unidades: int):
+        self.en_uso -= unidades
+        self._despertar()
+
+    @asynccontextmanager
+    async def admitir(self, costo: int = 1):
+        unidades = await self.adquirir(costo)
+        try:
+            yield
+        finally:
+            self.liberar(unidades)
+
+    @contextmanager
+    def admitir_sin_espera(self, costo: int = 1):
+        """
+        Como admitir pero sin esperar: para trabajo en tiempo real que prefiere
+        descartarse a encolarse (cede el lugar a las requests en espera)
+        """
+        unidades = self.intentar(costo)
+        if not unidades:
+            self._rechazar()
+        try:
+            yield
+        finally:
+            self.liberar(unidades)
+
+    def _despertar(self):
+        """Da lugar a las requests en espera, en orden, mientras entren"""
+        while self._espera:
+            unidades, futuro = self._espera[0]
+            if futuro.done():
+                self._espera.popleft()
+                continue
+            if self.en_uso + unidades > self.max_unidades:
+                break
+            self._espera.popleft()
+            self.en_uso += unidades
+            futuro.set_result(None)
+
+    def _rechazar(self):
+        self.rechazadas += 1
+        raise LimiteExcedidoError(
+            "Capacidad de inferencia completa, intente más tarde",
+            self.retry_after,
+            "capacidad"
+        )
+
+    def estado(self) -> dict:
+        return {
+            "max_unidades": self.max_unidades,
+            "en_uso": self.en_uso,
+            "esperando": self.esperando,
+            "rechazadas": self.rechazadas,
+        }
+
+
+def claves_validas(api_keys: str) -> List[str]:
+    """API_KEY admite varias claves separadas por coma (vacío = sin autenticación)"""
+    return [clave.strip() for clave in api_keys.split(",") if clave.strip()]
+
+
+def extraer_api_key(headers) -> Optional[str]:
+    """Clave del header X-API-Key o de Authorization: Bearer <clave>"""
+    clave = headers.get("x-api-key")
+    if clave:
+        return clave
+    autorizacion = headers.get("authorization", "")
+    if autorizacion.lower().startswith("bearer "):
+        return autorizacion[7:].strip()
+    return None
+
+
+def api_key_valida(clave: Optional[str], claves: List[str]) -> bool:
+    if clave is None:
+        return False
+    return any(hmac.compare_digest(clave.encode(), valida.encode()) for valida in claves)
@@ -5,38 +5,51 @@ Endpoints para clasificar videos y generar frases
 """
 
 import os
+import asyncio
+import hashlib
+import json
 
 # Usar la versión legacy de Keras para cargar modelos guardados en formato H5
 os.environ.setdefault("TF_USE_LEGACY_KERAS", "1")
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import tensorflow as tf
+from fastapi.requests import HTTPConnection
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 import numpy as np
-import cv2
-import mediapipe as mp
-import tempfile
-from typing import List
+from typing import List, Optional
 import pickle
-from transformers import T5Tokenizer, T5ForConditionalGeneration
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras.layers import InputLayer
-from tensorflow.keras.mixed_precision import Policy
-from tensorflow.keras.utils import custom_object_scope
 
-
-_original_inputlayer_from_config = InputLayer.from_config.__func__
-
-
-@classmethod
-def _accept_batch_shape(cls, config):
-    if "batch_shape" in config and "batch_input_shape" not in config:
-        config["batch_input_shape"] = config.pop("batch_shape")
-    return _original_inputlayer_from_config(cls, config)
-
-
-InputLayer.from_config = _accept_batch_shape
+from config import settings
+from executor import ColaSaturadaError, crear_ejecutor_hilos, crear_ejecutor_procesos
+from batching import AgrupadorLotes
+from cache import CacheLRU, CacheResultados, crear_cliente_redis
+from uploads import (
+    ArchivoSubido, LimiteTamanoMiddleware, UploadDemasiadoGrandeError, UploadInvalidoError,
+    es_multipart, esquema_multipart, recibir_archivos
+)
+from streaming import SesionStreaming
+from keypoints import (
+    extraer_keypoints_con_estadisticas, inicializar_worker, calentar_worker,
+    configurar_pool_hands, cerrar_pool_hands, version_extraccion
+)
+from modelos import RegistroModelos, ComponenteNoListoError
+from metrics import MetricasMiddleware, metricas
+from backends import (
+    ClasificadorKeras, cargar_modelo_keras, crear_backend_clasificador,
+    keypoints_validacion, medir_deriva, cuantizar_t5, cargar_t5_onnx, RUTA_T5_ONNX
+)
+from feature_store import AlmacenKeypoints
+from segmentacion import segmentar_video, unir_predicciones
+from admission import (
+    ControlAdmision, LimitadorClientes, LimiteExcedidoError,
+    api_key_valida, claves_validas, extraer_api_key
+)
+from jobs import (
+    AlmacenTrabajos, GestorTrabajos, OrigenInvalidoError, EXTENSIONES_VIDEO,
+    listar_videos, resolver_ruta, resumen as resumen_trabajo
+)
 
 app = FastAPI(
     title="LSC Interpreter API",
@@ -53,6 +66,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Rechazar bodies demasiado grandes antes de parsear el multipart
+app.add_middleware(
+    LimiteTamanoMiddleware,
+    max_bytes=settings.MAX_REQUEST_SIZE_MB * 1024 * 1024
+)
+
+# Requests en curso, duración por endpoint y header Server-Timing opcional
+app.add_middleware(
+    MetricasMiddleware,
+    metricas=metricas,
+    server_timing=settings.SERVER_TIMING_ENABLED
+)
+
+# Límite por archivo, aplicado mientras se copia el upload a disco
+MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
 # Variables globales para modelos
 modelo_clasificador = None
 labels_dict = None
@@ -62,117 +91,299 @@ mp_hands = None
 max_length = None
 num_features = None
 
+# Pool de hilos para el trabajo CPU (LSTM, T5)
+ejecutor_inferencia = None
 
-@app.on_event("startup")
-async def cargar_modelos():
-    """Cargar modelos al iniciar la aplicación"""
-    global modelo_clasificador, labels_dict, modelo_generativo, tokenizer, mp_hands, max_length, num_features
+# Pool de procesos para decodificación + MediaPipe (retienen el GIL)
+ejecutor_videos = None
+
+# Backend del LSTM (keras/tflite/onnx) y micro-batching entre requests
+backend_clasificador = None
+agrupador_clasificador = None
+
+# Backend de T5 (pytorch/int8/onnx)
+backend_t5 = None
+
+# Cache de keypoints y predicciones por hash del video subido
+cache_resultados = None
+
+# Cache de frases generadas por T5 (clave: glosas normalizadas + parámetros)
+cache_frases = CacheLRU(settings.T5_CACHE_SIZE, settings.T5_CACHE_TTL_SECONDS)
+
+# Perfiles de decodificación de T5 (el largo máximo se calcula por cantidad de glosas)
+PERFILES_T5 = {
+    "rapido": {
+        "num_beams": 1,
+        "no_repeat_ngram_size": 2,
+    },
+    "equilibrado": {
+        "num_beams": 2,
+        "early_stopping": True,
+        "no_repeat_ngram_size": 2,
+    },
+    "calidad": {
+        "num_beams": 4,
+        "early_stopping": True,
+        "no_repeat_ngram_size": 2,
+    },
+}
+
+# Micro-batching de T5 entre requests de /predict-sequence
+agrupador_t5 = None
+
+# Trabajos por lotes (/jobs) con estado en SQLite
+gestor_trabajos = None
+
+# Keypoints extraídos persistidos para re-evaluar modelos (FEATURE_STORE_DIR)
+almacen_keypoints = None
+
+# Control de admisión: claves válidas, límite por cliente y tope de videos en proceso
+API_KEYS = claves_validas(settings.API_KEY)
+limitador_clientes = None
+control_admision = None
+
+
+def cargar_clasificador():
+    """LSTM, labels, configuración, forward pass compilado y cache de resultados"""
+    global modelo_clasificador, labels_dict, max_length, num_features
+    global backend_clasificador, cache_resultados
     
-    try:
-        print("🔄 Cargando modelos...")
-        
-        # Cargar modelo LSTM
-        with custom_object_scope({"DTypePolicy": Policy}):
-            modelo_clasificador = tf.keras.models.load_model(
-                'models/mejor_modelo_lsc.h5', compile=False
+    # Cargar modelo LSTM (TensorFlow se importa recién aquí)
+    modelo = cargar_modelo_keras('models/mejor_modelo_lsc.h5')
+    with open('models/mejor_modelo_lsc.h5', 'rb') as f:
+        version_modelo = hashlib.sha256(f.read()).hexdigest()[:12]
+    print(f"   ✓ Modelo LSTM cargado (versión {version_modelo})")
+    
+    # Cargar diccionario de labels
+    with open('models/labels_dict.pkl', 'rb') as f:
+        labels = pickle.load(f)
+    print(f"   ✓ Labels cargados ({len(labels)} palabras)")
+    
+    # Cargar configuración
+    with open('models/config.pkl', 'rb') as f:
+        config = pickle.load(f)
+    print(f"   ✓ Configuración cargada (max_length={config['max_length']}, features={config['num_features']})")
+    
+    # Forward pass compilado con batch variable (evita el overhead de predict())
+    forma = (config['max_length'], config['num_features'])
+    backend = referencia = ClasificadorKeras(modelo, *forma)
+    
+    # Backend optimizado (TFLite/ONNX) solo si no se aparta de Keras
+    if settings.CLASSIFIER_BACKEND != "keras":
+        try:
+            candidato = crear_backend_clasificador(
+                settings.CLASSIFIER_BACKEND, modelo, *forma, settings.CLASSIFIER_THREADS
             )
-        print("   ✓ Modelo LSTM cargado")
-        
-        # Cargar diccionario de labels
-        with open('models/labels_dict.pkl', 'rb') as f:
-            labels_dict = pickle.load(f)
-        print(f"   ✓ Labels cargados ({len(labels_dict)} palabras)")
-        
-        # Cargar configuración
-        with open('models/config.pkl', 'rb') as f:
-            config = pickle.load(f)
-            max_length = config['max_length']
-            num_features = config['num_features']
-        print(f"   ✓ Configuración cargada (max_length={max_length}, features={num_features})")
-        
-        # Cargar modelo generativo T5
+            deriva = medir_deriva(referencia, candidato, keypoints_validacion(*forma))
+            if deriva["max_diferencia"] > settings.CLASSIFIER_MAX_DRIFT:
+                raise ValueError(
+                    f"deriva {deriva['max_diferencia']:.4f} > {settings.CLASSIFIER_MAX_DRIFT}"
+                )
+            backend = candidato
+            print(
+                f"   ✓ Backend {backend.nombre} (deriva máx {deriva['max_diferencia']:.4f}, "
+                f"acuerdo top-1 {deriva['acuerdo_top1']:.1%})"
+            )
+        except Exception as e:
+            print(f"⚠️  Backend {settings.CLASSIFIER_BACKEND} descartado, se usa keras: {e}")
+    backend(np.zeros((1, *forma), dtype=np.float32))
+    # Las predicciones cacheadas dependen también del backend
+    version_modelo = f"{version_modelo}-{backend.nombre}"
+    
+    # Cache de resultados (LRU local + Redis opcional)
+    redis_cliente = None
+    if settings.REDIS_ENABLED:
+        redis_cliente = crear_cliente_redis(
+            settings.REDIS_HOST, settings.REDIS_PORT, settings.REDIS_DB
+        )
+    cache = CacheResultados(
+        max_items=settings.RESULT_CACHE_SIZE,
+        ttl_segundos=settings.CACHE_TTL_SECONDS,
+        version_extraccion=version_extraccion(),
+        version_modelo=version_modelo,
+        redis_cliente=redis_cliente
+    )
+    
+    # Publicar todo junto cuando ya está listo para usarse
+    labels_dict = labels
+    max_length = config['max_length']
+    num_features = config['num_features']
+    backend_clasificador = backend
+    cache_resultados = cache
+    modelo_clasificador = modelo
+
+
+def cargar_t5():
+    """Tokenizer y modelo generativo T5 (fallback a t5-small)"""
+    global modelo_generativo, tokenizer, backend_t5
+    
+    from transformers import T5Tokenizer, T5ForConditionalGeneration
+    
+    modelo = None
+    if settings.T5_BACKEND == "onnx":
+        try:
+            modelo = cargar_t5_onnx()
+            tok = T5Tokenizer.from_pretrained(RUTA_T5_ONNX)
+            backend = "onnx"
+            print("   ✓ Modelo T5 ONNX cargado")
+        except Exception as e:
+            print(f"⚠️  T5 ONNX no disponible, se usa pytorch: {e}")
+    
+    if modelo is None:
         try:
-            tokenizer = T5Tokenizer.from_pretrained("models/t5-lsc-finetuned")
-            modelo_generativo = T5ForConditionalGeneration.from_pretrained("models/t5-lsc-finetuned")
+            tok = T5Tokenizer.from_pretrained("models/t5-lsc-finetuned")
+            modelo = T5ForConditionalGeneration.from_pretrained("models/t5-lsc-finetuned")
             print("   ✓ Modelo T5 fine-tuneado cargado")
         except:
             # Fallback a modelo base si no existe el fine-tuneado
-            tokenizer = T5Tokenizer.from_pretrained("t5-small")
-            modelo_generativo = T5ForConditionalGeneration.from_pretrained("t5-small")
+            tok = T5Tokenizer.from_pretrained("t5-small")
+            modelo = T5ForConditionalGeneration.from_pretrained("t5-small")
             print("   ⚠️  Usando T5 base (no fine-tuneado)")
+        backend = "pytorch"
         
-        # Inicializar MediaPipe
-        mp_hands = mp.solutions.hands
-        print("   ✓ MediaPipe inicializado")
-        
-        print("✅ Todos los modelos cargados exitosamente\n")
-        
-    except Exception as e:
-        print(f"❌ Error cargando modelos: {e}")
-        raise
+        if settings.T5_BACKEND == "int8":
+            modelo = cuantizar_t5(modelo)
+            backend = "int8"
+            print("   ✓ T5 cuantizado a int8 (capas Linear)")
+    
+    tokenizer = tok
+    backend_t5 = backend
+    modelo_generativo = modelo
+
+
+async def inicializar_mediapipe():
+    """Hands pre-calentados en este proceso o arranque de los procesos worker"""
+    global mp_hands
+    
+    if ejecutor_videos is ejecutor_inferencia:
+        await asyncio.to_thread(configurar_pool_hands, settings.HANDS_POOL_SIZE)
+        print(f"   ✓ MediaPipe inicializado ({settings.HANDS_POOL_SIZE} instancias Hands)")
+    else:
+        await asyncio.gather(*[
+            ejecutor_videos.ejecutar(calentar_worker)
+            for _ in range(ejecutor_videos.max_workers)
+        ])
+        print(f"   ✓ MediaPipe inicializado ({ejecutor_videos.max_workers} procesos)")
+    
+    import mediapipe as mp
+    mp_hands = mp.solutions.hands
+
 
+# Componentes que se cargan en paralelo al iniciar
+registro_modelos = RegistroModelos()
+registro_modelos.registrar("clasificador", cargar_clasificador)
+registro_modelos.registrar("t5", cargar_t5)
+registro_modelos.registrar("mediapipe", inicializar_mediapipe)
 
-def extraer_keypoints_video(video_path: str) -> np.ndarray:
+# Sin estos no se puede predecir; sin T5 /predict-sequence une las glosas
+COMPONENTES_ESENCIALES = ("clasificador", "mediapipe")
+
+# Con gunicorn --preload (gunicorn.conf.py) T5 se carga una sola vez en el master
+# y los workers comparten sus pesos copy-on-write. El clasificador y MediaPipe se
+# cargan en cada worker: TensorFlow y MediaPipe no son seguros ante fork.
+if settings.PRELOAD_MODELS:
+    registro_modelos.precargar("t5")
+
+
+@app.on_event("startup")
+async def cargar_modelos():
     """
-    Extrae keypoints de manos desde un video usando MediaPipe
-    Retorna array de shape (30, 126)
+    Crear los pools y lanzar la carga de modelos en segundo plano
+    /predict atiende apenas están el clasificador y MediaPipe, aunque T5 siga cargando
     """
-    hands = mp_hands.Hands(
-        static_image_mode=False,
-        max_num_hands=2,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
+    global ejecutor_inferencia, ejecutor_videos, agrupador_clasificador, agrupador_t5
+    global gestor_trabajos, almacen_keypoints, limitador_clientes, control_admision
+    
+    ejecutor_inferencia = crear_ejecutor_hilos(
+        settings.INFERENCE_THREADS,
+        settings.INFERENCE_QUEUE_SIZE,
+        retry_after=settings.INFERENCE_RETRY_AFTER_SECONDS
     )
+    if settings.VIDEO_PROCESS_WORKERS > 0:
+        ejecutor_videos = crear_ejecutor_procesos(
+            settings.VIDEO_PROCESS_WORKERS,
+            settings.VIDEO_PROCESS_QUEUE_SIZE,
+            retry_after=settings.INFERENCE_RETRY_AFTER_SECONDS,
+            initializer=inicializar_worker
+        )
+    else:
+        ejecutor_videos = ejecutor_inferencia
     
-    cap = cv2.VideoCapture(video_path)
-    keypoints_sequence = []
+    control_admision = ControlAdmision(
+        settings.ADMISSION_MAX_UNITS or ejecutor_videos.capacidad,
+        settings.ADMISSION_MAX_WAIT_MS / 1000.0,
+        settings.ADMISSION_QUEUE_SIZE,
+        retry_after=settings.INFERENCE_RETRY_AFTER_SECONDS
+    )
+    if settings.RATE_LIMIT_ENABLED:
+        limitador_clientes = LimitadorClientes(
+            settings.RATE_LIMIT_PER_MINUTE, settings.RATE_LIMIT_BURST
+        )
     
-    frame_count = 0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    agrupador_clasificador = AgrupadorLotes(
+        procesar_lote=predecir_palabras_lote,
+        ejecutor=ejecutor_inferencia,
+        max_lote=settings.BATCH_MAX_SIZE,
+        max_espera_ms=settings.BATCH_MAX_WAIT_MS,
+        nombre="clasificador"
+    )
+    agrupador_clasificador.iniciar()
     
-    # Calcular intervalo para samplear 30 frames
-    frame_interval = max(1, total_frames // 30) if total_frames > 30 else 1
+    agrupador_t5 = AgrupadorLotes(
+        procesar_lote=generar_frases_lote,
+        ejecutor=ejecutor_inferencia,
+        max_lote=settings.T5_BATCH_MAX_SIZE,
+        max_espera_ms=settings.T5_BATCH_MAX_WAIT_MS,
+        nombre="t5"
+    )
+    agrupador_t5.iniciar()
     
-    while cap.isOpened() and len(keypoints_sequence) < 30:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Solo procesar frames en el intervalo
-        if frame_count % frame_interval == 0:
-            # Convertir BGR a RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(frame_rgb)
-            
-            frame_keypoints = []
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    for landmark in hand_landmarks.landmark:
-                        frame_keypoints.extend([landmark.x, landmark.y, landmark.z])
-            
-            # Normalizar a exactamente 126 valores (21 * 3 * 2)
-            expected_size = 126
-            if len(frame_keypoints) == 0:
-                frame_keypoints = [0.0] * expected_size
-            elif len(frame_keypoints) < expected_size:
-                frame_keypoints.extend([0.0] * (expected_size - len(frame_keypoints)))
-            elif len(frame_keypoints) > expected_size:
-                frame_keypoints = frame_keypoints[:expected_size]
-            
-            keypoints_sequence.append(frame_keypoints)
-        
-        frame_count += 1
+    if settings.FEATURE_STORE_DIR:
+        almacen_keypoints = AlmacenKeypoints(
+            settings.FEATURE_STORE_DIR, settings.FEATURE_STORE_SHARD_SIZE
+        )
     
-    cap.release()
-    hands.close()
+    # Los trabajos pendientes (incluso de una ejecución anterior) arrancan con el clasificador
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    gestor_trabajos = GestorTrabajos(
+        AlmacenTrabajos(os.path.join(settings.JOBS_DIR, "trabajos.db")),
+        str(settings.JOBS_DIR),
+        clasificar=clasificar_lote_trabajo,
+        procesos=settings.JOBS_WORKERS,
+        tamano_lote=settings.JOBS_BATCH_SIZE,
+        intervalo_sondeo=settings.JOBS_POLL_SECONDS,
+        persistir=persistir_keypoints if almacen_keypoints is not None else None,
+        admision=control_admision
+    )
+    gestor_trabajos.iniciar(esperar=lambda: registro_modelos.esperar("clasificador"))
     
-    # Padding si es necesario
-    if len(keypoints_sequence) < 30:
-        padding = keypoints_sequence[-1] if len(keypoints_sequence) > 0 else [0.0] * 126
-        while len(keypoints_sequence) < 30:
-            keypoints_sequence.append(padding)
+    print("🔄 Cargando modelos en segundo plano...")
+    registro_modelos.iniciar()
     
-    return np.array(keypoints_sequence, dtype=np.float32)
+    if settings.MODELS_BLOCKING_STARTUP:
+        await registro_modelos.esperar()
+
+
+@app.on_event("shutdown")
+async def liberar_recursos():
+    """Detener el pool de inferencia al apagar la aplicación"""
+    await registro_modelos.detener()
+    if gestor_trabajos is not None:
+        await gestor_trabajos.detener()
+        gestor_trabajos.almacen.cerrar()
+    if almacen_keypoints is not None:
+        almacen_keypoints.cerrar()
+    if agrupador_clasificador is not None:
+        await agrupador_clasificador.detener()
+    if agrupador_t5 is not None:
+        await agrupador_t5.detener()
+    if ejecutor_videos is not None and ejecutor_videos is not ejecutor_inferencia:
+        ejecutor_videos.cerrar(wait=False)
+    if ejecutor_inferencia is not None:
+        ejecutor_inferencia.cerrar(wait=False)
+    cerrar_pool_hands()
+    if cache_resultados is not None and cache_resultados.redis is not None:
+        await cache_resultados.redis.close()
 
 
 def predecir_palabra(keypoints_seq: np.ndarray) -> tuple:
@@ -184,43 +395,502 @@ def predecir_palabra(keypoints_seq: np.ndarray) -> tuple:
     if keypoints_seq.shape != (30, 126):
         raise ValueError(f"Shape incorrecto: {keypoints_seq.shape}, esperado (30, 126)")
     
-    # Expandir dimensión de batch
-    keypoints_batch = np.expand_dims(keypoints_seq, axis=0)
+    return predecir_palabras_lote([keypoints_seq])[0]
+
+
+def clasificar_lote(keypoints_batch: np.ndarray) -> np.ndarray:
+    """
+    Forward pass del LSTM sobre un batch (N, 30, 126)
+    Retorna las probabilidades (N, num_clases)
+    """
+    return backend_clasificador(keypoints_batch)
+
+
+def predecir_palabras_lote(secuencias: List[np.ndarray]) -> List[tuple]:
+    """
+    Predice varias secuencias en un solo forward pass
+    Retorna una lista de (palabra, confianza) en el mismo orden
+    """
+    prediccion = clasificar_lote(np.stack(secuencias).astype(np.float32, copy=False))
+    clases = np.argmax(prediccion, axis=1)
+    confianzas = np.max(prediccion, axis=1)
     
-    # Predecir
-    prediccion = modelo_clasificador.predict(keypoints_batch, verbose=0)
-    clase_predicha = np.argmax(prediccion, axis=1)[0]
-    confianza = float(np.max(prediccion))
-    palabra = labels_dict[clase_predicha]
+    return [
+        (labels_dict[int(clase)], float(confianza))
+        for clase, confianza in zip(clases, confianzas)
+    ]
+
+
+async def clasificar_lote_trabajo(secuencias: List[np.ndarray]) -> List[tuple]:
+    """Lote de un trabajo de /jobs en un solo forward pass en el pool de inferencia"""
+    if not registro_modelos.listo("clasificador"):
+        raise RuntimeError("Clasificador no disponible")
+    with metricas.cronometrar("lstm"):
+        return await ejecutor_inferencia.ejecutar(predecir_palabras_lote, secuencias)
+
+
+async def predecir_palabra_async(keypoints_seq: np.ndarray) -> tuple:
+    """
+    Igual que predecir_palabra pero agrupando con otras requests concurrentes
+    """
+    if keypoints_seq.shape != (30, 126):
+        raise ValueError(f"Shape incorrecto: {keypoints_seq.shape}, esperado (30, 126)")
     
-    return palabra, confianza
+    with metricas.cronometrar("lstm"):
+        return await agrupador_clasificador.enviar(keypoints_seq)
+
+
+def tokens_maximos(num_glosas: int) -> int:
+    """Largo máximo de la frase proporcional a la cantidad de glosas"""
+    return min(
+        settings.T5_MAX_NEW_TOKENS,
+        settings.T5_TOKENS_BASE + settings.T5_TOKENS_POR_GLOSA * num_glosas
+    )
 
 
-def generar_frase(palabras: List[str]) -> str:
+def generar_frases_lote(elementos: List[tuple]) -> List[str]:
+    """
+    Genera varias frases con T5 en un solo generate() por perfil
+    elementos: lista de (glosas normalizadas, perfil); retorna las frases en orden
+    """
+    frases = [""] * len(elementos)
+    por_perfil = {}
+    for i, (glosas, perfil) in enumerate(elementos):
+        if glosas:
+            por_perfil.setdefault(perfil, []).append(i)
+    
+    for perfil, indices in por_perfil.items():
+        glosas = [elementos[i][0] for i in indices]
+        
+        # Tokenizar (con padding al más largo del lote)
+        inputs = tokenizer(
+            [f"translate gloss to text: {g}" for g in glosas],
+            return_tensors="pt", padding=True, max_length=512, truncation=True
+        )
+        
+        # Generar
+        outputs = modelo_generativo.generate(
+            inputs.input_ids,
+            attention_mask=inputs.attention_mask,
+            max_new_tokens=max(tokens_maximos(len(g.split())) for g in glosas),
+            **PERFILES_T5[perfil]
+        )
+        
+        for i, salida in zip(indices, outputs):
+            frases[i] = tokenizer.decode(salida, skip_special_tokens=True)
+    
+    return frases
+
+
+def generar_frase(palabras: List[str], perfil: str = None) -> str:
     """
     Genera una frase coherente a partir de glosas usando T5
     """
-    if not palabras:
-        return ""
+    return generar_frases_lote([(normalizar_glosas(palabras), perfil or settings.T5_PROFILE)])[0]
+
+
+def normalizar_glosas(palabras: List[str]) -> str:
+    """Glosas en mayúsculas separadas por un solo espacio"""
+    return ' '.join(p.strip().upper() for p in palabras if p.strip())
+
+
+async def _generar_y_cachear(clave: tuple, glosas: str, perfil: str) -> str:
+    frase = await agrupador_t5.enviar((glosas, perfil))
+    cache_frases.guardar(clave, frase)
+    return frase
+
+
+async def generar_frase_async(
+    palabras: List[str],
+    perfil: str = None,
+    presupuesto_ms: float = None
+) -> Optional[str]:
+    """
+    generar_frase con memoización y micro-batching: las secuencias de glosas
+    repetidas se responden desde cache_frases sin ejecutar beam search
     
-    # Convertir a mayúsculas y unir
-    glosas = ' '.join([p.upper() for p in palabras])
-    input_text = f"translate gloss to text: {glosas}"
+    Retorna None si la frase no estuvo lista dentro de presupuesto_ms; la
+    generación sigue en segundo plano y queda en cache para la próxima vez
+    """
+    perfil = perfil or settings.T5_PROFILE
+    glosas = normalizar_glosas(palabras)
+    clave = (glosas, perfil, tuple(sorted(PERFILES_T5[perfil].items())))
+    frase = cache_frases.obtener(clave)
+    metricas.contar_cache("frases", "hit" if frase is not None else "miss")
+    if frase is not None:
+        return frase
     
-    # Tokenizar
-    inputs = tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
+    tarea = asyncio.ensure_future(_generar_y_cachear(clave, glosas, perfil))
+    if presupuesto_ms is None:
+        presupuesto_ms = settings.T5_LATENCY_BUDGET_MS
+    with metricas.cronometrar("t5"):
+        if presupuesto_ms <= 0:
+            return await tarea
+        try:
+            return await asyncio.wait_for(asyncio.shield(tarea), presupuesto_ms / 1000.0)
+        except asyncio.TimeoutError:
+            # Nadie espera ya la tarea: su error se registra aquí en vez de perderse
+            tarea.add_done_callback(registrar_error_frase)
+            return None
+
+
+def registrar_error_frase(tarea: asyncio.Future):
+    """Consume el error de una generación de T5 que siguió después del presupuesto"""
+    if not tarea.cancelled() and tarea.exception() is not None:
+        print(f"Error generando frase con T5 en segundo plano: {tarea.exception()}")
+
+
+async def persistir_keypoints(
+    digest: str,
+    keypoints: np.ndarray,
+    prediccion: tuple,
+    archivo: Optional[str] = None,
+    origen: str = "jobs"
+):
+    """
+    Guarda unos keypoints recién extraídos en el almacén (si FEATURE_STORE_DIR está activo)
+    La escritura del shard y del índice corre en un hilo, fuera del event loop
+    """
+    if almacen_keypoints is None or digest is None:
+        return
+    try:
+        await asyncio.to_thread(
+            almacen_keypoints.guardar, digest, cache_resultados.version_extraccion, keypoints, {
+                "archivo": archivo,
+                "origen": origen,
+                "modelo": cache_resultados.version_modelo,
+                "palabra": prediccion[0],
+                "confianza": float(prediccion[1]),
+            }
+        )
+    except Exception as e:
+        print(f"⚠️  No se pudieron guardar los keypoints de {digest[:12]}: {e}")
+
+
+async def procesar_video(video_path: str, digest: str = None, archivo: str = None) -> tuple:
+    """
+    Pipeline completo de un video: extracción en el pool de videos
+    y clasificación a través del micro-batcher
+    Con digest (sha256 del archivo) se consulta la cache antes de decodificar
+    y los keypoints nuevos se guardan en el almacén de keypoints
+    Retorna (keypoints, palabra, confianza); palabra es None si no hay keypoints
+    """
+    keypoints, prediccion = None, None
+    if digest is not None:
+        keypoints, prediccion = await cache_resultados.obtener(digest)
+        if prediccion is not None:
+            metricas.contar_cache("resultados", "hit")
+            return keypoints, prediccion[0], prediccion[1]
+        metricas.contar_cache("resultados", "hit_keypoints" if keypoints is not None else "miss")
     
-    # Generar
-    outputs = modelo_generativo.generate(
-        inputs.input_ids,
-        max_length=50,
-        num_beams=4,
-        early_stopping=True,
-        no_repeat_ngram_size=2
-    )
+    extraidos = keypoints is None
+    if extraidos:
+        with metricas.cronometrar("extraccion"):
+            keypoints, estadisticas = await ejecutor_videos.ejecutar(
+                extraer_keypoints_con_estadisticas, video_path
+            )
+        metricas.observar_extraccion(estadisticas)
+    if len(keypoints) == 0:
+        return keypoints, None, 0.0
     
-    frase = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    return frase
+    palabra, confianza = await predecir_palabra_async(keypoints)
+    if digest is not None:
+        await cache_resultados.guardar(digest, keypoints, (palabra, confianza))
+        if extraidos:
+            await persistir_keypoints(digest, keypoints, (palabra, confianza), archivo, "predict")
+    return keypoints, palabra, confianza
+
+
+async def procesar_video_secuencia(
+    posicion: int,
+    archivo: str,
+    video_path: str,
+    umbral_confianza: float,
+    digest: str = None
+) -> dict:
+    """
+    Procesa un video de /predict-sequence y retorna su entrada de "detalles"
+    Los errores del video quedan en el detalle; la saturación se propaga
+    """
+    try:
+        _, palabra, confianza = await procesar_video(video_path, digest, archivo)
+    except ColaSaturadaError:
+        raise
+    except Exception as e:
+        return {"posicion": posicion, "archivo": archivo, "error": str(e)}
+    
+    if palabra is None:
+        return {
+            "posicion": posicion,
+            "archivo": archivo,
+            "error": "No se detectaron keypoints"
+        }
+    
+    return {
+        "posicion": posicion,
+        "archivo": archivo,
+        "palabra": palabra,
+        "confianza": float(confianza),
+        "aceptada": confianza >= umbral_confianza
+    }
+
+
+def crear_tareas_secuencia(
+    archivos: List[str],
+    tmp_paths: List[str],
+    digests: List[str],
+    umbral_confianza: float,
+    concurrencia: int
+) -> List[asyncio.Task]:
+    """
+    Una tarea por video de /predict-sequence, con a lo sumo concurrencia videos
+    en el pool a la vez (las unidades de capacidad reservadas para la request)
+    """
+    semaforo = asyncio.Semaphore(max(1, concurrencia))
+    
+    async def procesar(posicion: int, archivo: str, tmp_path: str, digest: str) -> dict:
+        async with semaforo:
+            return await procesar_video_secuencia(posicion, archivo, tmp_path, umbral_confianza, digest)
+    
+    return [
+        asyncio.ensure_future(procesar(idx + 1, archivo, tmp_path, digest))
+        for idx, (archivo, tmp_path, digest) in enumerate(zip(archivos, tmp_paths, digests))
+    ]
+
+
+async def cancelar_tareas(tareas: List[asyncio.Task]):
+    """Cancela las tareas pendientes y espera a que terminen antes de borrar sus temporales"""
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+
+
+async def componer_frase(
+    palabras: List[str],
+    perfil: Optional[str],
+    presupuesto_ms: Optional[float]
+) -> tuple:
+    """
+    Frase de las palabras aceptadas: (frase, "t5") o, si T5 sigue cargando
+    o no responde a tiempo, (glosas unidas con espacios, "glosas")
+    """
+    frase = None
+    if palabras and registro_modelos.listo("t5"):
+        try:
+            frase = await generar_frase_async(palabras, perfil, presupuesto_ms)
+        except Exception as e:
+            print(f"Error generando frase con T5: {e}")
+    
+    if frase is None:
+        # Fallback: unir palabras con espacios
+        return " ".join(palabras), "glosas"
+    return frase, "t5"
+
+
+# Formatos de /predict-sequence?stream=
+TIPOS_STREAMING = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def formato_streaming(stream: Optional[str], accept: str) -> Optional[str]:
+    """Formato pedido por query (?stream=ndjson|sse) o por el header Accept; None = JSON"""
+    if stream is not None:
+        if stream not in TIPOS_STREAMING:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Formato de stream inválido. Use: {', '.join(TIPOS_STREAMING)}"
+            )
+        return stream
+    for formato, tipo in TIPOS_STREAMING.items():
+        if tipo in accept:
+            return formato
+    return None
+
+
+def formatear_evento(tipo: str, datos: dict, formato: str) -> str:
+    """Un evento como línea NDJSON ({"tipo": ..., ...}) o como evento SSE"""
+    if formato == "sse":
+        return f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+    return json.dumps({"tipo": tipo, **datos}, ensure_ascii=False) + "\n"
+
+
+def eliminar_temporales(rutas: List[str]):
+    for ruta in rutas:
+        if os.path.exists(ruta):
+            os.unlink(ruta)
+
+
+def terminar_secuencia(rutas: List[str], unidades: int):
+    """Libera la capacidad reservada por /predict-sequence y borra sus temporales"""
+    control_admision.liberar(unidades)
+    eliminar_temporales(rutas)
+
+
+async def emitir_secuencia(
+    archivos: List[str],
+    tmp_paths: List[str],
+    digests: List[str],
+    umbral_confianza: float,
+    perfil_t5: Optional[str],
+    presupuesto_ms: Optional[float],
+    formato: str,
+    concurrencia: int
+):
+    """
+    /predict-sequence en streaming: un evento "detalle" por video en el orden en que
+    terminan (cada uno trae su posicion) y al final un evento "frase" con el resumen
+    Si el cliente corta la conexión se cancelan los videos que aún no empezaron
+    """
+    tareas = crear_tareas_secuencia(archivos, tmp_paths, digests, umbral_confianza, concurrencia)
+    try:
+        detalles = [None] * len(tareas)
+        for siguiente in asyncio.as_completed(tareas):
+            detalle = await siguiente
+            detalles[detalle["posicion"] - 1] = detalle
+            yield formatear_evento("detalle", detalle, formato)
+        
+        palabras_detectadas = [d["palabra"] for d in detalles if d.get("aceptada")]
+        frase, origen = await componer_frase(palabras_detectadas, perfil_t5, presupuesto_ms)
+        yield formatear_evento("frase", {
+            "success": True,
+            "palabras_detectadas": palabras_detectadas,
+            "frase_generada": frase,
+            "frase_origen": origen,
+            "total_videos": len(tareas),
+            "videos_aceptados": len(palabras_detectadas)
+        }, formato)
+    
+    except ColaSaturadaError as e:
+        yield formatear_evento("error", {
+            "success": False,
+            "detail": str(e),
+            "retry_after": e.retry_after
+        }, formato)
+    
+    finally:
+        await cancelar_tareas(tareas)
+        eliminar_temporales(tmp_paths)
+
+
+def parsear_keypoints_binarios(datos: bytes) -> np.ndarray:
+    """
+    Convierte un body de float32 little-endian en un array (N, max_length, num_features)
+    Lanza ValueError si el tamaño no es múltiplo de una secuencia o hay NaN/inf
+    """
+    bytes_secuencia = max_length * num_features * 4
+    if not datos or len(datos) % bytes_secuencia != 0:
+        raise ValueError(
+            f"El body debe contener N secuencias de {max_length}x{num_features} float32 "
+            f"({bytes_secuencia} bytes cada una), se recibieron {len(datos)} bytes"
+        )
+    
+    keypoints = np.frombuffer(datos, dtype="<f4").reshape(-1, max_length, num_features)
+    if not np.isfinite(keypoints).all():
+        raise ValueError("Los keypoints contienen NaN o infinitos")
+    return keypoints.astype(np.float32, copy=False)
+
+
+def requerir_componentes(*nombres: str):
+    """503 con Retry-After mientras los componentes pedidos siguen cargando"""
+    try:
+        registro_modelos.requerir(*nombres)
+    except ComponenteNoListoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER_SECONDS)}
+        )
+
+
+def error_saturado(e: ColaSaturadaError) -> HTTPException:
+    """
+    Respuesta 429 con Retry-After cuando el pool de inferencia está lleno
+    (el mismo contrato que el rechazo por admisión; 503 queda para "cargando")
+    """
+    metricas.contar_rechazo("capacidad")
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def error_limite(e: LimiteExcedidoError) -> HTTPException:
+    """Respuesta 429 con Retry-After cuando el cliente o la capacidad llegaron al límite"""
+    metricas.contar_rechazo(e.motivo)
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def requerir_api_key(conexion: HTTPConnection) -> Optional[str]:
+    """401 si API_KEY está configurada y la request no trae una clave válida"""
+    clave = extraer_api_key(conexion.headers)
+    if API_KEYS and not api_key_valida(clave, API_KEYS):
+        raise HTTPException(
+            status_code=401,
+            detail="API key inválida o ausente",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return clave
+
+
+def cobrar_cliente(conexion: HTTPConnection, clave: Optional[str], costo: int):
+    """429 si el cliente (su API key, o su IP) no tiene tokens para costo videos"""
+    if limitador_clientes is None:
+        return
+    # Sin autenticación la clave la elige el cliente: se limita por IP
+    # (detrás de un proxy, la del X-Forwarded-For si FORWARDED_ALLOW_IPS lo permite)
+    if API_KEYS:
+        cliente = f"key:{clave}"
+    else:
+        cliente = f"ip:{conexion.client.host if conexion.client else '-'}"
+    try:
+        limitador_clientes.consumir(cliente, costo)
+    except LimiteExcedidoError as e:
+        raise error_limite(e)
+
+
+def verificar_cliente(conexion: HTTPConnection, costo: int = 1):
+    """
+    requerir_api_key y además 429 si el cliente agotó su límite de tasa;
+    costo es la cantidad de videos de la request
+    """
+    cobrar_cliente(conexion, requerir_api_key(conexion), costo)
+
+
+async def recibir_videos(
+    request: Request,
+    campo: str,
+    directorio: Optional[str] = None,
+    extensiones: Optional[tuple] = None,
+    max_archivos: int = 1000
+) -> List[ArchivoSubido]:
+    """
+    Videos del body multipart escritos directo en directorio (default UPLOAD_TMP_DIR)
+    413 apenas un archivo supera MAX_UPLOAD_SIZE_MB, 400 si no llegó ninguno
+    """
+    try:
+        archivos = await recibir_archivos(
+            request, campo, MAX_UPLOAD_BYTES,
+            directorio or settings.UPLOAD_TMP_DIR, extensiones, max_archivos
+        )
+    except UploadDemasiadoGrandeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not archivos:
+        raise HTTPException(status_code=400, detail="No se enviaron videos")
+    return archivos
+
+
+async def admitir_videos(costo: int) -> int:
+    """Reserva costo videos de capacidad (con espera acotada) o lanza 429"""
+    try:
+        return await control_admision.adquirir(costo)
+    except LimiteExcedidoError as e:
+        raise error_limite(e)
 
 
 # ============== ENDPOINTS ==============
@@ -235,38 +905,98 @@ async def root():
         "endpoints": {
             "GET /": "Información de la API",
             "GET /health": "Estado de la API",
+            "GET /ready": "Listo para atender /predict (200) o cargando (503)",
+            "GET /metrics": "Métricas Prometheus (si PROMETHEUS_ENABLED=true)",
             "GET /palabras-disponibles": "Lista de palabras reconocibles",
             "POST /predict": "Predecir palabra de un video",
             "POST /predict-sequence": "Predecir secuencia de videos",
+            "POST /predict-sentence": "Predecir una frase desde un solo video con varias señas",
+            "POST /predict-keypoints": "Predecir palabra desde keypoints float32 (30x126)",
+            "POST /predict-keypoints/batch": "Predecir varias secuencias de keypoints",
+            "WS /ws/predict": "Reconocimiento en tiempo real (frames JPEG o keypoints)",
+            "POST /jobs": "Encolar la clasificación de muchos videos (subidos o ruta del servidor)",
+            "GET /jobs/{job_id}": "Estado y progreso de un trabajo",
+            "GET /jobs/{job_id}/resultados": "Resultados por video de un trabajo (paginados)",
+            "DELETE /jobs/{job_id}": "Cancelar un trabajo",
         }
     }
 
 
 @app.get("/health")
 async def health_check():
-    """Verificar estado de la API y modelos"""
-    modelos_cargados = all([
-        modelo_clasificador is not None,
-        labels_dict is not None,
-        modelo_generativo is not None,
-        tokenizer is not None,
-        mp_hands is not None
-    ])
+    """
+    Verificar estado de la API y modelos
+    El status depende del clasificador y MediaPipe; si falla un componente
+    opcional (T5) el servicio sigue atendiendo y se reporta "degraded"
+    """
+    componentes = registro_modelos.estado()
+    modelos_cargados = registro_modelos.listo(*componentes)
+    if any(componentes[n]["estado"] == "error" for n in COMPONENTES_ESENCIALES):
+        status = "unhealthy"
+    elif not registro_modelos.listo(*COMPONENTES_ESENCIALES):
+        status = "loading"
+    elif any(c["estado"] == "error" for c in componentes.values()):
+        status = "degraded"
+    else:
+        status = "healthy"
     
     return {
-        "status": "healthy" if modelos_cargados else "unhealthy",
+        "status": status,
         "models_loaded": modelos_cargados,
+        "componentes": componentes,
         "available_words": len(labels_dict) if labels_dict else 0,
         "max_length": max_length,
-        "num_features": num_features
+        "num_features": num_features,
+        "inferencia": ejecutor_inferencia.estado() if ejecutor_inferencia else None,
+        "videos": ejecutor_videos.estado() if ejecutor_videos else None,
+        "batching": agrupador_clasificador.estado() if agrupador_clasificador else None,
+        "cache": cache_resultados.estado() if cache_resultados else None,
+        "cache_frases": cache_frases.estado(),
+        "batching_t5": agrupador_t5.estado() if agrupador_t5 else None,
+        "trabajos": gestor_trabajos.estado() if gestor_trabajos else None,
+        "admision": control_admision.estado() if control_admision else None,
+        "limite_clientes": limitador_clientes.estado() if limitador_clientes else None,
+        "almacen_keypoints": almacen_keypoints.estado() if almacen_keypoints else None,
+        "backends": {
+            "clasificador": backend_clasificador.nombre if backend_clasificador else None,
+            "t5": backend_t5
+        }
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness para el balanceador: 200 cuando /predict puede atender
+    (clasificador y MediaPipe listos), aunque T5 siga cargando
+    """
+    faltantes = registro_modelos.faltantes(*COMPONENTES_ESENCIALES)
+    if faltantes:
+        return JSONResponse(
+            status_code=503,
+            content={"ready": False, "faltantes": faltantes},
+            headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER_SECONDS)}
+        )
+    return {"ready": True, "t5": registro_modelos.listo("t5")}
+
+
+@app.get("/metrics")
+async def metricas_endpoint():
+    """Métricas en formato Prometheus (PROMETHEUS_ENABLED=true)"""
+    if not metricas.habilitado:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    
+    metricas.actualizar_colas(
+        {"inferencia": ejecutor_inferencia, "videos": ejecutor_videos},
+        {"clasificador": agrupador_clasificador, "t5": agrupador_t5}
+    )
+    return Response(content=metricas.exportar(), media_type=metricas.content_type)
+
+
 @app.get("/palabras-disponibles")
 async def obtener_palabras():
     """Retorna la lista de palabras que el modelo puede reconocer"""
-    if labels_dict is None:
-        raise HTTPException(status_code=503, detail="Modelos no cargados")
+    requerir_componentes("clasificador")
     
     palabras = sorted(labels_dict.values())
     
@@ -276,13 +1006,13 @@ async def obtener_palabras():
     }
 
 
-@app.post("/predict")
-async def predecir_video_endpoint(file: UploadFile = File(...)):
+@app.post("/predict", openapi_extra=esquema_multipart("file"))
+async def predecir_video_endpoint(request: Request):
     """
     Predice la palabra de un video de lenguaje de señas
     
     Args:
-        file: Video en formato MP4, MOV, AVI, etc.
+        file: Video en formato MP4, MOV, AVI, etc. (multipart)
     
     Returns:
         {
@@ -292,37 +1022,24 @@ async def predecir_video_endpoint(file: UploadFile = File(...)):
             "frames_procesados": int
         }
     """
-    if modelo_clasificador is None:
-        raise HTTPException(status_code=503, detail="Modelos no cargados")
+    verificar_cliente(request)
+    requerir_componentes("clasificador", "mediapipe")
     
-    # Validar tipo de archivo
-    allowed_extensions = ['.mp4', '.mov', '.avi', '.mkv']
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Formato no soportado. Use: {', '.join(allowed_extensions)}"
-        )
-    
-    # Guardar video temporalmente
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_path = tmp_file.name
+    # Guardar video temporalmente a medida que llega (formato validado al empezar la parte)
+    archivo, = await recibir_videos(request, "file", extensiones=EXTENSIONES_VIDEO, max_archivos=1)
+    tmp_path = archivo.ruta
     
     try:
-        # Procesar video
-        keypoints = extraer_keypoints_video(tmp_path)
+        # Procesar video fuera del event loop (o directo desde la cache)
+        async with control_admision.admitir():
+            keypoints, palabra, confianza = await procesar_video(tmp_path, archivo.digest, archivo.nombre)
         
-        if len(keypoints) == 0:
+        if palabra is None:
             raise HTTPException(
                 status_code=400, 
                 detail="No se detectaron keypoints en el video"
             )
         
-        # Predecir
-        palabra, confianza = predecir_palabra(keypoints)
-        
         return {
             "success": True,
             "palabra": palabra,
@@ -330,6 +1047,12 @@ async def predecir_video_endpoint(file: UploadFile = File(...)):
             "frames_procesados": len(keypoints)
         }
     
+    except HTTPException:
+        raise
+    except ColaSaturadaError as e:
+        raise error_saturado(e)
+    except LimiteExcedidoError as e:
+        raise error_limite(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -341,102 +1064,537 @@ async def predecir_video_endpoint(file: UploadFile = File(...)):
             os.unlink(tmp_path)
 
 
-@app.post("/predict-sequence")
+@app.post("/predict-sequence", openapi_extra=esquema_multipart("files", varios=True))
 async def predecir_secuencia_endpoint(
-    files: List[UploadFile] = File(...),
-    umbral_confianza: float = 0.7
+    request: Request,
+    umbral_confianza: float = 0.7,
+    perfil_t5: Optional[str] = None,
+    presupuesto_ms: Optional[float] = None,
+    stream: Optional[str] = None
 ):
     """
     Predice una secuencia de palabras y genera una frase
     
     Args:
-        files: Lista de videos (orden importa)
+        files: Lista de videos (multipart, el orden importa)
         umbral_confianza: Confianza mínima para aceptar predicción (0.0-1.0)
+        perfil_t5: Decodificación de T5: rapido, equilibrado o calidad (default T5_PROFILE)
+        presupuesto_ms: Espera máxima por la frase de T5 (default T5_LATENCY_BUDGET_MS, 0 = sin límite)
+        stream: "ndjson" o "sse" para recibir cada detalle apenas se clasifica su video
+            y la frase al final (también con Accept: application/x-ndjson o text/event-stream)
+    
+    Cada video cuenta para el límite por cliente y para la capacidad de admisión
     
     Returns:
         {
             "success": bool,
             "palabras_detectadas": List[str],
             "frase_generada": str,
+            "frase_origen": str,  # "t5" o "glosas" (T5 no disponible o fuera de presupuesto)
             "detalles": List[dict],
             "total_videos": int,
             "videos_aceptados": int
         }
     """
-    if modelo_clasificador is None or modelo_generativo is None:
-        raise HTTPException(status_code=503, detail="Modelos no cargados")
+    clave = requerir_api_key(request)
+    requerir_componentes("clasificador", "mediapipe")
     
-    if not files:
-        raise HTTPException(status_code=400, detail="No se enviaron videos")
+    if perfil_t5 is not None and perfil_t5 not in PERFILES_T5:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Perfil T5 inválido. Use: {', '.join(PERFILES_T5)}"
+        )
     
-    palabras_detectadas = []
-    detalles = []
+    formato = formato_streaming(stream, request.headers.get("accept", ""))
     
-    for idx, file in enumerate(files):
-        # Guardar video temporalmente
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-        
-        try:
-            # Procesar video
-            keypoints = extraer_keypoints_video(tmp_path)
-            
-            if len(keypoints) > 0:
-                palabra, confianza = predecir_palabra(keypoints)
-                
-                detalle = {
-                    "posicion": idx + 1,
-                    "archivo": file.filename,
-                    "palabra": palabra,
-                    "confianza": float(confianza),
-                    "aceptada": confianza >= umbral_confianza
-                }
-                
-                detalles.append(detalle)
-                
-                if confianza >= umbral_confianza:
-                    palabras_detectadas.append(palabra)
-            else:
-                detalles.append({
-                    "posicion": idx + 1,
-                    "archivo": file.filename,
-                    "error": "No se detectaron keypoints"
-                })
+    # Guardar todos los videos temporalmente y cobrarlos (la cantidad se conoce al recibirlos)
+    subidos = await recibir_videos(request, "files")
+    tmp_paths = [archivo.ruta for archivo in subidos]
+    digests = [archivo.digest for archivo in subidos]
+    try:
+        cobrar_cliente(request, clave, len(subidos))
+    except HTTPException:
+        eliminar_temporales(tmp_paths)
+        raise
+    
+    # Reservar capacidad (espera acotada o 429); una secuencia más larga que el
+    # tope reserva el tope y procesa esa cantidad de videos a la vez
+    try:
+        unidades = await admitir_videos(len(subidos))
+    except HTTPException:
+        eliminar_temporales(tmp_paths)
+        raise
+    
+    archivos = [archivo.nombre for archivo in subidos]
+    if formato is not None:
+        # La capacidad se libera y los temporales se borran al terminar (o cortarse) el stream
+        return StreamingResponse(
+            emitir_secuencia(
+                archivos, tmp_paths, digests, umbral_confianza, perfil_t5, presupuesto_ms,
+                formato, unidades
+            ),
+            media_type=TIPOS_STREAMING[formato],
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(terminar_secuencia, tmp_paths, unidades)
+        )
+    
+    tareas = crear_tareas_secuencia(archivos, tmp_paths, digests, umbral_confianza, unidades)
+    try:
+        # Procesar los videos en paralelo; gather conserva el orden
+        detalles = await asyncio.gather(*tareas)
+    
+    except ColaSaturadaError as e:
+        raise error_saturado(e)
+    
+    finally:
+        # Si un video falla, los demás no pueden seguir usando temporales ya borrados
+        await cancelar_tareas(tareas)
+        terminar_secuencia(tmp_paths, unidades)
+    
+    palabras_detectadas = [d["palabra"] for d in detalles if d.get("aceptada")]
+    frase, origen = await componer_frase(palabras_detectadas, perfil_t5, presupuesto_ms)
+    
+    return {
+        "success": True,
+        "palabras_detectadas": palabras_detectadas,
+        "frase_generada": frase,
+        "frase_origen": origen,
+        "detalles": detalles,
+        "total_videos": len(subidos),
+        "videos_aceptados": len(palabras_detectadas)
+    }
+
+
+@app.post("/predict-sentence", openapi_extra=esquema_multipart("file"))
+async def predecir_frase_endpoint(
+    request: Request,
+    umbral_confianza: float = 0.7,
+    perfil_t5: Optional[str] = None,
+    presupuesto_ms: Optional[float] = None
+):
+    """
+    Predice una frase desde un solo video con varias señas seguidas
+    
+    Los keypoints se extraen una vez sobre todo el video, las señas se separan
+    por presencia de manos y movimiento, y todas las ventanas de 30 frames
+    se clasifican en un solo forward pass
+    
+    Args:
+        file: Video continuo en formato MP4, MOV, AVI, etc. (multipart)
+        umbral_confianza: Confianza mínima para aceptar predicción (0.0-1.0)
+        perfil_t5: Decodificación de T5: rapido, equilibrado o calidad (default T5_PROFILE)
+        presupuesto_ms: Espera máxima por la frase de T5 (default T5_LATENCY_BUDGET_MS, 0 = sin límite)
+    
+    Returns:
+        {
+            "success": bool,
+            "palabras_detectadas": List[str],
+            "frase_generada": str,
+            "frase_origen": str,
+            "detalles": List[dict],  # posicion, segmento, inicio_s, fin_s, palabra, confianza, aceptada
+            "segmentos": int,
+            "ventanas": int,
+            "duracion_s": float
+        }
+    """
+    verificar_cliente(request)
+    requerir_componentes("clasificador", "mediapipe")
+    
+    if perfil_t5 is not None and perfil_t5 not in PERFILES_T5:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Perfil T5 inválido. Use: {', '.join(PERFILES_T5)}"
+        )
+    
+    archivo, = await recibir_videos(request, "file", extensiones=EXTENSIONES_VIDEO, max_archivos=1)
+    tmp_path = archivo.ruta
+    
+    try:
+        # Una sola pasada de decodificación + MediaPipe sobre todo el video
+        async with control_admision.admitir():
+            with metricas.cronometrar("extraccion"):
+                ventanas, info, estadisticas = await ejecutor_videos.ejecutar(
+                    segmentar_video, tmp_path
+                )
+        metricas.observar_extraccion(estadisticas)
         
-        except Exception as e:
-            detalles.append({
-                "posicion": idx + 1,
-                "archivo": file.filename,
-                "error": str(e)
-            })
+        if len(ventanas) == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="No se detectaron keypoints en el video"
+            )
         
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+        # Todas las ventanas en un solo forward pass
+        with metricas.cronometrar("lstm"):
+            predicciones = await ejecutor_inferencia.ejecutar(predecir_palabras_lote, list(ventanas))
     
-    # Generar frase
-    frase = ""
-    if palabras_detectadas:
-        try:
-            frase = generar_frase(palabras_detectadas)
-        except Exception as e:
-            # Fallback: unir palabras con espacios
-            frase = " ".join(palabras_detectadas)
-            print(f"Error generando frase con T5: {e}")
+    except HTTPException:
+        raise
+    except ColaSaturadaError as e:
+        raise error_saturado(e)
+    except LimiteExcedidoError as e:
+        raise error_limite(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error procesando video: {str(e)}")
+    
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    
+    detalles = unir_predicciones(info, predicciones, umbral_confianza)
+    palabras_detectadas = [d["palabra"] for d in detalles if d["aceptada"]]
+    frase, origen = await componer_frase(palabras_detectadas, perfil_t5, presupuesto_ms)
     
     return {
         "success": True,
         "palabras_detectadas": palabras_detectadas,
         "frase_generada": frase,
+        "frase_origen": origen,
         "detalles": detalles,
-        "total_videos": len(files),
-        "videos_aceptados": len(palabras_detectadas)
+        "segmentos": estadisticas["segmentos"],
+        "ventanas": len(ventanas),
+        "duracion_s": estadisticas["duracion_s"]
+    }
+
+
+@app.post("/predict-keypoints")
+async def predecir_keypoints_endpoint(request: Request):
+    """
+    Predice la palabra a partir de keypoints ya extraídos por el cliente
+    (evita decodificar el video y correr MediaPipe en el servidor)
+    
+    Body: application/octet-stream con 30*126 float32 little-endian (15120 bytes)
+    
+    Returns:
+        {
+            "success": bool,
+            "palabra": str,
+            "confianza": float
+        }
+    """
+    verificar_cliente(request)
+    requerir_componentes("clasificador")
+    
+    try:
+        keypoints = parsear_keypoints_binarios(await request.body())
+        if len(keypoints) != 1:
+            raise ValueError(
+                f"Se esperaba una secuencia, se recibieron {len(keypoints)}. "
+                "Use /predict-keypoints/batch"
+            )
+        async with control_admision.admitir():
+            palabra, confianza = await predecir_palabra_async(keypoints[0])
+    except ColaSaturadaError as e:
+        raise error_saturado(e)
+    except LimiteExcedidoError as e:
+        raise error_limite(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "success": True,
+        "palabra": palabra,
+        "confianza": float(confianza)
+    }
+
+
+@app.post("/predict-keypoints/batch")
+async def predecir_keypoints_batch_endpoint(request: Request):
+    """
+    Predice varias secuencias de keypoints en un solo forward pass
+    
+    Body: application/octet-stream con N*30*126 float32 little-endian
+    
+    Returns:
+        {
+            "success": bool,
+            "total": int,
+            "resultados": List[{"palabra": str, "confianza": float}]
+        }
+    """
+    clave = requerir_api_key(request)
+    requerir_componentes("clasificador")
+    
+    try:
+        keypoints = parsear_keypoints_binarios(await request.body())
+        if len(keypoints) > settings.KEYPOINTS_BATCH_MAX:
+            raise ValueError(
+                f"Máximo {settings.KEYPOINTS_BATCH_MAX} secuencias por request, "
+                f"se recibieron {len(keypoints)}"
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Cada secuencia cuesta lo mismo que un video (la cantidad se conoce al parsear)
+    cobrar_cliente(request, clave, len(keypoints))
+    
+    try:
+        async with control_admision.admitir(len(keypoints)):
+            predicciones = await ejecutor_inferencia.ejecutar(predecir_palabras_lote, list(keypoints))
+    except ColaSaturadaError as e:
+        raise error_saturado(e)
+    except LimiteExcedidoError as e:
+        raise error_limite(e)
+    
+    return {
+        "success": True,
+        "total": len(predicciones),
+        "resultados": [
+            {"palabra": palabra, "confianza": confianza}
+            for palabra, confianza in predicciones
+        ]
+    }
+
+
+@app.post(
+    "/jobs",
+    status_code=202,
+    openapi_extra=esquema_multipart("files", varios=True, requerido=False)
+)
+async def crear_trabajo_endpoint(
+    request: Request,
+    ruta: Optional[str] = None,
+    umbral_confianza: float = 0.7
+):
+    """
+    Encola la clasificación de muchos videos y retorna de inmediato el id del trabajo
+    
+    Args:
+        files: Videos subidos (multipart), o bien
+        ruta: Carpeta, .zip/.tar o video dentro de JOBS_INPUT_ROOT en el servidor
+        umbral_confianza: Confianza mínima para marcar un resultado como aceptado
+    
+    Returns:
+        {
+            "success": bool,
+            "job_id": str,
+            "estado": str,
+            "total": int
+        }
+    """
+    # Los videos se cobran al conocer su cantidad: al recibirlos o al listar la ruta
+    clave = requerir_api_key(request)
+    if es_multipart(request) == bool(ruta):
+        raise HTTPException(status_code=400, detail="Envíe videos o una ruta (no ambos)")
+    
+    trabajo_id = gestor_trabajos.nuevo_id()
+    directorio = gestor_trabajos.directorio_trabajo(trabajo_id)
+    os.makedirs(directorio, exist_ok=True)
+    
+    try:
+        if ruta:
+            origen = ruta
+            videos = await asyncio.to_thread(
+                listar_videos, resolver_ruta(ruta, settings.JOBS_INPUT_ROOT), directorio
+            )
+        else:
+            origen = "upload"
+            subidos = await recibir_videos(
+                request, "files", directorio, EXTENSIONES_VIDEO, settings.JOBS_MAX_VIDEOS
+            )
+            videos = [(archivo.nombre, archivo.ruta) for archivo in subidos]
+        
+        if not videos:
+            raise OrigenInvalidoError("No se encontraron videos")
+        if len(videos) > settings.JOBS_MAX_VIDEOS:
+            raise OrigenInvalidoError(
+                f"Máximo {settings.JOBS_MAX_VIDEOS} videos por trabajo, se encontraron {len(videos)}"
+            )
+        cobrar_cliente(request, clave, len(videos))
+    
+    except OrigenInvalidoError as e:
+        gestor_trabajos.limpiar(trabajo_id)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        gestor_trabajos.limpiar(trabajo_id)
+        raise
+    
+    try:
+        await gestor_trabajos.encolar(trabajo_id, origen, umbral_confianza, videos)
+    except BaseException:
+        gestor_trabajos.limpiar(trabajo_id)
+        raise
+    
+    return {
+        "success": True,
+        "job_id": trabajo_id,
+        "estado": "en_cola",
+        "total": len(videos)
     }
 
 
+@app.get("/jobs")
+async def listar_trabajos_endpoint(request: Request, limite: int = 50):
+    """Trabajos más recientes con su estado"""
+    requerir_api_key(request)
+    trabajos = await asyncio.to_thread(gestor_trabajos.almacen.listar, min(max(1, limite), 500))
+    return {"trabajos": [resumen_trabajo(t) for t in trabajos]}
+
+
+async def obtener_trabajo(job_id: str) -> dict:
+    trabajo = await asyncio.to_thread(gestor_trabajos.almacen.obtener, job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+    return trabajo
+
+
+@app.get("/jobs/{job_id}")
+async def estado_trabajo_endpoint(request: Request, job_id: str):
+    """Estado y progreso (procesados, errores, videos por segundo) de un trabajo"""
+    requerir_api_key(request)
+    return resumen_trabajo(await obtener_trabajo(job_id))
+
+
+@app.get("/jobs/{job_id}/resultados")
+async def resultados_trabajo_endpoint(
+    request: Request,
+    job_id: str,
+    desde: int = 0,
+    limite: int = 1000
+):
+    """
+    Resultados por video en orden, paginados por posición
+    
+    Returns:
+        {
+            "job_id": str,
+            "estado": str,
+            "resultados": List[dict],
+            "siguiente": int | None  # pasar como "desde" para la próxima página
+        }
+    """
+    requerir_api_key(request)
+    trabajo = await obtener_trabajo(job_id)
+    limite = min(max(1, limite), 10000)
+    resultados = await asyncio.to_thread(gestor_trabajos.almacen.resultados, job_id, desde, limite)
+    for r in resultados:
+        if r["confianza"] is not None:
+            r["aceptada"] = r["confianza"] >= trabajo["umbral"]
+    
+    return {
+        "job_id": job_id,
+        "estado": trabajo["estado"],
+        "resultados": resultados,
+        "siguiente": resultados[-1]["posicion"] if len(resultados) == limite else None
+    }
+
+
+@app.delete("/jobs/{job_id}")
+async def cancelar_trabajo_endpoint(request: Request, job_id: str):
+    """Cancela un trabajo en cola o en proceso (los resultados ya guardados se conservan)"""
+    requerir_api_key(request)
+    trabajo = await obtener_trabajo(job_id)
+    if not await gestor_trabajos.cancelar(job_id):
+        raise HTTPException(
+            status_code=409,
+            detail=f"El trabajo ya terminó ({trabajo['estado']})"
+        )
+    return resumen_trabajo(await obtener_trabajo(job_id))
+
+
+@app.websocket("/ws/predict")
+async def predecir_streaming_endpoint(websocket: WebSocket):
+    """
+    Reconocimiento en tiempo real
+    
+    Mensajes del cliente:
+        - binario: un frame JPEG/PNG
+        - texto JSON: {"keypoints": [126 floats]} si el cliente ya corrió el tracking,
+          o {"accion": "reset"} para vaciar la ventana
+    
+    Mensajes del servidor (cada WS_PREDICT_EVERY frames con la ventana llena):
+        {"tipo": "prediccion", "palabra": str, "confianza": float, "frame": int}
+        {"tipo": "error", "detalle": str}
+    
+    Cada frame toma una unidad de admisión solo mientras pasa por MediaPipe o el
+    LSTM (una conexión inactiva no ocupa capacidad) y cada ventana de 30 frames
+    recibidos cuenta como un video para el límite por cliente
+    """
+    # Autenticación y límite por cliente al conectar (la conexión cuenta como un video)
+    try:
+        clave = requerir_api_key(websocket)
+        cobrar_cliente(websocket, clave, 1)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+    
+    await atender_streaming(websocket, clave)
+
+
+async def atender_streaming(websocket: WebSocket, clave: Optional[str]):
+    """Bucle de /ws/predict"""
+    await websocket.accept()
+    
+    faltantes = registro_modelos.faltantes("clasificador")
+    if faltantes:
+        await websocket.send_json({
+            "tipo": "error",
+            "detalle": str(ComponenteNoListoError(faltantes))
+        })
+        await websocket.close(code=1013)
+        return
+    
+    sesion = SesionStreaming(settings.WS_PREDICT_EVERY)
+    try:
+        while True:
+            mensaje = await websocket.receive()
+            if mensaje["type"] == "websocket.disconnect":
+                break
+            
+            try:
+                if mensaje.get("bytes") is not None:
+                    with control_admision.admitir_sin_espera():
+                        await ejecutor_inferencia.ejecutar(sesion.procesar_jpeg, mensaje["bytes"])
+                else:
+                    datos = json.loads(mensaje.get("text") or "{}")
+                    if not isinstance(datos, dict):
+                        raise ValueError("El mensaje JSON debe ser un objeto")
+                    if datos.get("accion") == "reset":
+                        sesion.reiniciar()
+                        continue
+                    sesion.agregar_keypoints(datos.get("keypoints"))
+                
+                if sesion.frames_recibidos % max_length == 0:
+                    cobrar_cliente(websocket, clave, 1)
+                if not sesion.lista_para_predecir():
+                    continue
+                with control_admision.admitir_sin_espera():
+                    palabra, confianza = await predecir_palabra_async(sesion.tomar_ventana())
+            except (ColaSaturadaError, LimiteExcedidoError) as e:
+                # En tiempo real es mejor descartar el frame (o la ventana) que encolarlo
+                if isinstance(e, LimiteExcedidoError):
+                    metricas.contar_rechazo(e.motivo)
+                await websocket.send_json({"tipo": "error", "detalle": str(e)})
+                continue
+            except (ValueError, TypeError) as e:
+                await websocket.send_json({"tipo": "error", "detalle": str(e)})
+                continue
+            except HTTPException as e:
+                # Límite por cliente agotado: se avisa cuándo reintentar y se cierra
+                await websocket.send_json({
+                    "tipo": "error",
+                    "detalle": str(e.detail),
+                    "retry_after": int(e.headers["Retry-After"])
+                })
+                await websocket.close(code=1013)
+                break
+            
+            await websocket.send_json({
+                "tipo": "prediccion",
+                "palabra": palabra,
+                "confianza": float(confianza),
+                "frame": sesion.frames_recibidos
+            })
+    
+    except WebSocketDisconnect:
+        pass
+    
+    finally:
+        sesion.cerrar()
+
+
 # ============== EJECUTAR ==============
 
 if __name__ == "__main__":
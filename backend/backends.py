@@ -0,0 +1,234 @@
+"""
+Backends de inferencia en CPU
+El clasificador LSTM puede servirse con Keras (tf.function), TFLite con
+cuantización int8 de rango dinámico u ONNX Runtime; T5 con PyTorch fp32,
+PyTorch con cuantización dinámica int8 u ONNX Runtime (con KV-cache).
+Todos los backends del clasificador reciben (N, 30, 126) float32 y
+retornan las probabilidades (N, num_clases) como np.ndarray.
+"""
+
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+BACKENDS_CLASIFICADOR = ("keras", "tflite", "onnx")
+BACKENDS_T5 = ("pytorch", "int8", "onnx")
+
+RUTA_TFLITE = "models/mejor_modelo_lsc.tflite"
+RUTA_ONNX = "models/mejor_modelo_lsc.onnx"
+RUTA_T5_ONNX = "models/t5-lsc-onnx"
+# Keypoints reales (N, 30, 126) para validar la deriva; si no existe se usan sintéticos
+RUTA_VALIDACION = "models/validacion_keypoints.npy"
+
+
+def _parchear_input_layer():
+    """Aceptar "batch_shape" (Keras 3) al cargar el H5 con Keras legacy"""
+    from tensorflow.keras.layers import InputLayer
+
+    if getattr(InputLayer.from_config, "_acepta_batch_shape", False):
+        return
+    _original_inputlayer_from_config = InputLayer.from_config.__func__
+
+    def _accept_batch_shape(cls, config):
+        if "batch_shape" in config and "batch_input_shape" not in config:
+            config["batch_input_shape"] = config.pop("batch_shape")
+        return _original_inputlayer_from_config(cls, config)
+
+    _accept_batch_shape._acepta_batch_shape = True
+    InputLayer.from_config = classmethod(_accept_batch_shape)
+
+
+def cargar_modelo_keras(ruta: str):
+    """Carga el LSTM H5 sin compilar"""
+    import tensorflow as tf
+    from tensorflow.keras.mixed_precision import Policy
+    from tensorflow.keras.utils import custom_object_scope
+
+    _parchear_input_layer()
+    with custom_object_scope({"DTypePolicy": Policy}):
+        return tf.keras.models.load_model(ruta, compile=False)
+
+
+class ClasificadorKeras:
+    """Forward pass compilado con tf.function y batch variable"""
+
+    nombre = "keras"
+
+    def __init__(self, modelo, max_length: int, num_features: int):
+        import tensorflow as tf
+
+        self._fn = tf.function(
+            lambda x: modelo(x, training=False),
+            input_signature=[tf.TensorSpec((None, max_length, num_features), tf.float32)]
+        )
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self._fn(batch).numpy()
+
+
+class ClasificadorTFLite:
+    """
+    Intérprete TFLite por hilo (tf.lite.Interpreter no es thread-safe)
+    El modelo se convierte con batch 1 (el LSTM fusionado no admite redimensionar
+    el batch), así que un lote se resuelve con una invocación por secuencia
+    """
+
+    nombre = "tflite"
+
+    def __init__(self, contenido: bytes, num_hilos: int = 1):
+        self._contenido = contenido
+        self._num_hilos = num_hilos
+        self._local = threading.local()
+
+    def _interprete(self):
+        import tensorflow as tf
+
+        local = self._local
+        if getattr(local, "interprete", None) is None:
+            local.interprete = tf.lite.Interpreter(
+                model_content=self._contenido, num_threads=self._num_hilos
+            )
+            local.interprete.allocate_tensors()
+            local.entrada = local.interprete.get_input_details()[0]["index"]
+            local.salida = local.interprete.get_output_details()[0]["index"]
+        return local
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        local = self._interprete()
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        salidas = []
+        for i in range(len(batch)):
+            local.interprete.set_tensor(local.entrada, batch[i:i + 1])
+            local.interprete.invoke()
+            salidas.append(local.interprete.get_tensor(local.salida)[0].copy())
+        return np.stack(salidas)
+
+
+class ClasificadorONNX:
+    """Sesión de ONNX Runtime (run() es thread-safe)"""
+
+    nombre = "onnx"
+
+    def __init__(self, ruta: str, num_hilos: int = 1):
+        import onnxruntime as ort
+
+        opciones = ort.SessionOptions()
+        opciones.intra_op_num_threads = num_hilos
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._sesion = ort.InferenceSession(
+            ruta, sess_options=opciones, providers=["CPUExecutionProvider"]
+        )
+        self._entrada = self._sesion.get_inputs()[0].name
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self._sesion.run(None, {self._entrada: batch.astype(np.float32, copy=False)})[0]
+
+
+def convertir_tflite(modelo, max_length: int, num_features: int, cuantizar: bool = True) -> bytes:
+    """
+    Convierte el modelo Keras a TFLite (cuantización int8 de rango dinámico por defecto)
+    Se convierte con batch 1 para que el LSTM se fusione en un solo op de TFLite
+    """
+    import tensorflow as tf
+
+    fn = tf.function(
+        lambda x: modelo(x, training=False),
+        input_signature=[tf.TensorSpec((1, max_length, num_features), tf.float32)]
+    )
+    converter = tf.lite.TFLiteConverter.from_concrete_functions(
+        [fn.get_concrete_function()], modelo
+    )
+    if cuantizar:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    return converter.convert()
+
+
+def exportar_onnx(modelo, ruta: str, max_length: int, num_features: int):
+    """Exporta el modelo Keras a ONNX con tf2onnx (batch dinámico)"""
+    import tensorflow as tf
+    import tf2onnx
+
+    firma = (tf.TensorSpec((None, max_length, num_features), tf.float32, name="keypoints"),)
+    tf2onnx.convert.from_keras(modelo, input_signature=firma, opset=13, output_path=ruta)
+
+
+def crear_backend_clasificador(
+    nombre: str,
+    modelo_keras,
+    max_length: int,
+    num_features: int,
+    num_hilos: int = 1
+):
+    """
+    Backend del clasificador según CLASSIFIER_BACKEND
+    TFLite usa RUTA_TFLITE si existe o convierte el modelo al vuelo;
+    ONNX requiere haber exportado RUTA_ONNX con exportar_modelos.py
+    """
+    if nombre not in BACKENDS_CLASIFICADOR:
+        raise ValueError(
+            f"CLASSIFIER_BACKEND inválido: {nombre} (use {', '.join(BACKENDS_CLASIFICADOR)})"
+        )
+
+    if nombre == "tflite":
+        if os.path.exists(RUTA_TFLITE):
+            with open(RUTA_TFLITE, "rb") as f:
+                contenido = f.read()
+        else:
+            contenido = convertir_tflite(modelo_keras, max_length, num_features)
+        return ClasificadorTFLite(contenido, num_hilos)
+
+    if nombre == "onnx":
+        if not os.path.exists(RUTA_ONNX):
+            raise FileNotFoundError(
+                f"{RUTA_ONNX} no existe, expórtelo con: python exportar_modelos.py --onnx"
+            )
+        return ClasificadorONNX(RUTA_ONNX, num_hilos)
+
+    return ClasificadorKeras(modelo_keras, max_length, num_features)
+
+
+def keypoints_validacion(max_length: int, num_features: int, n: int = 64) -> np.ndarray:
+    """Lote para medir la deriva: RUTA_VALIDACION o keypoints sintéticos reproducibles"""
+    if os.path.exists(RUTA_VALIDACION):
+        return np.load(RUTA_VALIDACION).astype(np.float32)[:, :max_length, :num_features]
+
+    rng = np.random.default_rng(0)
+    keypoints = rng.uniform(0.0, 1.0, (n, max_length, num_features)).astype(np.float32)
+    # La mitad con una sola mano (la otra en ceros), como en los videos reales
+    keypoints[::2, :, num_features // 2:] = 0.0
+    return keypoints
+
+
+def medir_deriva(referencia, candidato, keypoints: np.ndarray) -> dict:
+    """Diferencia máxima de probabilidades y acuerdo top-1 entre dos backends"""
+    esperado = referencia(keypoints)
+    obtenido = candidato(keypoints)
+    return {
+        "max_diferencia": float(np.max(np.abs(esperado - obtenido))),
+        "acuerdo_top1": float(np.mean(np.argmax(esperado, axis=1) == np.argmax(obtenido, axis=1))),
+    }
+
+
+def cuantizar_t5(modelo):
+    """Cuantización dinámica int8 de las capas Linear de T5"""
+    import torch
+
+    return torch.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def cargar_t5_onnx(ruta: str = RUTA_T5_ONNX, num_hilos: Optional[int] = None):
+    """T5 exportado a ONNX (encoder + decoder con KV-cache) con Optimum"""
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    if not os.path.isdir(ruta):
+        raise FileNotFoundError(
+            f"{ruta} no existe, expórtelo con: python exportar_modelos.py --t5-onnx"
+        )
+    opciones = ort.SessionOptions()
+    if num_hilos:
+        opciones.intra_op_num_threads = num_hilos
+    return ORTModelForSeq2SeqLM.from_pretrained(ruta, use_cache=True, session_options=opciones)
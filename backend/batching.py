@@ -0,0 +1,115 @@
+"""
+Micro-batching dinámico entre requests
+Agrupa entradas de requests concurrentes durante unos milisegundos
+y las procesa en una sola llamada al modelo
+"""
+
+import asyncio
+from typing import Any, Callable, List, Optional
+
+from executor import EjecutorInferencia
+
+
+class AgrupadorLotes:
+    """
+    Junta hasta max_lote elementos o espera como máximo max_espera_ms desde
+    el primero, ejecuta procesar_lote(elementos) en el ejecutor y reparte
+    cada resultado a la request que lo pidió.
+
+    procesar_lote recibe una lista y debe retornar una lista del mismo largo.
+    """
+
+    def __init__(
+        self,
+        procesar_lote: Callable[[List[Any]], List[Any]],
+        ejecutor: EjecutorInferencia,
+        max_lote: int = 16,
+        max_espera_ms: float = 5.0,
+        nombre: str = "lotes"
+    ):
+        self.procesar_lote = procesar_lote
+        self.ejecutor = ejecutor
+        self.max_lote = max(1, max_lote)
+        self.max_espera = max(0.0, max_espera_ms) / 1000.0
+        self.nombre = nombre
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self.lotes_procesados = 0
+        self.elementos_procesados = 0
+
+    def iniciar(self):
+        """Arranca el bucle de agrupación (llamar con el event loop corriendo)"""
+        if self._tarea is None:
+            self._cola = asyncio.Queue()
+            self._tarea = asyncio.get_running_loop().create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estado(self) -> dict:
+        return {
+            "max_lote": self.max_lote,
+            "max_espera_ms": self.max_espera * 1000.0,
+            "en_espera": self._cola.qsize() if self._cola else 0,
+            "lotes_procesados": self.lotes_procesados,
+            "tamano_medio_lote": (
+                self.elementos_procesados / self.lotes_procesados
+                if self.lotes_procesados else 0.0
+            ),
+        }
+
+    async def enviar(self, elemento: Any) -> Any:
+        """Encola un elemento y espera su resultado individual"""
+        if self._tarea is None:
+            self.iniciar()
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((elemento, futuro))
+        return await futuro
+
+    async def _recolectar(self) -> list:
+        """Espera el primer elemento y junta más hasta llenar el lote o agotar la espera"""
+        lote = [await self._cola.get()]
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + self.max_espera
+
+        while len(lote) < self.max_lote:
+            restante = limite - loop.time()
+            if restante <= 0:
+                # Tomar lo que ya esté en cola sin esperar más
+                while len(lote) < self.max_lote and not self._cola.empty():
+                    lote.append(self._cola.get_nowait())
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _bucle(self):
+        while True:
+            lote = await self._recolectar()
+            # Descartar requests que ya se cancelaron (cliente desconectado)
+            lote = [(e, f) for e, f in lote if not f.done()]
+            if not lote:
+                continue
+
+            elementos = [e for e, _ in lote]
+            try:
+                resultados = await self.ejecutor.ejecutar(self.procesar_lote, elementos)
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+
+            self.lotes_procesados += 1
+            self.elementos_procesados += len(elementos)
+            for (_, futuro), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
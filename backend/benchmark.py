@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible del pipeline de inferencia (sin servidor)
+Genera videos y keypoints sintéticos, mide latencia (p50/p95/p99) y
+throughput de extracción, clasificación, T5 y de los endpoints completos
+a través de un cliente ASGI en el mismo proceso, y guarda un JSON para
+comparar entre commits
+
+Uso (desde backend/, con los modelos en models/):
+    python benchmark.py --salida bench.json
+    python benchmark.py --frames 150 --ancho 1280 --alto 720 --concurrencias 1,8,32
+    python benchmark.py --salida nuevo.json --comparar bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def generar_video_sintetico(
+    path: str,
+    frames: int = 90,
+    ancho: int = 640,
+    alto: int = 480,
+    fps: int = 30,
+    semilla: int = 0
+):
+    """Video MP4 con figuras en movimiento (contenido reproducible por semilla)"""
+    import cv2
+
+    rng = np.random.default_rng(semilla)
+    fondo = rng.integers(0, 80, (alto, ancho, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (ancho, alto))
+    radio = max(8, min(ancho, alto) // 12)
+    for i in range(frames):
+        frame = fondo.copy()
+        x = int((i * 7) % ancho)
+        y = int(alto / 2 + np.sin(i / 5) * alto / 4)
+        cv2.circle(frame, (x, y), radio, (200, 180, 160), -1)
+        cv2.rectangle(frame, (ancho - x - radio, y - radio), (ancho - x, y), (160, 170, 200), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def keypoints_sinteticos(n: int, max_length: int = 30, num_features: int = 126, semilla: int = 0) -> np.ndarray:
+    """Lote (n, 30, 126) de keypoints en [0, 1]"""
+    rng = np.random.default_rng(semilla)
+    return rng.uniform(0.0, 1.0, (n, max_length, num_features)).astype(np.float32)
+
+
+def resumir(latencias: List[float], segundos_totales: float) -> dict:
+    """Percentiles en ms y throughput (operaciones por segundo)"""
+    ms = np.asarray(latencias) * 1000
+    return {
+        "n": len(latencias),
+        "media_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_s": round(len(latencias) / segundos_totales, 3) if segundos_totales else 0.0,
+    }
+
+
+def medir(fn: Callable, repeticiones: int, calentamiento: int = 2) -> dict:
+    """Ejecuta fn() secuencialmente y resume sus latencias"""
+    for _ in range(calentamiento):
+        fn()
+    latencias = []
+    inicio_total = time.perf_counter()
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        latencias.append(time.perf_counter() - inicio)
+    return resumir(latencias, time.perf_counter() - inicio_total)
+
+
+async def medir_concurrente(fn, total: int, concurrencia: int) -> dict:
+    """Lanza total llamadas a la corrutina fn() con a lo sumo concurrencia en vuelo"""
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+    errores: Dict[str, int] = {}
+
+    async def una():
+        async with semaforo:
+            inicio = time.perf_counter()
+            status = await fn()
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                errores[str(status)] = errores.get(str(status), 0) + 1
+
+    inicio_total = time.perf_counter()
+    await asyncio.gather(*[una() for _ in range(total)])
+    resultado = resumir(latencias, time.perf_counter() - inicio_total)
+    resultado["concurrencia"] = concurrencia
+    resultado["errores"] = errores
+    return resultado
+
+
+def bench_funciones(api, videos: List[str], args) -> dict:
+    """Funciones del pipeline llamadas directamente (un solo hilo)"""
+    from keypoints import extraer_keypoints_video, configurar_pool_hands
+
+    configurar_pool_hands(1)
+    resultados = {}
+
+    print("⏱️  extraer_keypoints_video")
+    indice = iter(range(10 ** 9))
+    resultados["extraer_keypoints_video"] = medir(
+        lambda: extraer_keypoints_video(videos[next(indice) % len(videos)]),
+        args.repeticiones
+    )
+
+    print("⏱️  predecir_palabra")
+    secuencias = keypoints_sinteticos(64, api.max_length, api.num_features)
+    resultados["predecir_palabra"] = medir(
+        lambda: api.predecir_palabra(secuencias[0]), args.repeticiones * 5
+    )
+    for n in (8, 32):
+        resultados[f"predecir_palabras_lote_{n}"] = medir(
+            lambda: api.predecir_palabras_lote(list(secuencias[:n])), args.repeticiones
+        )
+
+    palabras = sorted(api.labels_dict.values())
+    for perfil in api.PERFILES_T5:
+        print(f"⏱️  generar_frase ({perfil})")
+        resultados[f"generar_frase_{perfil}"] = medir(
+            lambda: api.generar_frase(palabras[:args.glosas], perfil),
+            max(3, args.repeticiones // 4), calentamiento=1
+        )
+    return resultados
+
+
+async def bench_endpoints(api, videos: List[str], args) -> dict:
+    """Endpoints completos vía httpx + ASGITransport, a distintas concurrencias"""
+    import httpx
+
+    await api.cargar_modelos()
+    await api.registro_modelos.esperar()
+
+    datos_videos = []
+    for path in videos:
+        with open(path, "rb") as f:
+            datos_videos.append(f.read())
+    keypoints = keypoints_sinteticos(1, api.max_length, api.num_features).tobytes()
+    contador = iter(range(10 ** 9))
+
+    async def predict(cliente):
+        datos = datos_videos[next(contador) % len(datos_videos)]
+        r = await cliente.post("/predict", files={"file": ("video.mp4", datos, "video/mp4")})
+        return r.status_code
+
+    async def predict_keypoints(cliente):
+        r = await cliente.post(
+            "/predict-keypoints", content=keypoints,
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        return r.status_code
+
+    async def predict_sequence(cliente):
+        archivos = [
+            ("files", (f"v{i}.mp4", datos_videos[(next(contador) + i) % len(datos_videos)], "video/mp4"))
+            for i in range(args.videos_secuencia)
+        ]
+        r = await cliente.post(
+            "/predict-sequence", params={"umbral_confianza": 0.0}, files=archivos
+        )
+        return r.status_code
+
+    resultados = {}
+    transporte = httpx.ASGITransport(app=api.app)
+    try:
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            for nombre, fn in (
+                ("POST /predict", predict),
+                ("POST /predict-keypoints", predict_keypoints),
+                ("POST /predict-sequence", predict_sequence),
+            ):
+                resultados[nombre] = []
+                for concurrencia in args.concurrencias:
+                    print(f"⏱️  {nombre} (concurrencia {concurrencia})")
+                    total = max(args.repeticiones, concurrencia * 2)
+                    resultados[nombre].append(
+                        await medir_concurrente(lambda: fn(cliente), total, concurrencia)
+                    )
+    finally:
+        await api.liberar_recursos()
+    return resultados
+
+
+def metadatos(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    from config import settings
+
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {
+            "frames": args.frames, "ancho": args.ancho, "alto": args.alto,
+            "videos": args.videos, "repeticiones": args.repeticiones,
+            "concurrencias": args.concurrencias, "videos_secuencia": args.videos_secuencia,
+            "con_cache": args.con_cache,
+        },
+        "settings": {
+            clave: getattr(settings, clave)
+            for clave in (
+                "FRAME_SAMPLING", "INFERENCE_THREADS", "VIDEO_PROCESS_WORKERS",
+                "BATCH_MAX_SIZE", "BATCH_MAX_WAIT_MS", "CLASSIFIER_BACKEND",
+                "T5_BACKEND", "T5_PROFILE",
+            )
+        },
+    }
+
+
+def comparar(actual: dict, base: dict):
+    """Imprime la variación de p50/p95 respecto de un JSON anterior"""
+    print(f"\n📊 Comparación con {base['metadatos'].get('commit')} ({base['metadatos'].get('fecha')})")
+
+    def filas(resultados: dict):
+        for grupo in ("funciones", "endpoints"):
+            for nombre, valor in resultados.get(grupo, {}).items():
+                for r in (valor if isinstance(valor, list) else [valor]):
+                    clave = nombre if "concurrencia" not in r else f"{nombre} c={r['concurrencia']}"
+                    yield clave, r
+
+    anteriores = dict(filas(base))
+    for clave, r in filas(actual):
+        previo = anteriores.get(clave)
+        if previo is None:
+            continue
+        cambios = []
+        for metrica in ("p50_ms", "p95_ms"):
+            delta = (r[metrica] - previo[metrica]) / previo[metrica] * 100 if previo[metrica] else 0.0
+            cambios.append(f"{metrica} {previo[metrica]:.1f} -> {r[metrica]:.1f} ({delta:+.1f}%)")
+        print(f"   {clave}: " + " | ".join(cambios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline LSC")
+    parser.add_argument("--frames", type=int, default=90, help="Frames por video sintético")
+    parser.add_argument("--ancho", type=int, default=640)
+    parser.add_argument("--alto", type=int, default=480)
+    parser.add_argument("--videos", type=int, default=4, help="Videos distintos a generar")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--concurrencias", default="1,4,16",
+                        help="Concurrencias de los endpoints separadas por coma")
+    parser.add_argument("--videos-secuencia", type=int, default=3,
+                        help="Videos por request en /predict-sequence")
+    parser.add_argument("--glosas", type=int, default=3, help="Glosas por frase de T5")
+    parser.add_argument("--solo", choices=("funciones", "endpoints"))
+    parser.add_argument("--con-cache", action="store_true",
+                        help="No desactivar las caches de resultados y frases")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+    args.concurrencias = [int(c) for c in args.concurrencias.split(",")]
+
+    # Sin caches cada request repite el trabajo completo (debe definirse antes de importar api)
+    if not args.con_cache:
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+        os.environ["T5_CACHE_SIZE"] = "0"
+        os.environ["REDIS_ENABLED"] = "false"
+
+    import api
+
+    with tempfile.TemporaryDirectory(prefix="lsc-bench-") as directorio:
+        print(f"🎬 Generando {args.videos} videos de {args.frames} frames {args.ancho}x{args.alto}...")
+        videos = []
+        for i in range(args.videos):
+            path = os.path.join(directorio, f"video_{i}.mp4")
+            generar_video_sintetico(path, args.frames, args.ancho, args.alto, semilla=i)
+            videos.append(path)
+
+        resultados = {"metadatos": metadatos(args)}
+        if args.solo != "endpoints":
+            api.registro_modelos.precargar("clasificador", "t5")
+            resultados["funciones"] = bench_funciones(api, videos, args)
+        if args.solo != "funciones":
+            resultados["endpoints"] = asyncio.run(bench_endpoints(api, videos, args))
+
+    print(json.dumps({k: v for k, v in resultados.items() if k != "metadatos"}, indent=2))
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\n💾 Resultados guardados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar) as f:
+            comparar(resultados, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Caches en memoria y en Redis
+Resultados por contenido del video (hash de los bytes subidos) para no
+volver a decodificar ni inferir cuando el mismo archivo se reenvía
+"""
+
+import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+
+class CacheLRU:
+    """
+    Cache LRU thread-safe con TTL opcional y contadores de aciertos/fallos
+    max_items <= 0 desactiva la cache; ttl_segundos <= 0 significa sin expiración
+    """
+
+    def __init__(self, max_items: int, ttl_segundos: float = 0):
+        self.max_items = max_items
+        self.ttl = ttl_segundos
+        self._datos: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            expira, valor = entrada
+            if expira and expira < time.monotonic():
+                del self._datos[clave]
+                self.misses += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any):
+        if self.max_items <= 0:
+            return
+        expira = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            self._datos[clave] = (expira, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def estado(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._datos),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def _serializar_keypoints(keypoints: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, keypoints, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _deserializar_keypoints(datos: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(datos), allow_pickle=False)
+
+
+class CacheResultados:
+    """
+    Cache de resultados por hash del video en dos niveles: LRU local y Redis opcional
+
+    Guarda por separado:
+    - keypoints (30, 126): dependen solo de la configuración de extracción
+    - predicción (palabra, confianza): dependen además de la versión del modelo
+    Así un cambio de modelo reutiliza los keypoints sin volver a decodificar.
+    """
+
+    PREFIJO = "lsc"
+
+    def __init__(
+        self,
+        max_items: int,
+        ttl_segundos: int,
+        version_extraccion: str,
+        version_modelo: str,
+        redis_cliente=None
+    ):
+        self.local = CacheLRU(max_items, ttl_segundos)
+        self.ttl = ttl_segundos
+        self.version_extraccion = version_extraccion
+        self.version_modelo = version_modelo
+        self.redis = redis_cliente
+        self.hits = 0
+        self.hits_keypoints = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.redis_errores = 0
+
+    def _clave_keypoints(self, digest: str) -> str:
+        return f"{self.PREFIJO}:kp:{self.version_extraccion}:{digest}"
+
+    def _clave_prediccion(self, digest: str) -> str:
+        return f"{self.PREFIJO}:pred:{self.version_extraccion}:{self.version_modelo}:{digest}"
+
+    async def obtener(self, digest: str) -> Tuple[Optional[np.ndarray], Optional[tuple]]:
+        """
+        Retorna (keypoints, (palabra, confianza)); cualquiera puede ser None
+        La predicción solo se retorna si también están los keypoints
+        """
+        clave_kp = self._clave_keypoints(digest)
+        clave_pred = self._clave_prediccion(digest)
+
+        keypoints = self.local.obtener(clave_kp)
+        prediccion = self.local.obtener(clave_pred) if keypoints is not None else None
+        if keypoints is not None and prediccion is not None:
+            self.hits += 1
+            return keypoints, prediccion
+
+        if self.redis is not None:
+            try:
+                datos_kp, datos_pred = await self.redis.mget(clave_kp, clave_pred)
+            except Exception as e:
+                self.redis_errores += 1
+                print(f"⚠️  Error leyendo cache Redis: {e}")
+                datos_kp = datos_pred = None
+
+            if keypoints is None and datos_kp is not None:
+                keypoints = _deserializar_keypoints(datos_kp)
+                self.local.guardar(clave_kp, keypoints)
+                self.redis_hits += 1
+            if keypoints is not None and prediccion is None and datos_pred is not None:
+                palabra, confianza = datos_pred.decode("utf-8").rsplit("\t", 1)
+                prediccion = (palabra, float(confianza))
+                self.local.guardar(clave_pred, prediccion)
+
+        if keypoints is None:
+            self.misses += 1
+            return None, None
+        if prediccion is None:
+            self.hits_keypoints += 1
+        else:
+            self.hits += 1
+        return keypoints, prediccion
+
+    async def guardar(self, digest: str, keypoints: np.ndarray, prediccion: Optional[tuple]):
+        clave_kp = self._clave_keypoints(digest)
+        clave_pred = self._clave_prediccion(digest)
+
+        self.local.guardar(clave_kp, keypoints)
+        if prediccion is not None:
+            self.local.guardar(clave_pred, prediccion)
+
+        if self.redis is None:
+            return
+        try:
+            ttl = self.ttl if self.ttl > 0 else None
+            pipe = self.redis.pipeline()
+            pipe.set(clave_kp, _serializar_keypoints(keypoints), ex=ttl)
+            if prediccion is not None:
+                palabra, confianza = prediccion
+                pipe.set(clave_pred, f"{palabra}\t{confianza!r}".encode("utf-8"), ex=ttl)
+            await pipe.execute()
+        except Exception as e:
+            self.redis_errores += 1
+            print(f"⚠️  Error escribiendo cache Redis: {e}")
+
+    def estado(self) -> dict:
+        total = self.hits + self.hits_keypoints + self.misses
+        return {
+            "items": len(self.local),
+            "max_items": self.local.max_items,
+            "hits": self.hits,
+            "hits_keypoints": self.hits_keypoints,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "redis": self.redis is not None,
+            "redis_hits": self.redis_hits,
+            "redis_errores": self.redis_errores,
+        }
+
+
+def crear_cliente_redis(host: str, port: int, db: int):
+    """
+    Cliente asyncio de Redis o None si el paquete redis no está instalado
+    """
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        print("⚠️  Paquete 'redis' no instalado, se usa solo la cache local")
+        return None
+    return redis_asyncio.Redis(host=host, port=port, db=db)
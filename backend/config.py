@@ -0,0 +1,259 @@
+"""
+Configuración de la aplicación
+Carga variables de entorno y proporciona valores por defecto
+"""
+
+import os
+from pathlib import Path
+from typing import List
+
+
+class Settings:
+    """Configuración de la aplicación"""
+    
+    # Paths
+    BASE_DIR: Path = Path(__file__).resolve().parent
+    MODELS_PATH: Path = BASE_DIR / os.getenv("MODELS_PATH", "models")
+    
+    # API
+    API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT: int = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS: int = int(os.getenv("API_WORKERS", "4"))
+    
+    # CORS
+    CORS_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "*").split(",")
+    
+    # Upload
+    MAX_UPLOAD_SIZE_MB: int = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
+    # Tamaño máximo del body completo (varios videos en /predict-sequence)
+    MAX_REQUEST_SIZE_MB: int = int(os.getenv("MAX_REQUEST_SIZE_MB", "200"))
+    # Directorio de los temporales (ej. /dev/shm para usar RAM); vacío = default del sistema
+    UPLOAD_TMP_DIR: str = os.getenv("UPLOAD_TMP_DIR") or None
+    
+    # Procesamiento
+    MAX_FRAMES_PER_VIDEO: int = int(os.getenv("MAX_FRAMES_PER_VIDEO", "30"))
+    # "uniforme": 30 índices repartidos en todo el clip (solo se decodifican esos)
+    # "intervalo": muestreo original, lee todos los frames desde el inicio
+    FRAME_SAMPLING: str = os.getenv("FRAME_SAMPLING", "uniforme").lower()
+    # Saltos de al menos N frames se hacen con seek (0 = solo grab/retrieve)
+    FRAME_SEEK_MIN_GAP: int = int(os.getenv("FRAME_SEEK_MIN_GAP", "0"))
+    # Slot de cada mano en el vector de 126: "deteccion" (orden de MediaPipe, como
+    # en el entrenamiento) o "lateralidad" (izquierda siempre primero)
+    ASIGNACION_MANOS: str = os.getenv("ASIGNACION_MANOS", "deteccion").lower()
+    # Decodificación: "opencv" o "pyav" (FFmpeg con hilos, escala y RGB en el decoder;
+    # requiere el paquete av). DECODE_MAX_SIDE limita el lado mayor del frame que
+    # recibe MediaPipe (0 = resolución original); DECODE_THREADS por video (0 = auto)
+    DECODE_BACKEND: str = os.getenv("DECODE_BACKEND", "opencv").lower()
+    DECODE_MAX_SIDE: int = int(os.getenv("DECODE_MAX_SIDE", "0"))
+    DECODE_THREADS: int = int(os.getenv("DECODE_THREADS", "1"))
+    # Frames decodificados por adelantado en un hilo aparte mientras MediaPipe procesa
+    # el actual; conviene con cores libres (VIDEO_PROCESS_WORKERS < cores).
+    # 0 = decodificar y trackear en el mismo hilo
+    DECODE_PIPELINE_QUEUE: int = int(os.getenv("DECODE_PIPELINE_QUEUE", "0"))
+    # Compuerta de movimiento: si un frame muestreado difiere del último procesado
+    # menos de MOTION_GATE_THRESHOLD (diferencia media en niveles de gris 0-255 sobre
+    # una miniatura de MOTION_GATE_SIDE px) se reusan sus keypoints sin correr MediaPipe.
+    # IDLE_TRIM_THRESHOLD recorta la quietud del inicio y del final antes de muestrear
+    # los 30 frames (una pasada extra de decodificación). 0 = desactivado
+    MOTION_GATE_THRESHOLD: float = float(os.getenv("MOTION_GATE_THRESHOLD", "0"))
+    MOTION_GATE_SIDE: int = int(os.getenv("MOTION_GATE_SIDE", "32"))
+    IDLE_TRIM_THRESHOLD: float = float(os.getenv("IDLE_TRIM_THRESHOLD", "0"))
+    CONFIDENCE_THRESHOLD: float = float(os.getenv("CONFIDENCE_THRESHOLD", "0.7"))
+    
+    # Inferencia (pool de hilos fuera del event loop)
+    INFERENCE_THREADS: int = int(os.getenv("INFERENCE_THREADS", "4"))
+    INFERENCE_QUEUE_SIZE: int = int(os.getenv("INFERENCE_QUEUE_SIZE", "8"))
+    INFERENCE_RETRY_AFTER_SECONDS: int = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "2"))
+    
+    # Carga de modelos: en segundo plano (la API arranca y /ready indica cuándo
+    # puede atender) o bloqueando el startup hasta que todos estén cargados
+    MODELS_BLOCKING_STARTUP: bool = os.getenv("MODELS_BLOCKING_STARTUP", "false").lower() == "true"
+    # Cargar T5 al importar la app (gunicorn preload_app: pesos compartidos entre workers)
+    PRELOAD_MODELS: bool = os.getenv("PRELOAD_MODELS", "false").lower() == "true"
+    
+    # Backends de inferencia: clasificador keras|tflite|onnx, T5 pytorch|int8|onnx
+    # (si el backend del clasificador se aparta de Keras más de CLASSIFIER_MAX_DRIFT
+    # en alguna probabilidad, se descarta y se usa keras)
+    CLASSIFIER_BACKEND: str = os.getenv("CLASSIFIER_BACKEND", "keras").lower()
+    CLASSIFIER_THREADS: int = int(os.getenv("CLASSIFIER_THREADS", "1"))
+    CLASSIFIER_MAX_DRIFT: float = float(os.getenv("CLASSIFIER_MAX_DRIFT", "0.02"))
+    T5_BACKEND: str = os.getenv("T5_BACKEND", "pytorch").lower()
+    
+    # Decodificación de T5: perfil rapido (greedy) | equilibrado (2 beams) | calidad (4 beams),
+    # largo máximo T5_TOKENS_BASE + T5_TOKENS_POR_GLOSA por glosa (tope T5_MAX_NEW_TOKENS)
+    T5_PROFILE: str = os.getenv("T5_PROFILE", "calidad").lower()
+    T5_MAX_NEW_TOKENS: int = int(os.getenv("T5_MAX_NEW_TOKENS", "50"))
+    T5_TOKENS_BASE: int = int(os.getenv("T5_TOKENS_BASE", "8"))
+    T5_TOKENS_POR_GLOSA: int = int(os.getenv("T5_TOKENS_POR_GLOSA", "6"))
+    # Espera máxima por la frase en /predict-sequence; al vencer se unen las glosas (0 = sin límite)
+    T5_LATENCY_BUDGET_MS: float = float(os.getenv("T5_LATENCY_BUDGET_MS", "0"))
+    # Micro-batching de T5 entre requests concurrentes
+    T5_BATCH_MAX_SIZE: int = int(os.getenv("T5_BATCH_MAX_SIZE", "8"))
+    T5_BATCH_MAX_WAIT_MS: float = float(os.getenv("T5_BATCH_MAX_WAIT_MS", "10"))
+    
+    # Micro-batching del clasificador LSTM entre requests concurrentes
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "16"))
+    BATCH_MAX_WAIT_MS: float = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+    
+    # Pool de procesos para decodificación + MediaPipe (0 = usar el pool de hilos)
+    # Con gunicorn es el total del servidor, repartido entre workers (al menos 1 cada uno)
+    VIDEO_PROCESS_WORKERS: int = int(os.getenv("VIDEO_PROCESS_WORKERS", "2"))
+    VIDEO_PROCESS_QUEUE_SIZE: int = int(os.getenv("VIDEO_PROCESS_QUEUE_SIZE", "16"))
+    
+    # Instancias MediaPipe Hands pre-calentadas cuando se extrae en hilos
+    HANDS_POOL_SIZE: int = int(os.getenv("HANDS_POOL_SIZE", str(API_WORKERS)))
+    
+    # Streaming por WebSocket: predecir cada N frames con la ventana llena
+    WS_PREDICT_EVERY: int = int(os.getenv("WS_PREDICT_EVERY", "5"))
+    
+    # Frases en un solo video (/predict-sentence): keypoints de todos los frames a
+    # SENTENCE_FPS (hasta SENTENCE_MAX_SECONDS), señas separadas por pausas de al menos
+    # SENTENCE_MIN_PAUSE_SECONDS sin manos o con movimiento bajo SENTENCE_MOTION_THRESHOLD
+    # (desplazamiento medio de los landmarks por segundo, coordenadas normalizadas).
+    # Las señas de más de SENTENCE_MAX_SIGN_SECONDS se recorren con ventanas deslizantes
+    SENTENCE_FPS: float = float(os.getenv("SENTENCE_FPS", "15"))
+    SENTENCE_MAX_SECONDS: float = float(os.getenv("SENTENCE_MAX_SECONDS", "60"))
+    SENTENCE_MOTION_THRESHOLD: float = float(os.getenv("SENTENCE_MOTION_THRESHOLD", "0.08"))
+    SENTENCE_MIN_PAUSE_SECONDS: float = float(os.getenv("SENTENCE_MIN_PAUSE_SECONDS", "0.3"))
+    SENTENCE_MIN_SIGN_SECONDS: float = float(os.getenv("SENTENCE_MIN_SIGN_SECONDS", "0.4"))
+    SENTENCE_MAX_SIGN_SECONDS: float = float(os.getenv("SENTENCE_MAX_SIGN_SECONDS", "2.5"))
+    SENTENCE_WINDOW_STRIDE_SECONDS: float = float(os.getenv("SENTENCE_WINDOW_STRIDE_SECONDS", "0.5"))
+    
+    # Máximo de secuencias por request en /predict-keypoints/batch
+    KEYPOINTS_BATCH_MAX: int = int(os.getenv("KEYPOINTS_BATCH_MAX", "256"))
+    
+    # Trabajos por lotes (/jobs): base SQLite y videos subidos en JOBS_DIR
+    JOBS_DIR: Path = BASE_DIR / os.getenv("JOBS_DIR", "jobs")
+    # Procesos de extracción dedicados a los trabajos (0 = todos los cores; se suman a
+    # VIDEO_PROCESS_WORKERS, así que conviene pocos). Con gunicorn es el total del
+    # servidor: post_fork lo reparte entre los workers, como VIDEO_PROCESS_WORKERS
+    JOBS_WORKERS: int = int(os.getenv("JOBS_WORKERS", "1"))
+    # Secuencias por llamada al clasificador
+    JOBS_BATCH_SIZE: int = int(os.getenv("JOBS_BATCH_SIZE", "32"))
+    JOBS_MAX_VIDEOS: int = int(os.getenv("JOBS_MAX_VIDEOS", "10000"))
+    # Directorio del servidor desde el que se pueden encolar carpetas o archivos
+    # .zip/.tar (vacío = solo videos subidos)
+    JOBS_INPUT_ROOT: str = os.getenv("JOBS_INPUT_ROOT", "")
+    # Cada cuánto se buscan trabajos en cola de otros workers
+    JOBS_POLL_SECONDS: float = float(os.getenv("JOBS_POLL_SECONDS", "5"))
+    
+    # Almacén de keypoints extraídos (shards .npy + índice JSONL) para re-evaluar
+    # modelos nuevos con rescore.py sin decodificar de nuevo (vacío = desactivado)
+    FEATURE_STORE_DIR: str = os.getenv("FEATURE_STORE_DIR", "")
+    FEATURE_STORE_SHARD_SIZE: int = int(os.getenv("FEATURE_STORE_SHARD_SIZE", "4096"))
+    
+    # GPU
+    USE_GPU: bool = os.getenv("USE_GPU", "false").lower() == "true"
+    CUDA_VISIBLE_DEVICES: str = os.getenv("CUDA_VISIBLE_DEVICES", "0")
+    
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE: Path = BASE_DIR / os.getenv("LOG_FILE", "logs/api.log")
+    
+    # Seguridad (opcional)
+    # API_KEY: una o varias claves separadas por coma, enviadas en X-API-Key o
+    # Authorization: Bearer (vacío = sin autenticación)
+    API_KEY: str = os.getenv("API_KEY", "")
+    # Token bucket por cliente (API key o IP): RATE_LIMIT_PER_MINUTE videos por minuto
+    # con ráfagas de hasta RATE_LIMIT_BURST (una secuencia de N videos cuesta N)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+    RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "10"))
+    # Sin API key el cliente es su IP: detrás de un proxy (nginx, Coolify) hay que
+    # confiar en su X-Forwarded-For listando su IP aquí ("*" si solo se llega por el proxy)
+    FORWARDED_ALLOW_IPS: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+    
+    # Admisión: videos en proceso a la vez por worker (0 = capacidad del pool de videos);
+    # las requests que no entran esperan hasta ADMISSION_MAX_WAIT_MS en una cola de
+    # ADMISSION_QUEUE_SIZE y luego reciben 429 con Retry-After
+    ADMISSION_MAX_UNITS: int = int(os.getenv("ADMISSION_MAX_UNITS", "0"))
+    ADMISSION_MAX_WAIT_MS: float = float(os.getenv("ADMISSION_MAX_WAIT_MS", "2000"))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+    
+    # Cache (opcional)
+    REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
+    REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
+    REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    REDIS_ENABLED: bool = os.getenv("REDIS_ENABLED", "false").lower() == "true"
+    # Resultados por hash del video en memoria del proceso (0 = desactivado)
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+    # Frases generadas por T5 por secuencia de glosas (0 = desactivado)
+    T5_CACHE_SIZE: int = int(os.getenv("T5_CACHE_SIZE", "1024"))
+    T5_CACHE_TTL_SECONDS: int = int(os.getenv("T5_CACHE_TTL_SECONDS", "86400"))
+    
+    # Monitoring (opcional)
+    SENTRY_DSN: str = os.getenv("SENTRY_DSN", "")
+    PROMETHEUS_ENABLED: bool = os.getenv("PROMETHEUS_ENABLED", "false").lower() == "true"
+    # Header Server-Timing con la duración de cada etapa (upload, decodificacion, mediapipe, lstm, t5)
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    
+    @classmethod
+    def validate(cls):
+        """Valida que la configuración sea correcta"""
+        if not cls.MODELS_PATH.exists():
+            raise FileNotFoundError(f"Carpeta de modelos no encontrada: {cls.MODELS_PATH}")
+        
+        required_files = [
+            cls.MODELS_PATH / "mejor_modelo_lsc.h5",
+            cls.MODELS_PATH / "config.pkl",
+            cls.MODELS_PATH / "labels_dict.pkl"
+        ]
+        
+        for file in required_files:
+            if not file.exists():
+                raise FileNotFoundError(f"Archivo requerido no encontrado: {file}")
+        
+        print("✅ Configuración validada correctamente")
+    
+    @classmethod
+    def summary(cls):
+        """Muestra un resumen de la configuración"""
+        print("\n" + "="*60)
+        print("⚙️  CONFIGURACIÓN DE LA API")
+        print("="*60)
+        print(f"🌐 Host: {cls.API_HOST}:{cls.API_PORT}")
+        print(f"👷 Workers: {cls.API_WORKERS} (precarga {'sí' if cls.PRELOAD_MODELS else 'no'})")
+        print(f"📁 Modelos: {cls.MODELS_PATH}")
+        print(f"🎬 Max frames: {cls.MAX_FRAMES_PER_VIDEO} (muestreo {cls.FRAME_SAMPLING})")
+        print(f"🎞️  Decodificación: {cls.DECODE_BACKEND} (lado máximo {cls.DECODE_MAX_SIDE or 'original'}, "
+              f"cola {cls.DECODE_PIPELINE_QUEUE or 'sin hilo'})")
+        print(f"🚦 Compuerta de movimiento: {cls.MOTION_GATE_THRESHOLD or 'no'}, "
+              f"recorte de quietud: {cls.IDLE_TRIM_THRESHOLD or 'no'}")
+        print(f"📊 Threshold: {cls.CONFIDENCE_THRESHOLD}")
+        print(f"🧵 Inferencia: {cls.INFERENCE_THREADS} hilos, cola {cls.INFERENCE_QUEUE_SIZE}")
+        print(f"🎞️  Procesos de video: {cls.VIDEO_PROCESS_WORKERS}")
+        print(f"🧠 Backends: clasificador {cls.CLASSIFIER_BACKEND}, T5 {cls.T5_BACKEND}")
+        print(f"📦 Batching: hasta {cls.BATCH_MAX_SIZE} secuencias / {cls.BATCH_MAX_WAIT_MS} ms")
+        print(f"🗂️  Trabajos: {cls.JOBS_DIR} ({cls.JOBS_WORKERS or 'todos los'} procesos)")
+        print(f"🔐 API key: {'sí' if cls.API_KEY else 'no'}, límite por cliente: "
+              f"{f'{cls.RATE_LIMIT_PER_MINUTE}/min' if cls.RATE_LIMIT_ENABLED else 'no'}")
+        print(f"🖥️  GPU: {'Activada' if cls.USE_GPU else 'Desactivada'}")
+        print(f"📝 Log level: {cls.LOG_LEVEL}")
+        print("="*60 + "\n")
+
+
+# Instancia global de configuración
+settings = Settings()
+
+
+# Cargar .env si existe
+def load_env():
+    """Carga variables de entorno desde archivo .env"""
+    env_file = Settings.BASE_DIR / ".env"
+    if env_file.exists():
+        from dotenv import load_dotenv
+        load_dotenv(env_file)
+        print(f"✅ Variables de entorno cargadas desde {env_file}")
+    else:
+        print("⚠️  Archivo .env no encontrado, usando valores por defecto")
+
+
+if __name__ == "__main__":
+    # Test de configuración
+    load_env()
+    settings.summary()
+    try:
+        settings.validate()
+    except FileNotFoundError as e:
+        print(f"❌ Error de validación: {e}")
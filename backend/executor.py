@@ -0,0 +1,128 @@
+"""
+Ejecutor de inferencia acotado
+Saca el trabajo pesado (OpenCV, MediaPipe, TensorFlow, T5) del event loop
+y aplica backpressure cuando hay demasiados trabajos pendientes
+"""
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class ColaSaturadaError(Exception):
+    """El ejecutor no admite más trabajos (en curso + en cola)"""
+
+    def __init__(self, nombre: str, retry_after: int):
+        super().__init__(f"Servidor ocupado ({nombre}), reintente en {retry_after}s")
+        self.nombre = nombre
+        self.retry_after = retry_after
+
+
+class EjecutorInferencia:
+    """
+    Envuelve un Executor limitando los trabajos en curso más los que esperan.
+    El contador solo se modifica desde el event loop, por eso no necesita lock.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        max_workers: int,
+        max_cola: int,
+        nombre: str = "inferencia",
+        retry_after: int = 2
+    ):
+        self._executor = executor
+        self.max_workers = max_workers
+        self.max_cola = max_cola
+        self.nombre = nombre
+        self.retry_after = retry_after
+        self._pendientes = 0
+
+    @property
+    def capacidad(self) -> int:
+        return self.max_workers + self.max_cola
+
+    @property
+    def pendientes(self) -> int:
+        """Trabajos admitidos que aún no terminan (ejecutando + en cola)"""
+        return self._pendientes
+
+    @property
+    def disponibles(self) -> int:
+        """Trabajos que aún se pueden admitir sin saturar"""
+        return max(0, self.capacidad - self._pendientes)
+
+    @property
+    def en_cola(self) -> int:
+        return max(0, self._pendientes - self.max_workers)
+
+    def estado(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "pendientes": self._pendientes,
+            "en_cola": self.en_cola,
+            "capacidad": self.capacidad,
+        }
+
+    async def ejecutar(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecuta fn(*args, **kwargs) en el pool y espera su resultado.
+        Lanza ColaSaturadaError sin encolar si se alcanzó la capacidad.
+        """
+        if self._pendientes >= self.capacidad:
+            raise ColaSaturadaError(self.nombre, self.retry_after)
+
+        loop = asyncio.get_running_loop()
+        futuro = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        self._pendientes += 1
+        # Se descuenta cuando el pool termina el trabajo, no cuando se deja de esperar:
+        # si se cancela la request el hilo o proceso sigue ocupado hasta terminar
+        futuro.add_done_callback(functools.partial(self._terminado, loop))
+        return await asyncio.wrap_future(futuro, loop=loop)
+
+    def _terminado(self, loop: asyncio.AbstractEventLoop, futuro):
+        """Callback del pool (puede correr en otro hilo): descuenta desde el event loop"""
+        try:
+            loop.call_soon_threadsafe(self._descontar)
+        except RuntimeError:
+            # El event loop ya se cerró (apagado del servidor)
+            pass
+
+    def _descontar(self):
+        self._pendientes -= 1
+
+    def cerrar(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def crear_ejecutor_hilos(
+    max_workers: int,
+    max_cola: int,
+    nombre: str = "inferencia",
+    retry_after: int = 2
+) -> EjecutorInferencia:
+    """Ejecutor respaldado por un ThreadPoolExecutor (TF y MediaPipe liberan el GIL)"""
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=nombre)
+    return EjecutorInferencia(pool, max_workers, max_cola, nombre, retry_after)
+
+
+def crear_ejecutor_procesos(
+    max_workers: int,
+    max_cola: int,
+    nombre: str = "videos",
+    retry_after: int = 2,
+    initializer: Optional[Callable[[], None]] = None
+) -> EjecutorInferencia:
+    """
+    Ejecutor respaldado por un ProcessPoolExecutor para trabajo que retiene el GIL
+    Usa "spawn" para que los hijos no hereden el estado de TensorFlow/torch
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer
+    )
+    return EjecutorInferencia(pool, max_workers, max_cola, nombre, retry_after)
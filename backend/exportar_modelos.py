@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Exporta los modelos a los backends optimizados y mide su deriva
+frente a los originales (Keras fp32 y T5 PyTorch fp32)
+
+Uso:
+    python exportar_modelos.py --tflite --onnx     # clasificador
+    python exportar_modelos.py --t5-onnx           # T5 con KV-cache
+    python exportar_modelos.py --validar-t5        # comparar frases fp32 / int8 / onnx
+    python exportar_modelos.py --todo
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+
+from backends import (
+    RUTA_ONNX, RUTA_T5_ONNX, RUTA_TFLITE,
+    ClasificadorKeras, ClasificadorONNX, ClasificadorTFLite,
+    cargar_modelo_keras, cargar_t5_onnx, convertir_tflite, cuantizar_t5,
+    exportar_onnx, keypoints_validacion, medir_deriva
+)
+
+
+RUTA_H5 = "models/mejor_modelo_lsc.h5"
+RUTA_T5 = "models/t5-lsc-finetuned"
+
+
+def medir_latencia(fn, *args, repeticiones: int = 20) -> float:
+    """Mediana en ms de fn(*args) (tras una llamada de calentamiento)"""
+    fn(*args)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn(*args)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.median(tiempos))
+
+
+def reportar_clasificador(nombre: str, referencia, candidato, keypoints: np.ndarray, ruta: str):
+    deriva = medir_deriva(referencia, candidato, keypoints)
+    print(f"   Tamaño: {os.path.getsize(ruta) / 1024:.1f} KB")
+    print(f"   Deriva máx: {deriva['max_diferencia']:.5f} | acuerdo top-1: {deriva['acuerdo_top1']:.1%}")
+    for n in (1, 16):
+        lote = keypoints[:n]
+        print(
+            f"   Latencia lote {n}: keras {medir_latencia(referencia, lote):.2f} ms | "
+            f"{nombre} {medir_latencia(candidato, lote):.2f} ms"
+        )
+
+
+def exportar_clasificador(tflite: bool, onnx: bool):
+    print("🔄 Cargando modelo Keras...")
+    modelo = cargar_modelo_keras(RUTA_H5)
+    with open("models/config.pkl", "rb") as f:
+        config = pickle.load(f)
+    forma = (config["max_length"], config["num_features"])
+
+    referencia = ClasificadorKeras(modelo, *forma)
+    keypoints = keypoints_validacion(*forma)
+
+    if tflite:
+        print(f"\n📦 TFLite (int8 rango dinámico) -> {RUTA_TFLITE}")
+        with open(RUTA_TFLITE, "wb") as f:
+            f.write(convertir_tflite(modelo, *forma))
+        with open(RUTA_TFLITE, "rb") as f:
+            candidato = ClasificadorTFLite(f.read())
+        reportar_clasificador("tflite", referencia, candidato, keypoints, RUTA_TFLITE)
+
+    if onnx:
+        print(f"\n📦 ONNX -> {RUTA_ONNX}")
+        exportar_onnx(modelo, RUTA_ONNX, *forma)
+        candidato = ClasificadorONNX(RUTA_ONNX)
+        reportar_clasificador("onnx", referencia, candidato, keypoints, RUTA_ONNX)
+
+
+def exportar_t5_onnx():
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import T5Tokenizer
+
+    print(f"\n📦 T5 ONNX con KV-cache -> {RUTA_T5_ONNX}")
+    modelo = ORTModelForSeq2SeqLM.from_pretrained(RUTA_T5, export=True, use_cache=True)
+    modelo.save_pretrained(RUTA_T5_ONNX)
+    T5Tokenizer.from_pretrained(RUTA_T5).save_pretrained(RUTA_T5_ONNX)
+    print("   ✓ Exportado")
+
+
+def validar_t5(max_frases: int = 20):
+    """Compara las frases de T5 fp32 con int8 y ONNX (si fue exportado)"""
+    from transformers import T5ForConditionalGeneration, T5Tokenizer
+
+    from api import PERFILES_T5, tokens_maximos
+    from config import settings
+
+    tokenizer = T5Tokenizer.from_pretrained(RUTA_T5)
+    fp32 = T5ForConditionalGeneration.from_pretrained(RUTA_T5)
+    candidatos = {"int8": cuantizar_t5(fp32)}
+    if os.path.isdir(RUTA_T5_ONNX):
+        candidatos["onnx"] = cargar_t5_onnx()
+
+    # Secuencias de glosas armadas con pares de palabras del vocabulario
+    with open("models/labels_dict.pkl", "rb") as f:
+        palabras = sorted(pickle.load(f).values())
+    secuencias = [
+        f"{palabras[i].upper()} {palabras[(i * 7 + 3) % len(palabras)].upper()}"
+        for i in range(min(max_frases, len(palabras)))
+    ]
+
+    def generar(modelo, glosas):
+        inputs = tokenizer(f"translate gloss to text: {glosas}", return_tensors="pt")
+        salida = modelo.generate(
+            inputs.input_ids,
+            max_new_tokens=tokens_maximos(len(glosas.split())),
+            **PERFILES_T5[settings.T5_PROFILE]
+        )
+        return tokenizer.decode(salida[0], skip_special_tokens=True)
+
+    print(f"\n🔍 Validando T5 en {len(secuencias)} secuencias de glosas (perfil {settings.T5_PROFILE})")
+    referencia = [generar(fp32, glosas) for glosas in secuencias]
+    latencia_fp32 = medir_latencia(generar, fp32, secuencias[0], repeticiones=5)
+    print(f"   pytorch fp32: {latencia_fp32:.1f} ms/frase")
+
+    for nombre, modelo in candidatos.items():
+        frases = [generar(modelo, glosas) for glosas in secuencias]
+        iguales = sum(a == b for a, b in zip(referencia, frases))
+        latencia = medir_latencia(generar, modelo, secuencias[0], repeticiones=5)
+        print(
+            f"   {nombre}: {latencia:.1f} ms/frase | "
+            f"frases idénticas a fp32: {iguales}/{len(secuencias)}"
+        )
+        diferentes = [
+            (glosas, esperada, obtenida)
+            for glosas, esperada, obtenida in zip(secuencias, referencia, frases)
+            if esperada != obtenida
+        ]
+        for glosas, esperada, obtenida in diferentes[:5]:
+            print(f"      {glosas}: '{esperada}' -> '{obtenida}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar y validar backends optimizados")
+    parser.add_argument("--tflite", action="store_true", help="Clasificador a TFLite int8")
+    parser.add_argument("--onnx", action="store_true", help="Clasificador a ONNX (requiere tf2onnx)")
+    parser.add_argument("--t5-onnx", action="store_true", help="T5 a ONNX (requiere optimum)")
+    parser.add_argument("--validar-t5", action="store_true", help="Comparar frases fp32 / int8 / onnx")
+    parser.add_argument("--todo", action="store_true", help="Todas las anteriores")
+    args = parser.parse_args()
+
+    if args.todo:
+        args.tflite = args.onnx = args.t5_onnx = args.validar_t5 = True
+    if not (args.tflite or args.onnx or args.t5_onnx or args.validar_t5):
+        parser.print_help()
+        return
+
+    if args.tflite or args.onnx:
+        exportar_clasificador(args.tflite, args.onnx)
+    if args.t5_onnx:
+        exportar_t5_onnx()
+    if args.validar_t5:
+        validar_t5()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Almacén persistente de keypoints
+Guarda los (30, 126) extraídos de cada video, por hash de contenido, en shards
+.npy de tamaño fijo (se leen con memory-map) y un índice JSONL con los metadatos.
+Con un modelo nuevo se re-evalúa todo el historial (rescore.py) sin volver a
+decodificar ningún video.
+
+Cada proceso escribe sus propios shards e índice (prefijo host-pid-inicio), así
+que los workers de gunicorn y los procesos de trabajos no necesitan locks entre sí.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from keypoints import NUM_FEATURES, NUM_FRAMES
+
+
+def hash_archivo(ruta: str, bloque: int = 1024 * 1024) -> str:
+    """sha256 del archivo (mismo digest que calcula recibir_archivos al subirlo)"""
+    hasher = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        while True:
+            datos = f.read(bloque)
+            if not datos:
+                break
+            hasher.update(datos)
+    return hasher.hexdigest()
+
+
+class AlmacenKeypoints:
+    """
+    Escritor del almacén: agrega secuencias al shard abierto y una línea por
+    secuencia al índice de este proceso. El shard se crea con su tamaño final
+    (archivo disperso) y las filas válidas son las que figuran en el índice.
+
+    guardar() escribe a disco: desde el event loop se llama con asyncio.to_thread.
+    Las claves ya guardadas se leen de los índices de forma incremental (solo lo
+    agregado desde la última lectura) al abrir cada shard; lo que otro proceso
+    guarde entre medio puede repetirse, y leer_indice se queda con la más reciente
+    """
+
+    def __init__(self, directorio: str, filas_por_shard: int = 4096):
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.filas_por_shard = max(1, filas_por_shard)
+        self.prefijo = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+        self._lock = threading.Lock()
+        self._shard: Optional[np.memmap] = None
+        self._nombre_shard: Optional[str] = None
+        self._numero = 0
+        self._fila = 0
+        self._indice = None
+        # Claves (digest, version) ya guardadas y bytes ya leídos de cada índice
+        self._claves: Set[Tuple[str, str]] = set()
+        self._leidos: Dict[str, int] = {}
+        self.guardados = 0
+        self.repetidos = 0
+
+    def guardar(
+        self,
+        digest: str,
+        version: str,
+        keypoints: np.ndarray,
+        metadatos: Optional[dict] = None
+    ) -> bool:
+        """
+        Persiste una secuencia con sus metadatos (palabra, confianza, modelo, archivo...)
+        Retorna False si ese contenido ya estaba guardado con la misma versión de extracción
+        """
+        if keypoints.shape != (NUM_FRAMES, NUM_FEATURES):
+            raise ValueError(f"Shape incorrecto: {keypoints.shape}, esperado (30, 126)")
+
+        with self._lock:
+            shard_nuevo = self._shard is None or self._fila >= self.filas_por_shard
+            if shard_nuevo:
+                self._actualizar_claves()
+            if (digest, version) in self._claves:
+                self.repetidos += 1
+                return False
+
+            if shard_nuevo:
+                self._abrir_shard()
+            self._shard[self._fila] = keypoints
+            entrada = {
+                "digest": digest,
+                "version": version,
+                "shard": self._nombre_shard,
+                "fila": self._fila,
+                "creado": time.time(),
+                **(metadatos or {}),
+            }
+            # La fila se escribe antes que su línea: una línea en el índice implica datos
+            self._indice.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            self._indice.flush()
+            self._fila += 1
+            self._claves.add((digest, version))
+            self.guardados += 1
+        return True
+
+    def _actualizar_claves(self):
+        """Agrega las claves de las líneas completas escritas desde la última lectura"""
+        for ruta in glob.glob(os.path.join(self.directorio, "*.jsonl")):
+            desde = self._leidos.get(ruta, 0)
+            with open(ruta, "rb") as f:
+                f.seek(desde)
+                datos = f.read()
+            # Una línea sin salto final la está escribiendo otro proceso: queda para después
+            fin = datos.rfind(b"\n") + 1
+            for linea in datos[:fin].splitlines():
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                self._claves.add((entrada["digest"], entrada["version"]))
+            self._leidos[ruta] = desde + fin
+
+    def _abrir_shard(self):
+        if self._shard is not None:
+            self._shard.flush()
+        self._numero += 1
+        self._nombre_shard = f"{self.prefijo}-{self._numero:05d}.npy"
+        self._shard = np.lib.format.open_memmap(
+            os.path.join(self.directorio, self._nombre_shard),
+            mode="w+",
+            dtype=np.float32,
+            shape=(self.filas_por_shard, NUM_FRAMES, NUM_FEATURES)
+        )
+        self._fila = 0
+        if self._indice is None:
+            self._indice = open(
+                os.path.join(self.directorio, f"{self.prefijo}.jsonl"), "a", encoding="utf-8"
+            )
+
+    def cerrar(self):
+        with self._lock:
+            if self._shard is not None:
+                self._shard.flush()
+                self._shard = None
+            if self._indice is not None:
+                self._indice.close()
+                self._indice = None
+
+    def estado(self) -> dict:
+        return {
+            "directorio": self.directorio,
+            "guardados": self.guardados,
+            "repetidos": self.repetidos,
+            "shard_actual": self._nombre_shard,
+        }
+
+
+def leer_indice(directorio: str, version: Optional[str] = None) -> List[dict]:
+    """
+    Entradas de todos los índices del almacén, una por (digest, version) (la más reciente)
+    Ignora líneas truncadas por un proceso que murió a mitad de escritura
+    """
+    entradas: Dict[Tuple[str, str], dict] = {}
+    for ruta in sorted(glob.glob(os.path.join(directorio, "*.jsonl"))):
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                if version is not None and entrada["version"] != version:
+                    continue
+                clave = (entrada["digest"], entrada["version"])
+                if clave not in entradas or entrada["creado"] >= entradas[clave]["creado"]:
+                    entradas[clave] = entrada
+    return sorted(entradas.values(), key=lambda e: (e["shard"], e["fila"]))
+
+
+def iterar_lotes(
+    directorio: str,
+    tamano_lote: int = 1024,
+    version: Optional[str] = None
+) -> Iterator[Tuple[List[dict], np.ndarray]]:
+    """
+    Recorre el almacén en lotes (entradas, keypoints (N, 30, 126) float32)
+    Cada shard se abre con memory-map y solo se copian las filas del lote
+    """
+    entradas = leer_indice(directorio, version)
+    por_shard: Dict[str, List[dict]] = {}
+    for entrada in entradas:
+        por_shard.setdefault(entrada["shard"], []).append(entrada)
+
+    pendientes: List[dict] = []
+    bloques: List[np.ndarray] = []
+    for nombre, del_shard in por_shard.items():
+        shard = np.load(os.path.join(directorio, nombre), mmap_mode="r")
+        for inicio in range(0, len(del_shard), tamano_lote):
+            parte = del_shard[inicio:inicio + tamano_lote]
+            pendientes.extend(parte)
+            bloques.append(np.asarray(shard[[e["fila"] for e in parte]], dtype=np.float32))
+            while len(pendientes) >= tamano_lote:
+                lote = np.concatenate(bloques)
+                yield pendientes[:tamano_lote], lote[:tamano_lote]
+                pendientes = pendientes[tamano_lote:]
+                bloques = [lote[tamano_lote:]]
+        del shard
+
+    if pendientes:
+        yield pendientes, np.concatenate(bloques)
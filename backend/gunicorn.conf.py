@@ -0,0 +1,62 @@
+"""
+Configuración de gunicorn para producción
+Varios workers uvicorn que comparten los pesos de T5: la app se importa una
+sola vez en el master (preload_app) y los workers la heredan copy-on-write
+al hacer fork, en vez de cargar N copias del modelo
+
+Uso: gunicorn -c gunicorn.conf.py api:app
+"""
+
+import gc
+import os
+import sys
+
+# Debe definirse antes de que se importe config/api en el master
+os.environ.setdefault("PRELOAD_MODELS", "true")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import settings
+
+
+bind = f"{settings.API_HOST}:{settings.API_PORT}"
+workers = settings.API_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# IPs de proxies cuyo X-Forwarded-For se usa como IP del cliente (límite por IP)
+forwarded_allow_ips = settings.FORWARDED_ALLOW_IPS
+
+# Los modelos del worker cargan en segundo plano, pero /predict-sequence
+# con varios videos puede tardar más que el default de 30s
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+loglevel = settings.LOG_LEVEL.lower()
+
+
+def pre_fork(server, worker):
+    # Mover los objetos del master a la generación permanente para que el GC
+    # de los workers no los recorra y no copie las páginas compartidas
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Limpiar los archivos de métricas del worker que terminó
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # Repartir los núcleos entre workers para que torch no sobresuscriba la CPU
+    workers = server.cfg.workers
+    if "torch" in sys.modules:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    # Los pools de procesos se configuran para todo el servidor y cada worker crea
+    # los suyos al arrancar: crear solo su parte para que el total no crezca con workers
+    if settings.VIDEO_PROCESS_WORKERS > 0:
+        settings.VIDEO_PROCESS_WORKERS = max(1, settings.VIDEO_PROCESS_WORKERS // workers)
+    settings.JOBS_WORKERS = max(1, (settings.JOBS_WORKERS or os.cpu_count() or 1) // workers)
@@ -0,0 +1,606 @@
+"""
+Trabajos por lotes
+Clasificación masiva de videos (subidos o de una carpeta/archivo del servidor)
+con estado y resultados en SQLite. Los videos se extraen en un pool de
+procesos propio y los keypoints se clasifican por lotes a medida que llegan.
+"""
+
+import asyncio
+import os
+import shutil
+import socket
+import sqlite3
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from executor import ColaSaturadaError, EjecutorInferencia, crear_ejecutor_procesos
+from feature_store import hash_archivo
+from keypoints import extraer_keypoints_con_estadisticas, inicializar_worker
+from metrics import metricas
+
+
+EXTENSIONES_VIDEO = (".mp4", ".mov", ".avi", ".mkv")
+EXTENSIONES_ARCHIVO = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# Estados de un trabajo
+EN_COLA = "en_cola"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+CANCELADO = "cancelado"
+FALLIDO = "error"
+
+# Estados de cada video
+PENDIENTE = "pendiente"
+LISTO = "listo"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    origen TEXT NOT NULL,
+    umbral REAL NOT NULL,
+    total INTEGER NOT NULL,
+    procesados INTEGER NOT NULL DEFAULT 0,
+    errores INTEGER NOT NULL DEFAULT 0,
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL,
+    propietario TEXT,
+    latido REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS videos (
+    trabajo_id TEXT NOT NULL,
+    posicion INTEGER NOT NULL,
+    archivo TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    palabra TEXT,
+    confianza REAL,
+    error TEXT,
+    PRIMARY KEY (trabajo_id, posicion)
+);
+CREATE INDEX IF NOT EXISTS trabajos_estado ON trabajos (estado, creado);
+"""
+
+
+class OrigenInvalidoError(ValueError):
+    """Ruta fuera de JOBS_INPUT_ROOT, inexistente o sin videos"""
+
+
+class AlmacenTrabajos:
+    """
+    Trabajos y resultados por video en SQLite (modo WAL)
+    Varios workers de gunicorn pueden compartir la misma base: cada trabajo
+    lo toma un solo proceso con un UPDATE condicional y lo mantiene con un
+    latido periódico; si el latido se detiene (reinicio, crash) vuelve a la cola
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
+
+    def crear(self, trabajo_id: str, origen: str, umbral: float, videos: List[Tuple[str, str]]):
+        """Registra un trabajo en cola con sus videos [(archivo, ruta)] en orden"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT INTO trabajos (id, estado, origen, umbral, total, creado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (trabajo_id, EN_COLA, origen, umbral, len(videos), time.time())
+            )
+            self._conexion.executemany(
+                "INSERT INTO videos (trabajo_id, posicion, archivo, ruta, estado) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (trabajo_id, posicion, archivo, ruta, PENDIENTE)
+                    for posicion, (archivo, ruta) in enumerate(videos, start=1)
+                ]
+            )
+
+    def obtener(self, trabajo_id: str) -> Optional[dict]:
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)
+            ).fetchone()
+        return dict(fila) if fila else None
+
+    def listar(self, limite: int = 50) -> List[dict]:
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT * FROM trabajos ORDER BY creado DESC LIMIT ?", (limite,)
+            ).fetchall()
+        return [dict(f) for f in filas]
+
+    def resultados(self, trabajo_id: str, desde: int = 0, limite: int = 1000) -> List[dict]:
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT posicion, archivo, estado, palabra, confianza, error FROM videos "
+                "WHERE trabajo_id = ? AND posicion > ? ORDER BY posicion LIMIT ?",
+                (trabajo_id, desde, limite)
+            ).fetchall()
+        return [dict(f) for f in filas]
+
+    def videos_pendientes(self, trabajo_id: str) -> List[Tuple[int, str, str]]:
+        """[(posicion, archivo, ruta)] de los videos aún sin resultado"""
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT posicion, archivo, ruta FROM videos WHERE trabajo_id = ? AND estado = ? "
+                "ORDER BY posicion",
+                (trabajo_id, PENDIENTE)
+            ).fetchall()
+        return [(f["posicion"], f["archivo"], f["ruta"]) for f in filas]
+
+    def tomar_siguiente(self, propietario: str) -> Optional[str]:
+        """Toma el trabajo en cola más antiguo; None si no hay o lo tomó otro proceso"""
+        with self._lock, self._conexion:
+            fila = self._conexion.execute(
+                "SELECT id FROM trabajos WHERE estado = ? ORDER BY creado LIMIT 1", (EN_COLA,)
+            ).fetchone()
+            if fila is None:
+                return None
+            cursor = self._conexion.execute(
+                "UPDATE trabajos SET estado = ?, propietario = ?, latido = ?, "
+                "iniciado = COALESCE(iniciado, ?) WHERE id = ? AND estado = ?",
+                (PROCESANDO, propietario, time.time(), time.time(), fila["id"], EN_COLA)
+            )
+        return fila["id"] if cursor.rowcount == 1 else None
+
+    def latir(self, trabajo_id: str) -> str:
+        """Renueva el latido del trabajo y retorna su estado actual"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "UPDATE trabajos SET latido = ? WHERE id = ? AND estado = ?",
+                (time.time(), trabajo_id, PROCESANDO)
+            )
+            fila = self._conexion.execute(
+                "SELECT estado FROM trabajos WHERE id = ?", (trabajo_id,)
+            ).fetchone()
+        return fila["estado"]
+
+    def recuperar_huerfanos(self, vencimiento_segundos: float) -> int:
+        """Devuelve a la cola los trabajos sin latido en vencimiento_segundos"""
+        with self._lock, self._conexion:
+            cursor = self._conexion.execute(
+                "UPDATE trabajos SET estado = ?, propietario = NULL "
+                "WHERE estado = ? AND latido < ?",
+                (EN_COLA, PROCESANDO, time.time() - vencimiento_segundos)
+            )
+        return cursor.rowcount
+
+    def guardar_resultados(self, trabajo_id: str, resultados: List[tuple]):
+        """resultados: [(posicion, palabra, confianza, error)] en una sola transacción"""
+        errores = sum(1 for r in resultados if r[3] is not None)
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "UPDATE videos SET estado = ?, palabra = ?, confianza = ?, error = ? "
+                "WHERE trabajo_id = ? AND posicion = ?",
+                [
+                    (FALLIDO if error else LISTO, palabra, confianza, error, trabajo_id, posicion)
+                    for posicion, palabra, confianza, error in resultados
+                ]
+            )
+            self._conexion.execute(
+                "UPDATE trabajos SET procesados = procesados + ?, errores = errores + ? WHERE id = ?",
+                (len(resultados), errores, trabajo_id)
+            )
+
+    def finalizar(self, trabajo_id: str, estado: str, error: Optional[str] = None):
+        """Cierra un trabajo en proceso (no pisa una cancelación hecha mientras tanto)"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "UPDATE trabajos SET estado = ?, terminado = ?, error = ? WHERE id = ? AND estado = ?",
+                (estado, time.time(), error, trabajo_id, PROCESANDO)
+            )
+
+    def cancelar(self, trabajo_id: str) -> Optional[str]:
+        """
+        Marca como cancelado un trabajo en cola o en proceso y retorna el estado que
+        tenía (None si no existe o ya terminó). Cada UPDATE es condicional, así un
+        trabajo que otro worker toma al mismo tiempo nunca se reporta EN_COLA
+        """
+        with self._lock, self._conexion:
+            for estado in (EN_COLA, PROCESANDO):
+                cursor = self._conexion.execute(
+                    "UPDATE trabajos SET estado = ?, terminado = ? WHERE id = ? AND estado = ?",
+                    (CANCELADO, time.time(), trabajo_id, estado)
+                )
+                if cursor.rowcount == 1:
+                    return estado
+        return None
+
+
+def resolver_ruta(ruta: str, raiz: str) -> str:
+    """Ruta absoluta dentro de raiz (sin escapar con .. ni symlinks)"""
+    if not raiz:
+        raise OrigenInvalidoError("Rutas del servidor deshabilitadas (configure JOBS_INPUT_ROOT)")
+    raiz = os.path.realpath(raiz)
+    destino = os.path.realpath(os.path.join(raiz, ruta))
+    if os.path.commonpath([raiz, destino]) != raiz:
+        raise OrigenInvalidoError(f"La ruta debe estar dentro de JOBS_INPUT_ROOT: {ruta}")
+    if not os.path.exists(destino):
+        raise OrigenInvalidoError(f"No existe: {ruta}")
+    return destino
+
+
+def _es_video(nombre: str) -> bool:
+    return nombre.lower().endswith(EXTENSIONES_VIDEO)
+
+
+def _extraer_archivo(ruta: str, destino: str):
+    """Descomprime solo los videos de un .zip/.tar, rechazando rutas que escapen de destino"""
+    destino = os.path.realpath(destino)
+
+    def ruta_segura(nombre: str) -> str:
+        final = os.path.realpath(os.path.join(destino, nombre))
+        if os.path.commonpath([destino, final]) != destino:
+            raise OrigenInvalidoError(f"Entrada inválida en el archivo: {nombre}")
+        return final
+
+    if zipfile.is_zipfile(ruta):
+        with zipfile.ZipFile(ruta) as archivo:
+            for info in archivo.infolist():
+                if info.is_dir() or not _es_video(info.filename):
+                    continue
+                final = ruta_segura(info.filename)
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                with archivo.open(info) as origen, open(final, "wb") as salida:
+                    shutil.copyfileobj(origen, salida)
+        return
+
+    with tarfile.open(ruta) as archivo:
+        for miembro in archivo:
+            if not miembro.isfile() or not _es_video(miembro.name):
+                continue
+            final = ruta_segura(miembro.name)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            with archivo.extractfile(miembro) as origen, open(final, "wb") as salida:
+                shutil.copyfileobj(origen, salida)
+
+
+def listar_videos(ruta: str, directorio_trabajo: str) -> List[Tuple[str, str]]:
+    """
+    Videos de una carpeta (recursivo, en orden alfabético), de un .zip/.tar
+    (se descomprime en directorio_trabajo) o un único archivo de video
+    Retorna [(nombre relativo, ruta absoluta)]
+    """
+    if os.path.isfile(ruta) and ruta.lower().endswith(EXTENSIONES_ARCHIVO):
+        try:
+            _extraer_archivo(ruta, directorio_trabajo)
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            raise OrigenInvalidoError(f"Archivo inválido: {e}")
+        ruta = directorio_trabajo
+    elif os.path.isfile(ruta):
+        if not _es_video(ruta):
+            raise OrigenInvalidoError(f"Formato no soportado: {os.path.basename(ruta)}")
+        return [(os.path.basename(ruta), ruta)]
+
+    videos = []
+    for carpeta, subcarpetas, archivos in os.walk(ruta):
+        subcarpetas.sort()
+        for nombre in sorted(archivos):
+            if _es_video(nombre):
+                completa = os.path.join(carpeta, nombre)
+                videos.append((os.path.relpath(completa, ruta), completa))
+    return videos
+
+
+def extraer_keypoints_con_hash(ruta: str) -> Tuple[np.ndarray, dict, str]:
+    """Extracción más el sha256 del video, para el almacén de keypoints (corre en el pool)"""
+    keypoints, estadisticas = extraer_keypoints_con_estadisticas(ruta)
+    return keypoints, estadisticas, hash_archivo(ruta)
+
+
+def resumen(trabajo: dict) -> dict:
+    """Estado y progreso de un trabajo para la API"""
+    duracion = None
+    if trabajo["iniciado"]:
+        duracion = (trabajo["terminado"] or time.time()) - trabajo["iniciado"]
+    return {
+        "job_id": trabajo["id"],
+        "estado": trabajo["estado"],
+        "origen": trabajo["origen"],
+        "umbral_confianza": trabajo["umbral"],
+        "total": trabajo["total"],
+        "procesados": trabajo["procesados"],
+        "errores": trabajo["errores"],
+        "progreso": round(trabajo["procesados"] / trabajo["total"], 4) if trabajo["total"] else 1.0,
+        "videos_por_segundo": round(trabajo["procesados"] / duracion, 3) if duracion else None,
+        "creado": trabajo["creado"],
+        "iniciado": trabajo["iniciado"],
+        "terminado": trabajo["terminado"],
+        "error": trabajo["error"],
+    }
+
+
+class GestorTrabajos:
+    """
+    Procesa los trabajos en cola de a uno por proceso. La extracción corre en
+    un pool de procesos dedicado con todos sus workers ocupados; los keypoints
+    que van llegando se clasifican en lotes de hasta tamano_lote con
+    clasificar (corrutina: lista de (30, 126) -> lista de (palabra, confianza))
+
+    Con persistir (corrutina), cada video clasificado se entrega también como
+    await persistir(digest, keypoints, (palabra, confianza), archivo)
+
+    Con admision (ControlAdmision), cada video en extracción ocupa una unidad
+    que solo se toma cuando ninguna request está esperando: los trabajos usan
+    la capacidad libre y ceden el lugar a las requests interactivas
+    """
+
+    def __init__(
+        self,
+        almacen: AlmacenTrabajos,
+        directorio: str,
+        clasificar: Callable[[List[np.ndarray]], Awaitable[List[tuple]]],
+        procesos: int = 0,
+        tamano_lote: int = 32,
+        intervalo_sondeo: float = 5.0,
+        persistir: Optional[Callable[[str, np.ndarray, tuple, str], Awaitable]] = None,
+        admision=None
+    ):
+        self.almacen = almacen
+        self.directorio = directorio
+        self.clasificar = clasificar
+        self.persistir = persistir
+        self.admision = admision
+        self.procesos = procesos if procesos > 0 else os.cpu_count() or 1
+        self.tamano_lote = max(1, tamano_lote)
+        self.intervalo_sondeo = intervalo_sondeo
+        # Sin latido durante este tiempo, el trabajo se considera abandonado
+        self.vencimiento = max(30.0, 6 * intervalo_sondeo)
+        self.propietario = f"{socket.gethostname()}:{os.getpid()}"
+        self._ejecutor: Optional[EjecutorInferencia] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._tarea_trabajo: Optional[asyncio.Task] = None
+        self._trabajo_actual: Optional[str] = None
+        self._cancelado: Optional[str] = None
+        self._nuevo = asyncio.Event()
+        self.videos_procesados = 0
+
+    def iniciar(self, esperar: Optional[Callable[[], Awaitable]] = None):
+        """Arranca el bucle de trabajos; esperar() se aguarda antes del primero (ej. modelos)"""
+        if self._tarea is None:
+            self._tarea = asyncio.get_running_loop().create_task(self._bucle(esperar))
+
+    async def detener(self):
+        """
+        Detiene el bucle sin finalizar el trabajo en curso: queda en proceso y,
+        al vencer su latido, otro worker (o el próximo arranque) lo retoma
+        """
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        if self._ejecutor is not None:
+            self._ejecutor.cerrar(wait=False)
+            self._ejecutor = None
+
+    def estado(self) -> dict:
+        return {
+            "procesos": self.procesos,
+            "tamano_lote": self.tamano_lote,
+            "trabajo_actual": self._trabajo_actual,
+            "videos_procesados": self.videos_procesados,
+            "extraccion": self._ejecutor.estado() if self._ejecutor else None,
+        }
+
+    def directorio_trabajo(self, trabajo_id: str) -> str:
+        return os.path.join(self.directorio, trabajo_id)
+
+    def nuevo_id(self) -> str:
+        return uuid.uuid4().hex
+
+    async def encolar(self, trabajo_id: str, origen: str, umbral: float, videos: List[Tuple[str, str]]):
+        await asyncio.to_thread(self.almacen.crear, trabajo_id, origen, umbral, videos)
+        self._nuevo.set()
+
+    async def cancelar(self, trabajo_id: str) -> bool:
+        """
+        Cancela un trabajo en cola o en proceso. Si lo procesa este proceso se
+        detiene de inmediato; si lo procesa otro worker, en su próximo latido.
+        Los videos los borra quien tomó el trabajo, al detenerse; aquí solo se
+        borran si seguía en cola (ya nadie puede tomarlo)
+        """
+        anterior = await asyncio.to_thread(self.almacen.cancelar, trabajo_id)
+        if anterior is None:
+            return False
+        if self._trabajo_actual == trabajo_id:
+            self._detener_trabajo(trabajo_id)
+        elif anterior == EN_COLA:
+            self.limpiar(trabajo_id)
+        return True
+
+    def _detener_trabajo(self, trabajo_id: str):
+        self._cancelado = trabajo_id
+        if self._tarea_trabajo is not None:
+            self._tarea_trabajo.cancel()
+
+    async def _bucle(self, esperar):
+        """
+        Toma trabajos de la base de a uno. SQLite corre en un hilo para no
+        bloquear el event loop; si falla (ej. "database is locked" entre workers)
+        se reintenta al siguiente sondeo en vez de detener el bucle
+        """
+        if esperar is not None:
+            await esperar()
+        while True:
+            try:
+                recuperados = await asyncio.to_thread(
+                    self.almacen.recuperar_huerfanos, self.vencimiento
+                )
+                if recuperados:
+                    print(f"🗂️  {recuperados} trabajo(s) interrumpidos vuelven a la cola")
+                trabajo_id = await asyncio.to_thread(self.almacen.tomar_siguiente, self.propietario)
+            except Exception as e:
+                print(f"❌ Error leyendo la base de trabajos: {e}")
+                await asyncio.sleep(self.intervalo_sondeo)
+                continue
+
+            if trabajo_id is None:
+                # Los trabajos encolados en otros workers se ven al sondear la base
+                self._nuevo.clear()
+                try:
+                    await asyncio.wait_for(self._nuevo.wait(), self.intervalo_sondeo)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._trabajo_actual = trabajo_id
+            self._tarea_trabajo = asyncio.get_running_loop().create_task(self._procesar(trabajo_id))
+            estado, error = COMPLETADO, None
+            try:
+                await self._tarea_trabajo
+            except asyncio.CancelledError:
+                if self._cancelado != trabajo_id:
+                    raise
+                estado = None
+            except Exception as e:
+                print(f"❌ Error en el trabajo {trabajo_id}: {e}")
+                estado, error = FALLIDO, str(e)
+            finally:
+                self._trabajo_actual = None
+                self._tarea_trabajo = None
+                self._cancelado = None
+
+            if estado is not None:
+                try:
+                    await asyncio.to_thread(self.almacen.finalizar, trabajo_id, estado, error)
+                except Exception as e:
+                    # Sin latido, el trabajo vuelve a la cola al vencer: se conservan sus videos
+                    print(f"❌ No se pudo finalizar el trabajo {trabajo_id}: {e}")
+                    continue
+
+            self.limpiar(trabajo_id)
+
+    def limpiar(self, trabajo_id: str):
+        """Borra los videos subidos o descomprimidos del trabajo (no toca JOBS_INPUT_ROOT)"""
+        shutil.rmtree(self.directorio_trabajo(trabajo_id), ignore_errors=True)
+
+    def _obtener_ejecutor(self) -> EjecutorInferencia:
+        # Se crea con el primer trabajo: los workers que nunca procesan uno no reservan procesos
+        if self._ejecutor is None:
+            self._ejecutor = crear_ejecutor_procesos(
+                self.procesos,
+                self.procesos,
+                nombre="trabajos",
+                initializer=inicializar_worker
+            )
+        return self._ejecutor
+
+    async def _latir(self, trabajo_id: str):
+        """Mantiene el trabajo tomado y detecta cancelaciones hechas desde otro worker"""
+        while True:
+            await asyncio.sleep(self.intervalo_sondeo)
+            try:
+                estado = await asyncio.to_thread(self.almacen.latir, trabajo_id)
+            except Exception as e:
+                print(f"❌ Error actualizando el latido de {trabajo_id}: {e}")
+                continue
+            if estado != PROCESANDO:
+                self._detener_trabajo(trabajo_id)
+                return
+
+    async def _reservar_unidad(self) -> int:
+        """Una unidad de admisión para un video (0 sin control de admisión)"""
+        if self.admision is None:
+            return 0
+        while True:
+            unidades = self.admision.intentar(1)
+            if unidades:
+                return unidades
+            await asyncio.sleep(0.2)
+
+    async def _procesar(self, trabajo_id: str):
+        pendientes = await asyncio.to_thread(self.almacen.videos_pendientes, trabajo_id)
+        ejecutor = self._obtener_ejecutor()
+        print(f"🗂️  Trabajo {trabajo_id}: {len(pendientes)} videos pendientes")
+
+        archivos = {posicion: archivo for posicion, archivo, _ in pendientes}
+        extraer_fn = extraer_keypoints_con_estadisticas
+        if self.persistir is not None:
+            extraer_fn = extraer_keypoints_con_hash
+        
+        extraidos: asyncio.Queue = asyncio.Queue()
+        # Capacidad completa del ejecutor en vuelo: todos los procesos ocupados y
+        # uno más en cola por proceso para no dejarlos esperando entre videos
+        en_vuelo = asyncio.Semaphore(ejecutor.capacidad)
+        tareas = []
+
+        async def extraer(posicion: int, ruta: str):
+            unidades = 0
+            try:
+                unidades = await self._reservar_unidad()
+                keypoints, estadisticas, *digest = await ejecutor.ejecutar(extraer_fn, ruta)
+                metricas.observar_extraccion(estadisticas)
+                if not estadisticas.get("frames_usados"):
+                    raise ValueError("No se pudo leer ningún frame del video")
+                await extraidos.put((posicion, keypoints, None, digest[0] if digest else None))
+            except Exception as e:
+                await extraidos.put((posicion, None, str(e) or type(e).__name__, None))
+            finally:
+                if unidades:
+                    self.admision.liberar(unidades)
+                en_vuelo.release()
+
+        async def lanzar():
+            for posicion, _, ruta in pendientes:
+                await en_vuelo.acquire()
+                tareas.append(asyncio.create_task(extraer(posicion, ruta)))
+
+        latido = asyncio.create_task(self._latir(trabajo_id))
+        productor = asyncio.create_task(lanzar())
+        try:
+            restantes = len(pendientes)
+            while restantes:
+                # Lo que terminó mientras se clasificaba el lote anterior forma el próximo
+                lote = [await extraidos.get()]
+                while len(lote) < self.tamano_lote and not extraidos.empty():
+                    lote.append(extraidos.get_nowait())
+                restantes -= len(lote)
+                await self._clasificar_y_guardar(trabajo_id, lote, archivos)
+        finally:
+            latido.cancel()
+            productor.cancel()
+            for tarea in tareas:
+                tarea.cancel()
+
+    async def _clasificar_y_guardar(self, trabajo_id: str, lote: List[tuple], archivos: dict):
+        validos = [(posicion, kp, digest) for posicion, kp, error, digest in lote if error is None]
+        resultados = [
+            (posicion, None, None, error) for posicion, _, error, _ in lote if error is not None
+        ]
+
+        if validos:
+            while True:
+                try:
+                    predicciones = await self.clasificar([kp for _, kp, _ in validos])
+                    break
+                except ColaSaturadaError as e:
+                    # El pool de inferencia lo comparten las requests interactivas
+                    await asyncio.sleep(e.retry_after)
+            for (posicion, kp, digest), (palabra, confianza) in zip(validos, predicciones):
+                resultados.append((posicion, palabra, float(confianza), None))
+                if self.persistir is not None:
+                    await self.persistir(digest, kp, (palabra, confianza), archivos[posicion])
+
+        await asyncio.to_thread(self.almacen.guardar_resultados, trabajo_id, resultados)
+        self.videos_procesados += len(lote)
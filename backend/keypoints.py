@@ -0,0 +1,885 @@
+"""
+Extracción de keypoints de manos desde video (OpenCV + MediaPipe)
+No importa TensorFlow ni transformers para poder ejecutarse en procesos worker
+"""
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import settings
+
+
+# Frames por secuencia y valores por frame (21 landmarks * 3 coords * 2 manos)
+NUM_FRAMES = 30
+NUM_FEATURES = 126
+MANOS_POR_FRAME = 2
+VALORES_POR_MANO = NUM_FEATURES // MANOS_POR_FRAME
+
+
+def crear_hands():
+    """Nueva instancia de MediaPipe Hands con la configuración del modelo"""
+    # Import diferido: MediaPipe tarda en importar y se carga en segundo plano
+    import mediapipe as mp
+    
+    return mp.solutions.hands.Hands(
+        static_image_mode=False,
+        max_num_hands=2,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+class PoolHands:
+    """
+    Pool de instancias Hands pre-calentadas
+    El tracker guarda estado entre frames, así que cada video usa una instancia
+    en exclusiva y se resetea al devolverla
+    """
+
+    def __init__(self, tamano: int):
+        self.tamano = max(1, tamano)
+        self._libres = queue.Queue()
+        frame_vacio = np.zeros((64, 64, 3), dtype=np.uint8)
+        for _ in range(self.tamano):
+            hands = crear_hands()
+            # Un primer process() inicializa el grafo y carga los modelos TFLite
+            hands.process(frame_vacio)
+            hands.reset()
+            self._libres.put(hands)
+
+    @contextmanager
+    def obtener(self):
+        """Toma una instancia (espera si todas están en uso) y la devuelve reseteada"""
+        hands = self._libres.get()
+        try:
+            yield hands
+        finally:
+            hands.reset()
+            self._libres.put(hands)
+
+    @property
+    def libres(self) -> int:
+        return self._libres.qsize()
+
+    def cerrar(self):
+        while not self._libres.empty():
+            self._libres.get_nowait().close()
+
+
+# Pool del proceso actual (None = crear una instancia por video)
+_pool_hands: Optional[PoolHands] = None
+
+
+def configurar_pool_hands(tamano: int) -> PoolHands:
+    """Crea el pool de Hands de este proceso, reemplazando el anterior si existía"""
+    global _pool_hands
+    if _pool_hands is not None:
+        _pool_hands.cerrar()
+    _pool_hands = PoolHands(tamano)
+    return _pool_hands
+
+
+def cerrar_pool_hands():
+    global _pool_hands
+    if _pool_hands is not None:
+        _pool_hands.cerrar()
+        _pool_hands = None
+
+
+@contextmanager
+def _obtener_hands():
+    if _pool_hands is not None:
+        with _pool_hands.obtener() as hands:
+            yield hands
+        return
+    
+    hands = crear_hands()
+    try:
+        yield hands
+    finally:
+        hands.close()
+
+
+def inicializar_worker():
+    """
+    Inicializador de los procesos del pool de videos
+    Cada proceso usa un solo hilo de OpenCV para no sobresuscribir los cores
+    y mantiene su propia instancia Hands pre-calentada
+    """
+    cv2.setNumThreads(1)
+    configurar_pool_hands(1)
+
+
+def calentar_worker() -> int:
+    """Tarea vacía para forzar el arranque de los procesos del pool"""
+    return os.getpid()
+
+
+def version_extraccion() -> str:
+    """
+    Identifica la configuración que afecta los keypoints extraídos
+    (se usa en las claves de cache: si cambia, los keypoints cacheados no sirven)
+    """
+    version = f"{settings.FRAME_SAMPLING}-s{settings.FRAME_SEEK_MIN_GAP}-{settings.ASIGNACION_MANOS}"
+    # Con la decodificación por defecto se conserva la versión anterior (y sus caches)
+    if _backend_decodificacion() != "opencv" or settings.DECODE_MAX_SIDE > 0:
+        version += f"-{_backend_decodificacion()}{settings.DECODE_MAX_SIDE}"
+    if settings.MOTION_GATE_THRESHOLD > 0:
+        version += f"-g{settings.MOTION_GATE_THRESHOLD:g}"
+    if settings.IDLE_TRIM_THRESHOLD > 0:
+        version += f"-t{settings.IDLE_TRIM_THRESHOLD:g}"
+    return version
+
+
+# None = todavía no se comprobó si PyAV está instalado
+_pyav_disponible: Optional[bool] = None
+
+
+def _backend_decodificacion() -> str:
+    """settings.DECODE_BACKEND, o "opencv" si pidió "pyav" y no está instalado"""
+    global _pyav_disponible
+    if settings.DECODE_BACKEND != "pyav":
+        return "opencv"
+    if _pyav_disponible is None:
+        try:
+            import av  # noqa: F401
+            _pyav_disponible = True
+        except ImportError:
+            print("⚠️  Paquete 'av' no instalado, se decodifica con OpenCV")
+            _pyav_disponible = False
+    return "pyav" if _pyav_disponible else "opencv"
+
+
+def tamano_reducido(ancho: int, alto: int, lado_max: int) -> Tuple[int, int]:
+    """
+    (ancho, alto) con el lado mayor limitado a lado_max, manteniendo la proporción
+    Los landmarks de MediaPipe están normalizados a [0, 1], así que no cambian de escala
+    """
+    if lado_max <= 0 or max(ancho, alto) <= lado_max:
+        return ancho, alto
+    factor = lado_max / max(ancho, alto)
+    return max(2, round(ancho * factor / 2) * 2), max(2, round(alto * factor / 2) * 2)
+
+
+class BuferesFrames:
+    """
+    Frames RGB preasignados que se reciclan entre la decodificación y MediaPipe
+    Evita pedir (y devolver al sistema) varios MB por frame en videos HD
+    Solo recicla los frames que salieron de tomar(): los que el decodificador
+    crea por su cuenta (PyAV) se ignoran en devolver()
+    """
+
+    def __init__(self):
+        self._libres = queue.SimpleQueue()
+        self._propios = set()
+        self.creados = 0
+
+    def tomar(self, alto: int, ancho: int) -> np.ndarray:
+        try:
+            bufer = self._libres.get_nowait()
+        except queue.Empty:
+            bufer = None
+        if bufer is None or bufer.shape[:2] != (alto, ancho):
+            if bufer is not None:
+                self._propios.discard(id(bufer))
+            bufer = np.empty((alto, ancho, 3), dtype=np.uint8)
+            self._propios.add(id(bufer))
+            self.creados += 1
+        return bufer
+
+    def devolver(self, bufer: np.ndarray):
+        # Un frame propio sigue vivo mientras está en uso, así que su id no se repite
+        if id(bufer) in self._propios:
+            self._libres.put(bufer)
+
+    @property
+    def libres(self) -> int:
+        return self._libres.qsize()
+
+
+def convertir_a_rgb(frame_bgr: np.ndarray, buferes: Optional[BuferesFrames] = None) -> np.ndarray:
+    """
+    Frame BGR de OpenCV a RGB, reducido a DECODE_MAX_SIDE antes de convertir
+    Con buferes, el resultado se escribe en un frame reciclado
+    """
+    alto, ancho = frame_bgr.shape[:2]
+    destino = tamano_reducido(ancho, alto, settings.DECODE_MAX_SIDE)
+    if destino != (ancho, alto):
+        frame_bgr = cv2.resize(frame_bgr, destino, interpolation=cv2.INTER_AREA)
+    if buferes is None:
+        return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+    return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB, dst=buferes.tomar(destino[1], destino[0]))
+
+
+def miniatura(frame: np.ndarray, lado: int, codigo_gris: int = cv2.COLOR_RGB2GRAY) -> np.ndarray:
+    """Frame reducido a lado px (lado mayor) en escala de grises, para medir movimiento"""
+    alto, ancho = frame.shape[:2]
+    destino = tamano_reducido(ancho, alto, lado)
+    pequeno = cv2.resize(frame, destino, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(pequeno, codigo_gris).astype(np.int16)
+
+
+def diferencia_miniaturas(a: np.ndarray, b: np.ndarray) -> float:
+    """Diferencia absoluta media entre dos miniaturas (niveles de gris 0-255)"""
+    return float(np.abs(a - b).mean())
+
+
+class CompuertaMovimiento:
+    """
+    Decide si un frame cambió lo suficiente para volver a correr MediaPipe
+    Compara contra el último frame procesado (no el anterior), así una deriva
+    lenta termina superando el umbral y no se acumula
+    """
+
+    def __init__(self, umbral: float, lado: int):
+        self.umbral = umbral
+        self.lado = lado
+        self._referencia: Optional[np.ndarray] = None
+
+    def hay_cambio(self, frame_rgb: np.ndarray) -> bool:
+        actual = miniatura(frame_rgb, self.lado)
+        if self._referencia is None or diferencia_miniaturas(actual, self._referencia) >= self.umbral:
+            self._referencia = actual
+            return True
+        return False
+
+    def reiniciar(self):
+        self._referencia = None
+
+
+def crear_compuerta() -> Optional[CompuertaMovimiento]:
+    """Compuerta según MOTION_GATE_THRESHOLD (None = MediaPipe en todos los frames)"""
+    if settings.MOTION_GATE_THRESHOLD <= 0:
+        return None
+    return CompuertaMovimiento(settings.MOTION_GATE_THRESHOLD, settings.MOTION_GATE_SIDE)
+
+
+def rango_activo(
+    video_path: str,
+    umbral: float,
+    lado: int,
+    max_muestras: int = 24,
+    estadisticas: Optional[dict] = None
+) -> Optional[Tuple[int, int]]:
+    """
+    Rango [inicio, fin) de frames con movimiento, sin la quietud inicial y final
+    Recorre el video una vez con grab() (decodifica sin convertir a BGR) y solo
+    convierte max_muestras frames equiespaciados, de los que toma miniaturas.
+    Sigue siendo una decodificación extra del clip completo (en 1080p ~3 ms por
+    frame, frente a ~23 ms de MediaPipe por frame muestreado)
+    La quietud inicial son los frames que casi no difieren del primero y la final
+    los que casi no difieren del último. Retorna None si no hay movimiento (o el
+    video no se puede leer): se muestrea el clip completo.
+    El rango tiene al menos NUM_FRAMES frames si el video los tiene
+    """
+    cap = cv2.VideoCapture(video_path)
+    declarados = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    paso = max(1, declarados // max_muestras) if declarados > 0 else 1
+    sondeos = []
+    miniaturas = []
+    total = 0
+    frame = None  # BGR reutilizado por retrieve()
+    try:
+        while cap.grab():
+            if total % paso == 0:
+                ret, frame = cap.retrieve(frame)
+                if ret:
+                    sondeos.append(total)
+                    miniaturas.append(miniatura(frame, lado, cv2.COLOR_BGR2GRAY))
+            total += 1
+    finally:
+        cap.release()
+    _contar(estadisticas, "frames_decodificados", total)
+    if len(miniaturas) < 2:
+        return None
+    
+    desde_inicio = [diferencia_miniaturas(m, miniaturas[0]) for m in miniaturas]
+    desde_fin = [diferencia_miniaturas(m, miniaturas[-1]) for m in miniaturas]
+    movidos_inicio = np.flatnonzero(np.asarray(desde_inicio) >= umbral)
+    movidos_fin = np.flatnonzero(np.asarray(desde_fin) >= umbral)
+    if len(movidos_inicio) == 0 or len(movidos_fin) == 0:
+        return None
+    # Un sondeo de margen a cada lado: el movimiento empezó después del sondeo anterior
+    inicio = sondeos[max(0, movidos_inicio[0] - 1)]
+    fin = min(total, sondeos[min(len(sondeos) - 1, movidos_fin[-1] + 1)] + 1)
+    
+    faltan = NUM_FRAMES - (fin - inicio)
+    if faltan > 0:
+        inicio = max(0, inicio - faltan // 2)
+        fin = min(total, inicio + NUM_FRAMES)
+        inicio = max(0, fin - NUM_FRAMES)
+    return inicio, fin
+
+
+def calcular_indices_muestreo(total_frames: int, num_muestras: int = NUM_FRAMES) -> np.ndarray:
+    """
+    Índices de frames repartidos uniformemente sobre todo el clip
+    Si el clip tiene menos frames que num_muestras se usan todos (luego se rellena)
+    """
+    if total_frames <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if total_frames <= num_muestras:
+        return np.arange(total_frames, dtype=np.int64)
+    return np.linspace(0, total_frames - 1, num_muestras).round().astype(np.int64)
+
+
+def contar_frames(video_path: str) -> int:
+    """Cuenta frames con grab() (sin convertir) cuando CAP_PROP_FRAME_COUNT no es confiable"""
+    cap = cv2.VideoCapture(video_path)
+    total = 0
+    while cap.grab():
+        total += 1
+    cap.release()
+    return total
+
+
+def _contar(estadisticas: Optional[dict], clave: str, cantidad: float = 1):
+    if estadisticas is not None:
+        estadisticas[clave] = estadisticas.get(clave, 0) + cantidad
+
+
+def _frames_por_intervalo(
+    video_path: str,
+    estadisticas: Optional[dict] = None,
+    rango: Optional[Tuple[int, int]] = None,
+    buferes: Optional[BuferesFrames] = None
+) -> Iterator[np.ndarray]:
+    """Muestreo original: lee todos los frames y se queda con uno de cada intervalo"""
+    cap = cv2.VideoCapture(video_path)
+    if rango is None:
+        rango = (0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    inicio, fin = rango
+    total_frames = fin - inicio
+    frame_interval = max(1, total_frames // NUM_FRAMES) if total_frames > NUM_FRAMES else 1
+    
+    # Antes del rango solo se avanza (grab sin convertir)
+    frame_count = 0
+    while frame_count < inicio and cap.grab():
+        frame_count += 1
+        _contar(estadisticas, "frames_decodificados")
+    
+    usados = 0
+    frame = None  # BGR reutilizado por read()
+    try:
+        while cap.isOpened() and usados < NUM_FRAMES:
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            _contar(estadisticas, "frames_decodificados")
+            if (frame_count - inicio) % frame_interval == 0:
+                usados += 1
+                yield convertir_a_rgb(frame, buferes)
+            frame_count += 1
+    finally:
+        cap.release()
+
+
+def _frames_uniformes(
+    video_path: str,
+    estadisticas: Optional[dict] = None,
+    rango: Optional[Tuple[int, int]] = None,
+    buferes: Optional[BuferesFrames] = None
+) -> Iterator[Optional[np.ndarray]]:
+    """
+    Decodifica solo los frames objetivo: grab() avanza sin convertir y
+    retrieve() se llama únicamente en los índices muestreados. Con
+    FRAME_SEEK_MIN_GAP > 0 los saltos largos se hacen con seek.
+
+    Si el contenedor declara más frames de los que realmente tiene, el
+    muestreo se repite con el conteo real y antes se emite None.
+    Con rango [inicio, fin) se muestrea solo ese tramo.
+    """
+    if rango is not None:
+        inicio, total = rango
+    else:
+        inicio = 0
+        cap = cv2.VideoCapture(video_path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if total <= 0:
+            total = contar_frames(video_path)
+            _contar(estadisticas, "frames_decodificados", total)
+    
+    seek_min_gap = settings.FRAME_SEEK_MIN_GAP
+    frame = None  # BGR reutilizado por retrieve()
+    
+    for intento in range(2):
+        indices = inicio + calcular_indices_muestreo(total - inicio)
+        cap = cv2.VideoCapture(video_path)
+        posicion = 0  # índice del frame que devolvería el próximo grab()
+        emitidos = 0
+        try:
+            for objetivo in indices:
+                if seek_min_gap > 0 and objetivo - posicion >= seek_min_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, int(objetivo))
+                    posicion = int(objetivo)
+                while posicion < objetivo and cap.grab():
+                    posicion += 1
+                    _contar(estadisticas, "frames_decodificados")
+                if posicion < objetivo or not cap.grab():
+                    break
+                posicion += 1
+                _contar(estadisticas, "frames_decodificados")
+                ret, frame = cap.retrieve(frame)
+                if not ret:
+                    break
+                emitidos += 1
+                yield convertir_a_rgb(frame, buferes)
+        finally:
+            cap.release()
+        
+        if emitidos == len(indices) or intento > 0 or posicion == 0 or posicion >= total:
+            return
+        # CAP_PROP_FRAME_COUNT sobreestimado: repetir con los frames realmente leídos
+        total = posicion
+        yield None
+
+
+def _indices_objetivo(total: int) -> np.ndarray:
+    """Índices que elegiría el muestreo de OpenCV configurado, para decodificar con PyAV"""
+    if settings.FRAME_SAMPLING == "intervalo":
+        intervalo = max(1, total // NUM_FRAMES) if total > NUM_FRAMES else 1
+        return np.arange(0, max(total, 0), intervalo, dtype=np.int64)[:NUM_FRAMES]
+    return calcular_indices_muestreo(total)
+
+
+def _rotacion_pyav(stream) -> int:
+    """Giro horario (0/90/180/270) para mostrar el video como lo hace OpenCV (autorrotación)"""
+    side_data = getattr(stream, "side_data", None) or {}
+    if "DISPLAYMATRIX" in side_data:
+        # Ángulo antihorario (av_display_rotation_get)
+        angulo = -float(side_data["DISPLAYMATRIX"])
+    else:
+        angulo = float(stream.metadata.get("rotate", 0) or 0)
+    return int(round(angulo / 90.0)) % 4 * 90
+
+
+def _frames_pyav(
+    video_path: str,
+    estadisticas: Optional[dict] = None,
+    rango: Optional[Tuple[int, int]] = None,
+    buferes: Optional[BuferesFrames] = None
+) -> Iterator[Optional[np.ndarray]]:
+    """
+    Decodifica con PyAV (FFmpeg) usando DECODE_THREADS hilos y entrega los frames
+    muestreados ya escalados a DECODE_MAX_SIDE y convertidos a RGB por swscale,
+    sin pasar por el frame BGR a resolución completa
+    Mismo muestreo y mismo reinicio (None) que los iteradores de OpenCV
+    (to_ndarray siempre crea el array, así que no usa buferes)
+    """
+    import av
+
+    inicio = 0
+    try:
+        with av.open(video_path) as contenedor:
+            total = contenedor.streams.video[0].frames
+            if rango is not None:
+                inicio, total = rango
+            elif total <= 0:
+                # Contar paquetes no decodifica
+                total = sum(1 for p in contenedor.demux(video=0) if p.size)
+    except (av.error.FFmpegError, IndexError) as e:
+        raise ValueError(f"No se pudo leer el video: {e}")
+    
+    for intento in range(2):
+        indices = inicio + _indices_objetivo(total - inicio)
+        objetivos = set(indices.tolist())
+        ultimo = int(indices[-1]) if len(indices) else -1
+        posicion = 0
+        emitidos = 0
+        with av.open(video_path) as contenedor:
+            stream = contenedor.streams.video[0]
+            stream.thread_type = "AUTO"
+            stream.thread_count = settings.DECODE_THREADS
+            ancho, alto = tamano_reducido(
+                stream.codec_context.width, stream.codec_context.height, settings.DECODE_MAX_SIDE
+            )
+            giro = _rotacion_pyav(stream)
+            
+            for frame in contenedor.decode(stream):
+                if posicion > ultimo:
+                    break
+                _contar(estadisticas, "frames_decodificados")
+                if posicion in objetivos:
+                    rgb = frame.to_ndarray(
+                        format="rgb24", width=ancho, height=alto, interpolation="AREA"
+                    )
+                    if giro:
+                        rgb = np.ascontiguousarray(np.rot90(rgb, -giro // 90))
+                    emitidos += 1
+                    yield rgb
+                posicion += 1
+        
+        if emitidos == len(indices) or intento > 0 or posicion == 0:
+            return
+        # El contenedor declaró más frames de los que tiene
+        total = posicion
+        yield None
+
+
+# Marca de fin del hilo de decodificación
+_FIN = object()
+
+
+def _producir_frames(
+    frames: Iterator,
+    cola: queue.Queue,
+    detener: threading.Event
+):
+    """Hilo de decodificación: llena la cola hasta agotar el video o hasta que el consumidor corte"""
+    def entregar(item) -> bool:
+        while not detener.is_set():
+            try:
+                cola.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    try:
+        for frame in frames:
+            if not entregar(frame):
+                return
+        entregar(_FIN)
+    except Exception as e:
+        entregar(e)
+    finally:
+        frames.close()
+
+
+def canalizar(
+    crear_frames: Callable[[BuferesFrames], Iterator[Optional[np.ndarray]]],
+    tamano_cola: int
+) -> Iterator[Optional[np.ndarray]]:
+    """
+    Entrega los frames de crear_frames(buferes) reciclando su memoria: el frame
+    anterior vuelve al pool cuando se pide el siguiente
+    
+    Con tamano_cola > 0 la decodificación corre en un hilo aparte y llena una cola
+    de hasta tamano_cola frames mientras MediaPipe procesa el actual (OpenCV, FFmpeg
+    y MediaPipe liberan el GIL), así la latencia se acerca a max(decodificar, trackear)
+    Los errores del hilo se relanzan en el consumidor
+    """
+    buferes = BuferesFrames()
+    
+    if tamano_cola <= 0:
+        for frame in crear_frames(buferes):
+            yield frame
+            if frame is not None:
+                buferes.devolver(frame)
+        return
+    
+    cola = queue.Queue(maxsize=tamano_cola)
+    detener = threading.Event()
+    hilo = threading.Thread(
+        target=_producir_frames,
+        args=(crear_frames(buferes), cola, detener),
+        name="decodificacion",
+        daemon=True
+    )
+    hilo.start()
+    try:
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            if item is not None:
+                buferes.devolver(item)
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def iterar_frames_muestreados(
+    video_path: str,
+    estadisticas: Optional[dict] = None
+) -> Iterator[Optional[np.ndarray]]:
+    """
+    Frames RGB a procesar según settings.FRAME_SAMPLING ("uniforme" o "intervalo"),
+    decodificados con OpenCV o PyAV (DECODE_BACKEND) y reducidos a DECODE_MAX_SIDE
+    Con IDLE_TRIM_THRESHOLD > 0 se muestrea sin la quietud del inicio y del final
+    Un None indica que el muestreo se reinició y hay que descartar lo acumulado
+    Si se pasa estadisticas, se suman ahí "frames_decodificados" y "frames_recortados"
+    Cada frame es válido hasta pedir el siguiente (su memoria se recicla)
+    """
+    rango = None
+    if settings.IDLE_TRIM_THRESHOLD > 0:
+        conteo = {}
+        rango = rango_activo(
+            video_path, settings.IDLE_TRIM_THRESHOLD, settings.MOTION_GATE_SIDE, estadisticas=conteo
+        )
+        _contar(estadisticas, "frames_decodificados", conteo.get("frames_decodificados", 0))
+        if rango is not None:
+            _contar(
+                estadisticas, "frames_recortados",
+                conteo["frames_decodificados"] - (rango[1] - rango[0])
+            )
+    
+    if _backend_decodificacion() == "pyav":
+        iterador = _frames_pyav
+    elif settings.FRAME_SAMPLING == "intervalo":
+        iterador = _frames_por_intervalo
+    else:
+        iterador = _frames_uniformes
+    return canalizar(
+        lambda buferes: iterador(video_path, estadisticas, rango, buferes),
+        settings.DECODE_PIPELINE_QUEUE
+    )
+
+
+def fps_video(video_path: str) -> float:
+    """Frames por segundo declarados por el contenedor (30 si no los declara)"""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps if fps and fps > 0 else 30.0
+
+
+def _frames_continuos_opencv(
+    video_path: str,
+    paso: int,
+    max_frames: int,
+    estadisticas: Optional[dict] = None,
+    buferes: Optional[BuferesFrames] = None
+) -> Iterator[np.ndarray]:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("No se pudo leer el video")
+    posicion = 0
+    emitidos = 0
+    frame = None
+    try:
+        while (max_frames <= 0 or emitidos < max_frames) and cap.grab():
+            _contar(estadisticas, "frames_decodificados")
+            if posicion % paso == 0:
+                ret, frame = cap.retrieve(frame)
+                if not ret:
+                    break
+                emitidos += 1
+                yield convertir_a_rgb(frame, buferes)
+            posicion += 1
+    finally:
+        cap.release()
+
+
+def _frames_continuos_pyav(
+    video_path: str,
+    paso: int,
+    max_frames: int,
+    estadisticas: Optional[dict] = None,
+    buferes: Optional[BuferesFrames] = None
+) -> Iterator[np.ndarray]:
+    import av
+
+    try:
+        contenedor = av.open(video_path)
+        stream = contenedor.streams.video[0]
+    except (av.error.FFmpegError, IndexError) as e:
+        raise ValueError(f"No se pudo leer el video: {e}")
+    
+    with contenedor:
+        stream.thread_type = "AUTO"
+        stream.thread_count = settings.DECODE_THREADS
+        ancho, alto = tamano_reducido(
+            stream.codec_context.width, stream.codec_context.height, settings.DECODE_MAX_SIDE
+        )
+        giro = _rotacion_pyav(stream)
+        emitidos = 0
+        for posicion, frame in enumerate(contenedor.decode(stream)):
+            if max_frames > 0 and emitidos >= max_frames:
+                break
+            _contar(estadisticas, "frames_decodificados")
+            if posicion % paso:
+                continue
+            rgb = frame.to_ndarray(format="rgb24", width=ancho, height=alto, interpolation="AREA")
+            if giro:
+                rgb = np.ascontiguousarray(np.rot90(rgb, -giro // 90))
+            emitidos += 1
+            yield rgb
+
+
+def iterar_frames_continuos(
+    video_path: str,
+    paso: int = 1,
+    max_frames: int = 0,
+    estadisticas: Optional[dict] = None
+) -> Iterator[np.ndarray]:
+    """
+    Frames RGB de todo el video en orden, uno de cada paso (sin muestreo a 30),
+    hasta max_frames (0 = sin límite). Para videos con varias señas seguidas
+    Cada frame es válido hasta pedir el siguiente (su memoria se recicla)
+    """
+    paso = max(1, paso)
+    iterador = (
+        _frames_continuos_pyav if _backend_decodificacion() == "pyav" else _frames_continuos_opencv
+    )
+    return canalizar(
+        lambda buferes: iterador(video_path, paso, max_frames, estadisticas, buferes),
+        settings.DECODE_PIPELINE_QUEUE
+    )
+
+
+def escribir_keypoints_frame(results, destino: np.ndarray):
+    """
+    Escribe los landmarks de un resultado de MediaPipe en destino (vista de 126 float32)
+
+    Con ASIGNACION_MANOS="deteccion" las manos ocupan los slots en el orden
+    que las reporta MediaPipe (comportamiento con el que se entrenó el modelo).
+    Con "lateralidad" la mano izquierda va siempre al slot 0 y la derecha al 1,
+    así no intercambian posición entre frames.
+    """
+    destino.fill(0.0)
+    if not results.multi_hand_landmarks:
+        return
+    
+    manos = results.multi_hand_landmarks[:MANOS_POR_FRAME]
+    if settings.ASIGNACION_MANOS == "lateralidad" and results.multi_handedness:
+        slots = []
+        for clasificacion in results.multi_handedness[:len(manos)]:
+            slot = 0 if clasificacion.classification[0].label == "Left" else 1
+            if slot in slots:
+                slot = 1 - slot
+            slots.append(slot)
+    else:
+        slots = range(len(manos))
+    
+    for slot, hand_landmarks in zip(slots, manos):
+        inicio = slot * VALORES_POR_MANO
+        destino[inicio:inicio + VALORES_POR_MANO] = np.fromiter(
+            (c for lm in hand_landmarks.landmark for c in (lm.x, lm.y, lm.z)),
+            dtype=np.float32,
+            count=VALORES_POR_MANO
+        )
+
+
+def extraer_keypoints_video(video_path: str, estadisticas: Optional[dict] = None) -> np.ndarray:
+    """
+    Extrae keypoints de manos desde un video usando MediaPipe
+    Retorna array de shape (30, 126)
+    
+    Si se pasa estadisticas se completan segundos_decodificacion,
+    segundos_mediapipe, frames_decodificados, frames_usados, frames_con_manos
+    y frames_omitidos (frames sin cambios que reusaron los keypoints del anterior)
+    """
+    keypoints = np.zeros((NUM_FRAMES, NUM_FEATURES), dtype=np.float32)
+    n = 0
+    con_manos = 0
+    omitidos = 0
+    manos_anterior = False
+    segundos_mediapipe = 0.0
+    inicio = time.perf_counter()
+    compuerta = crear_compuerta()
+    
+    with _obtener_hands() as hands:
+        for frame in iterar_frames_muestreados(video_path, estadisticas):
+            if frame is None:
+                n = 0
+                con_manos = 0
+                omitidos = 0
+                hands.reset()
+                if compuerta is not None:
+                    compuerta.reiniciar()
+                continue
+            if n >= NUM_FRAMES:
+                break
+            
+            # Frame casi igual al último procesado: se reusan sus keypoints
+            if compuerta is not None and not compuerta.hay_cambio(frame) and n > 0:
+                keypoints[n] = keypoints[n - 1]
+                con_manos += manos_anterior
+                omitidos += 1
+                n += 1
+                continue
+            
+            marca = time.perf_counter()
+            results = hands.process(frame)
+            escribir_keypoints_frame(results, keypoints[n])
+            segundos_mediapipe += time.perf_counter() - marca
+            manos_anterior = bool(results.multi_hand_landmarks)
+            con_manos += manos_anterior
+            n += 1
+    
+    if estadisticas is not None:
+        estadisticas["segundos_mediapipe"] = segundos_mediapipe
+        estadisticas["segundos_decodificacion"] = time.perf_counter() - inicio - segundos_mediapipe
+        estadisticas["frames_usados"] = n
+        estadisticas["frames_con_manos"] = con_manos
+        estadisticas["frames_omitidos"] = omitidos
+    
+    # Padding con el último frame (o ceros si no se leyó ninguno)
+    if 0 < n < NUM_FRAMES:
+        keypoints[n:] = keypoints[n - 1]
+    elif n == 0:
+        keypoints.fill(0.0)
+    
+    return keypoints
+
+
+def extraer_keypoints_continuos(
+    video_path: str,
+    fps_objetivo: float,
+    max_segundos: float = 0,
+    estadisticas: Optional[dict] = None
+) -> Tuple[np.ndarray, float]:
+    """
+    Keypoints de todos los frames de un video continuo en una sola pasada,
+    submuestreado a ~fps_objetivo (0 = todos los frames)
+    Retorna (keypoints (N, 126), fps de los keypoints)
+    """
+    fps = fps_video(video_path)
+    paso = max(1, round(fps / fps_objetivo)) if fps_objetivo > 0 else 1
+    fps_muestreo = fps / paso
+    max_frames = int(max_segundos * fps_muestreo) if max_segundos > 0 else 0
+    
+    filas = []
+    con_manos = 0
+    omitidos = 0
+    manos_anterior = False
+    segundos_mediapipe = 0.0
+    inicio = time.perf_counter()
+    compuerta = crear_compuerta()
+    
+    with _obtener_hands() as hands:
+        for frame in iterar_frames_continuos(video_path, paso, max_frames, estadisticas):
+            if compuerta is not None and not compuerta.hay_cambio(frame) and filas:
+                filas.append(filas[-1])
+                con_manos += manos_anterior
+                omitidos += 1
+                continue
+            
+            marca = time.perf_counter()
+            results = hands.process(frame)
+            fila = np.zeros(NUM_FEATURES, dtype=np.float32)
+            escribir_keypoints_frame(results, fila)
+            segundos_mediapipe += time.perf_counter() - marca
+            manos_anterior = bool(results.multi_hand_landmarks)
+            con_manos += manos_anterior
+            filas.append(fila)
+    
+    if estadisticas is not None:
+        estadisticas["segundos_mediapipe"] = segundos_mediapipe
+        estadisticas["segundos_decodificacion"] = time.perf_counter() - inicio - segundos_mediapipe
+        estadisticas["frames_usados"] = len(filas)
+        estadisticas["frames_con_manos"] = con_manos
+        estadisticas["frames_omitidos"] = omitidos
+    
+    if not filas:
+        return np.zeros((0, NUM_FEATURES), dtype=np.float32), fps_muestreo
+    return np.stack(filas), fps_muestreo
+
+
+def extraer_keypoints_con_estadisticas(video_path: str) -> Tuple[np.ndarray, dict]:
+    """extraer_keypoints_video que además retorna sus estadísticas (para el pool de procesos)"""
+    estadisticas = {"frames_decodificados": 0}
+    keypoints = extraer_keypoints_video(video_path, estadisticas)
+    return keypoints, estadisticas
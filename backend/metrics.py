@@ -0,0 +1,206 @@
+"""
+Métricas de Prometheus y tiempos por etapa
+Las métricas se exportan en /metrics si PROMETHEUS_ENABLED=true y está
+instalado prometheus_client; los tiempos por etapa de cada request se
+pueden devolver además en el header Server-Timing
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from config import settings
+
+
+# Etapas medidas de cada request: upload, escritura_temporal, extraccion,
+# decodificacion, mediapipe, lstm, t5
+ETAPAS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Tiempos acumulados por etapa de la request en curso (para Server-Timing)
+_tiempos_request: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "tiempos_request", default=None
+)
+
+
+class Metricas:
+    """
+    Fachada sobre prometheus_client; si está desactivado o no instalado,
+    solo acumula los tiempos de la request para Server-Timing
+    """
+
+    def __init__(self, habilitado: bool):
+        self.habilitado = False
+        if not habilitado:
+            return
+        try:
+            import prometheus_client as prom
+        except ImportError:
+            print("⚠️  Paquete 'prometheus_client' no instalado, /metrics desactivado")
+            return
+
+        self._prom = prom
+        self.habilitado = True
+        self.etapa = prom.Histogram(
+            "lsc_etapa_segundos", "Duración de cada etapa del pipeline",
+            ["etapa"], buckets=ETAPAS_BUCKETS
+        )
+        self.request = prom.Histogram(
+            "lsc_request_segundos", "Duración total de las requests",
+            ["endpoint", "status"], buckets=ETAPAS_BUCKETS
+        )
+        self.en_curso = prom.Gauge(
+            "lsc_requests_en_curso", "Requests HTTP en curso", multiprocess_mode="livesum"
+        )
+        self.frames = prom.Counter(
+            "lsc_frames_total",
+            "Frames de video por tipo (decodificados, usados, con_manos, omitidos, recortados)",
+            ["tipo"]
+        )
+        self.cache = prom.Counter(
+            "lsc_cache_total", "Consultas a las caches por resultado", ["cache", "resultado"]
+        )
+        self.rechazos = prom.Counter(
+            "lsc_rechazos_total", "Requests rechazadas con 429 por motivo (tasa, capacidad)",
+            ["motivo"]
+        )
+        self.videos_sin_manos = prom.Counter(
+            "lsc_videos_sin_manos_total", "Videos sin ninguna mano detectada"
+        )
+        self.pendientes = prom.Gauge(
+            "lsc_pendientes", "Trabajos admitidos sin terminar por ejecutor",
+            ["ejecutor"], multiprocess_mode="livesum"
+        )
+        self.en_cola = prom.Gauge(
+            "lsc_en_cola", "Trabajos esperando un worker libre por ejecutor",
+            ["ejecutor"], multiprocess_mode="livesum"
+        )
+        self.lote_en_espera = prom.Gauge(
+            "lsc_lote_en_espera", "Elementos esperando a formar lote por agrupador",
+            ["agrupador"], multiprocess_mode="livesum"
+        )
+
+    def observar(self, etapa: str, segundos: float):
+        """Registra la duración de una etapa (histograma + Server-Timing)"""
+        tiempos = _tiempos_request.get()
+        if tiempos is not None:
+            tiempos[etapa] = tiempos.get(etapa, 0.0) + segundos
+        if self.habilitado:
+            self.etapa.labels(etapa).observe(segundos)
+
+    @contextmanager
+    def cronometrar(self, etapa: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(etapa, time.perf_counter() - inicio)
+
+    def observar_extraccion(self, estadisticas: dict):
+        """Tiempos y conteos de frames de extraer_keypoints_video"""
+        self.observar("decodificacion", estadisticas.get("segundos_decodificacion", 0.0))
+        self.observar("mediapipe", estadisticas.get("segundos_mediapipe", 0.0))
+        if not self.habilitado:
+            return
+        self.frames.labels("decodificados").inc(estadisticas.get("frames_decodificados", 0))
+        self.frames.labels("usados").inc(estadisticas.get("frames_usados", 0))
+        self.frames.labels("con_manos").inc(estadisticas.get("frames_con_manos", 0))
+        self.frames.labels("omitidos").inc(estadisticas.get("frames_omitidos", 0))
+        self.frames.labels("recortados").inc(estadisticas.get("frames_recortados", 0))
+        if estadisticas.get("frames_usados") and not estadisticas.get("frames_con_manos"):
+            self.videos_sin_manos.inc()
+
+    def contar_rechazo(self, motivo: str):
+        if self.habilitado:
+            self.rechazos.labels(motivo).inc()
+
+    def contar_cache(self, cache: str, resultado: str):
+        if self.habilitado:
+            self.cache.labels(cache, resultado).inc()
+
+    def actualizar_colas(self, ejecutores: dict, agrupadores: dict):
+        """Profundidad de colas al momento del scrape"""
+        if not self.habilitado:
+            return
+        for nombre, ejecutor in ejecutores.items():
+            if ejecutor is not None:
+                self.pendientes.labels(nombre).set(ejecutor.pendientes)
+                self.en_cola.labels(nombre).set(ejecutor.en_cola)
+        for nombre, agrupador in agrupadores.items():
+            if agrupador is not None:
+                self.lote_en_espera.labels(nombre).set(agrupador.estado()["en_espera"])
+
+    def exportar(self) -> bytes:
+        """Texto de exposición de Prometheus (agrega procesos si hay PROMETHEUS_MULTIPROC_DIR)"""
+        prom = self._prom
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+
+            registry = prom.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return prom.generate_latest(registry)
+        return prom.generate_latest()
+
+    @property
+    def content_type(self) -> str:
+        return self._prom.CONTENT_TYPE_LATEST
+
+
+def _server_timing(tiempos: Dict[str, float], total: float) -> bytes:
+    partes = [f"{etapa};dur={segundos * 1000:.1f}" for etapa, segundos in tiempos.items()]
+    partes.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(partes).encode("latin-1")
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI: requests en curso, duración por endpoint y, con
+    server_timing=True, header Server-Timing con los tiempos por etapa
+    """
+
+    def __init__(self, app, metricas: Metricas, server_timing: bool = False):
+        self.app = app
+        self.metricas = metricas
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        tiempos: Dict[str, float] = {}
+        token = _tiempos_request.set(tiempos)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def send_medido(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+                if self.server_timing:
+                    total = time.perf_counter() - inicio
+                    mensaje = dict(mensaje)
+                    mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                        (b"server-timing", _server_timing(tiempos, total))
+                    ]
+            await send(mensaje)
+
+        if self.metricas.habilitado:
+            self.metricas.en_curso.inc()
+        try:
+            await self.app(scope, receive, send_medido)
+        finally:
+            _tiempos_request.reset(token)
+            if self.metricas.habilitado:
+                self.metricas.en_curso.dec()
+                # Plantilla de la ruta (no el path) para no multiplicar las series
+                ruta = scope.get("route")
+                endpoint = getattr(ruta, "path", "otro")
+                self.metricas.request.labels(endpoint, str(status)).observe(
+                    time.perf_counter() - inicio
+                )
+
+
+# Instancia global (la usan api.py y uploads.py)
+metricas = Metricas(settings.PROMETHEUS_ENABLED)
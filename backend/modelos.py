@@ -0,0 +1,156 @@
+"""
+Registro de componentes del modelo
+Carga los componentes en segundo plano y en paralelo, respetando dependencias,
+y reporta estado y tiempo de carga de cada uno
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+PENDIENTE = "pendiente"
+CARGANDO = "cargando"
+LISTO = "listo"
+ERROR = "error"
+
+
+class ComponenteNoListoError(Exception):
+    """Se pidió un componente que todavía no terminó de cargar (o falló)"""
+
+    def __init__(self, nombres: List[str]):
+        super().__init__(f"Modelos no cargados: {', '.join(nombres)}")
+        self.nombres = nombres
+
+
+class Componente:
+    """Un componente cargable (función sync o async) con su estado de carga"""
+
+    def __init__(self, nombre: str, cargar: Callable, depende_de: Iterable[str] = ()):
+        self.nombre = nombre
+        self.cargar = cargar
+        self.depende_de = list(depende_de)
+        self.estado = PENDIENTE
+        self.segundos: Optional[float] = None
+        self.error: Optional[str] = None
+        self.evento = asyncio.Event()
+
+    def resumen(self) -> dict:
+        return {
+            "estado": self.estado,
+            "segundos": round(self.segundos, 3) if self.segundos is not None else None,
+            "error": self.error,
+        }
+
+
+class RegistroModelos:
+    """
+    Componentes registrados con registrar(); iniciar() lanza su carga en
+    segundo plano. Las funciones sync corren en un pool de hilos propio para
+    que TensorFlow, torch y MediaPipe se importen y carguen en paralelo.
+    """
+
+    def __init__(self, max_hilos: int = 4):
+        self._componentes: Dict[str, Componente] = {}
+        self._max_hilos = max_hilos
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._tareas: List[asyncio.Task] = []
+        self.inicio: Optional[float] = None
+
+    def registrar(self, nombre: str, cargar: Callable, depende_de: Iterable[str] = ()):
+        self._componentes[nombre] = Componente(nombre, cargar, depende_de)
+
+    def listo(self, *nombres: str) -> bool:
+        return all(self._componentes[n].estado == LISTO for n in nombres)
+
+    def faltantes(self, *nombres: str) -> List[str]:
+        return [n for n in nombres if self._componentes[n].estado != LISTO]
+
+    def requerir(self, *nombres: str):
+        """Lanza ComponenteNoListoError si alguno de los componentes no está listo"""
+        faltantes = self.faltantes(*nombres)
+        if faltantes:
+            raise ComponenteNoListoError(faltantes)
+
+    def precargar(self, *nombres: str):
+        """
+        Carga sincrónica, sin event loop, de componentes sync (ej. en el master de
+        gunicorn antes del fork para compartir los pesos copy-on-write).
+        Si falla, el componente queda pendiente y lo carga cada worker.
+        """
+        for nombre in nombres:
+            componente = self._componentes[nombre]
+            inicio = time.perf_counter()
+            try:
+                componente.cargar()
+            except Exception as e:
+                print(f"⚠️  Precarga de {nombre} falló, se cargará en cada worker: {e}")
+                continue
+            componente.segundos = time.perf_counter() - inicio
+            componente.estado = LISTO
+            componente.evento.set()
+            print(f"   ✓ {nombre} precargado ({componente.segundos:.2f}s)")
+
+    def iniciar(self):
+        """Lanza la carga de los componentes pendientes (llamar con el event loop corriendo)"""
+        if self._tareas:
+            return
+        pendientes = [c for c in self._componentes.values() if c.estado != LISTO]
+        if not pendientes:
+            return
+        self.inicio = time.perf_counter()
+        self._pool = ThreadPoolExecutor(
+            max_workers=self._max_hilos, thread_name_prefix="carga-modelos"
+        )
+        loop = asyncio.get_running_loop()
+        self._tareas = [
+            loop.create_task(self._cargar(componente))
+            for componente in pendientes
+        ]
+
+    async def esperar(self, *nombres: str):
+        """Espera a que terminen (bien o mal) los componentes indicados o todos"""
+        nombres = nombres or tuple(self._componentes)
+        await asyncio.gather(*[self._componentes[n].evento.wait() for n in nombres])
+
+    async def _cargar(self, componente: Componente):
+        try:
+            if componente.depende_de:
+                await self.esperar(*componente.depende_de)
+            fallidas = self.faltantes(*componente.depende_de)
+            if fallidas:
+                raise RuntimeError(f"Dependencias no disponibles: {', '.join(fallidas)}")
+
+            componente.estado = CARGANDO
+            inicio = time.perf_counter()
+            if asyncio.iscoroutinefunction(componente.cargar):
+                await componente.cargar()
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._pool, componente.cargar)
+            componente.segundos = time.perf_counter() - inicio
+            componente.estado = LISTO
+            print(f"   ✓ {componente.nombre} listo ({componente.segundos:.2f}s)")
+
+        except Exception as e:
+            componente.estado = ERROR
+            componente.error = str(e)
+            print(f"❌ Error cargando {componente.nombre}: {e}")
+
+        finally:
+            componente.evento.set()
+            if all(c.evento.is_set() for c in self._componentes.values()):
+                self._pool.shutdown(wait=False)
+                total = time.perf_counter() - self.inicio
+                print(f"✅ Carga de modelos terminada en {total:.2f}s\n")
+
+    def estado(self) -> dict:
+        return {nombre: c.resumen() for nombre, c in self._componentes.items()}
+
+    async def detener(self):
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
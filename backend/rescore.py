@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Re-evalúa el almacén de keypoints (FEATURE_STORE_DIR) con otro clasificador
+Lee los shards con memory-map y clasifica en lotes grandes, sin decodificar
+ningún video. Compara contra la predicción guardada (modelo anterior) y, si
+hay etiquetas, mide la exactitud de ambos.
+
+Uso:
+    python rescore.py --almacen feature_store --modelo models/nuevo_modelo.h5
+    python rescore.py --almacen feature_store --modelo models/nuevo.onnx --salida rescore.jsonl
+    python rescore.py --almacen feature_store --modelo models/nuevo.h5 --etiqueta-carpeta
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from collections import Counter
+
+import numpy as np
+
+from backends import ClasificadorKeras, ClasificadorONNX, ClasificadorTFLite, cargar_modelo_keras
+from feature_store import iterar_lotes, leer_indice
+
+
+def cargar_clasificador(ruta: str, max_length: int, num_features: int):
+    """Backend según la extensión: .onnx, .tflite o modelo Keras (.h5)"""
+    if ruta.endswith(".onnx"):
+        return ClasificadorONNX(ruta, num_hilos=os.cpu_count() or 1)
+    if ruta.endswith(".tflite"):
+        with open(ruta, "rb") as f:
+            return ClasificadorTFLite(f.read(), num_hilos=os.cpu_count() or 1)
+    return ClasificadorKeras(cargar_modelo_keras(ruta), max_length, num_features)
+
+
+def etiqueta(entrada: dict, desde_carpeta: bool):
+    """Etiqueta real: metadato "etiqueta" o carpeta del archivo (dataset/hola/001.mp4 -> hola)"""
+    if entrada.get("etiqueta"):
+        return entrada["etiqueta"]
+    if desde_carpeta and entrada.get("archivo"):
+        carpeta = os.path.basename(os.path.dirname(entrada["archivo"]))
+        return carpeta or None
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-evaluar keypoints guardados con otro modelo")
+    parser.add_argument("--almacen", required=True, help="Directorio FEATURE_STORE_DIR")
+    parser.add_argument("--modelo", required=True, help="Clasificador nuevo (.h5, .onnx o .tflite)")
+    parser.add_argument("--labels", default="models/labels_dict.pkl",
+                        help="labels_dict.pkl del modelo nuevo")
+    parser.add_argument("--config", default="models/config.pkl", help="config.pkl del modelo nuevo")
+    parser.add_argument("--version", help="Solo keypoints de esta versión de extracción")
+    parser.add_argument("--lote", type=int, default=1024, help="Secuencias por forward pass")
+    parser.add_argument("--etiqueta-carpeta", action="store_true",
+                        help="Usar la carpeta de cada archivo como etiqueta real")
+    parser.add_argument("--salida", help="JSONL con la predicción nueva de cada secuencia")
+    args = parser.parse_args()
+
+    with open(args.labels, "rb") as f:
+        labels = pickle.load(f)
+    with open(args.config, "rb") as f:
+        config = pickle.load(f)
+
+    versiones = Counter(e["version"] for e in leer_indice(args.almacen, args.version))
+    total = sum(versiones.values())
+    if not total:
+        print(f"⚠️  No hay keypoints en {args.almacen}")
+        return
+    print(f"📂 {total} secuencias en {args.almacen}")
+    for version, cantidad in versiones.most_common():
+        print(f"   {version}: {cantidad}")
+
+    print(f"🔄 Cargando {args.modelo}...")
+    clasificador = cargar_clasificador(args.modelo, config["max_length"], config["num_features"])
+
+    salida = open(args.salida, "w", encoding="utf-8") if args.salida else None
+    procesadas = cambios = 0
+    aciertos_nuevo = aciertos_anterior = con_etiqueta = 0
+    segundos_modelo = 0.0
+    inicio = time.perf_counter()
+    try:
+        for entradas, keypoints in iterar_lotes(args.almacen, args.lote, args.version):
+            marca = time.perf_counter()
+            probabilidades = clasificador(keypoints)
+            segundos_modelo += time.perf_counter() - marca
+            clases = np.argmax(probabilidades, axis=1)
+            confianzas = np.max(probabilidades, axis=1)
+
+            for entrada, clase, confianza in zip(entradas, clases, confianzas):
+                palabra = labels[int(clase)]
+                cambios += palabra != entrada.get("palabra")
+                real = etiqueta(entrada, args.etiqueta_carpeta)
+                if real is not None:
+                    con_etiqueta += 1
+                    aciertos_nuevo += palabra == real
+                    aciertos_anterior += entrada.get("palabra") == real
+                if salida is not None:
+                    salida.write(json.dumps({
+                        "digest": entrada["digest"],
+                        "archivo": entrada.get("archivo"),
+                        "palabra_anterior": entrada.get("palabra"),
+                        "confianza_anterior": entrada.get("confianza"),
+                        "palabra": palabra,
+                        "confianza": float(confianza),
+                        "etiqueta": real,
+                    }, ensure_ascii=False) + "\n")
+
+            procesadas += len(entradas)
+            print(f"   {procesadas}/{total} secuencias", end="\r")
+    finally:
+        if salida is not None:
+            salida.close()
+
+    segundos = time.perf_counter() - inicio
+    print(f"\n✅ {procesadas} secuencias en {segundos:.1f}s "
+          f"({procesadas / segundos:.0f}/s, modelo {segundos_modelo:.1f}s)")
+    print(f"   Predicción distinta a la guardada: {cambios} ({cambios / procesadas:.1%})")
+    if con_etiqueta:
+        print(f"   Exactitud con etiqueta ({con_etiqueta}): "
+              f"anterior {aciertos_anterior / con_etiqueta:.1%} | nuevo {aciertos_nuevo / con_etiqueta:.1%}")
+    if args.salida:
+        print(f"💾 Resultados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
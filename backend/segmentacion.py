@@ -0,0 +1,197 @@
+"""
+Reconocimiento de frases en un solo video continuo
+Los keypoints de todos los frames se extraen en una sola pasada; las señas se
+separan por presencia de manos y energía de movimiento, y cada seña se
+remuestrea a una ventana de 30 frames. Todas las ventanas se clasifican juntas
+en un solo forward pass.
+
+No importa TensorFlow: segmentar_video se ejecuta en el pool de videos
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from config import settings
+from keypoints import (
+    MANOS_POR_FRAME, NUM_FEATURES, NUM_FRAMES, VALORES_POR_MANO,
+    calcular_indices_muestreo, extraer_keypoints_continuos
+)
+
+
+def presencia_manos(frames: np.ndarray) -> np.ndarray:
+    """(N, 2) bool: qué slots de mano tienen landmarks en cada frame"""
+    manos = frames.reshape(len(frames), MANOS_POR_FRAME, VALORES_POR_MANO)
+    return np.any(manos != 0, axis=2)
+
+
+def energia_movimiento(frames: np.ndarray, fps: float) -> np.ndarray:
+    """
+    Desplazamiento medio (x, y) de los landmarks por segundo entre frames consecutivos
+    Solo cuenta las manos presentes en ambos frames; el primer frame tiene energía 0
+    """
+    energia = np.zeros(len(frames), dtype=np.float32)
+    if len(frames) < 2:
+        return energia
+
+    manos = frames.reshape(len(frames), MANOS_POR_FRAME, -1, 3)[..., :2]
+    presentes = presencia_manos(frames)
+    ambas = presentes[1:] & presentes[:-1]
+    desplazamiento = np.abs(np.diff(manos, axis=0)).mean(axis=(2, 3))
+    cuenta = ambas.sum(axis=1)
+    suma = (desplazamiento * ambas).sum(axis=1)
+    energia[1:] = np.divide(suma, cuenta, out=np.zeros_like(suma), where=cuenta > 0) * fps
+    return energia
+
+
+def suavizar(valores: np.ndarray, ancho: int) -> np.ndarray:
+    """Media móvil centrada de ancho frames (sin desplazar los bordes)"""
+    if ancho <= 1 or len(valores) == 0:
+        return valores
+    nucleo = np.ones(ancho, dtype=np.float32) / ancho
+    extendidos = np.pad(valores, (ancho // 2, ancho - 1 - ancho // 2), mode="edge")
+    return np.convolve(extendidos, nucleo, "valid")
+
+
+def _tramos(activos: np.ndarray) -> List[Tuple[int, int]]:
+    """Tramos [inicio, fin) consecutivos de True"""
+    bordes = np.diff(np.concatenate(([0], activos.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(bordes == 1).tolist(), np.flatnonzero(bordes == -1).tolist()))
+
+
+def segmentar(
+    frames: np.ndarray,
+    fps: float,
+    umbral_movimiento: float,
+    pausa_min_s: float,
+    sena_min_s: float
+) -> List[Tuple[int, int]]:
+    """
+    Señas como tramos [inicio, fin) de frames con manos y en movimiento
+    Las pausas más cortas que pausa_min_s se unen y los tramos más cortos
+    que sena_min_s se descartan. Si nada supera el umbral pero hay manos,
+    el tramo con manos completo se toma como una sola seña
+    """
+    con_manos = presencia_manos(frames).any(axis=1)
+    energia = suavizar(energia_movimiento(frames, fps), max(1, round(0.3 * fps)))
+    tramos = _tramos(con_manos & (energia >= umbral_movimiento))
+
+    pausa_min = max(1, round(pausa_min_s * fps))
+    unidos: List[Tuple[int, int]] = []
+    for inicio, fin in tramos:
+        if unidos and inicio - unidos[-1][1] < pausa_min:
+            unidos[-1] = (unidos[-1][0], fin)
+        else:
+            unidos.append((inicio, fin))
+
+    sena_min = max(1, round(sena_min_s * fps))
+    segmentos = [(inicio, fin) for inicio, fin in unidos if fin - inicio >= sena_min]
+    if not segmentos and con_manos.any():
+        indices = np.flatnonzero(con_manos)
+        segmentos = [(int(indices[0]), int(indices[-1]) + 1)]
+    return segmentos
+
+
+def remuestrear(frames: np.ndarray) -> np.ndarray:
+    """
+    Tramo de frames a (30, 126) con el mismo muestreo uniforme que un video
+    de una sola seña (relleno con el último frame si tiene menos de 30)
+    """
+    ventana = frames[calcular_indices_muestreo(len(frames))]
+    if len(ventana) < NUM_FRAMES:
+        relleno = np.repeat(ventana[-1:], NUM_FRAMES - len(ventana), axis=0)
+        ventana = np.concatenate([ventana, relleno])
+    return ventana.astype(np.float32, copy=False)
+
+
+def ventanas_candidatas(
+    frames: np.ndarray,
+    segmentos: List[Tuple[int, int]],
+    fps: float,
+    sena_max_s: float,
+    paso_s: float
+) -> Tuple[np.ndarray, List[dict]]:
+    """
+    Una ventana por seña; las señas más largas que sena_max_s (varias señas sin
+    pausa) se recorren con ventanas deslizantes de sena_max_s cada paso_s
+    Retorna (ventanas (M, 30, 126), [{"segmento", "inicio_s", "fin_s"}])
+    """
+    largo_max = max(1, round(sena_max_s * fps))
+    paso = max(1, round(paso_s * fps))
+    ventanas = []
+    info = []
+    for numero, (inicio, fin) in enumerate(segmentos):
+        if fin - inicio <= largo_max:
+            cortes = [(inicio, fin)]
+        else:
+            cortes = [(i, i + largo_max) for i in range(inicio, fin - largo_max + 1, paso)]
+            if cortes[-1][1] < fin:
+                cortes.append((fin - largo_max, fin))
+        for desde, hasta in cortes:
+            ventanas.append(remuestrear(frames[desde:hasta]))
+            info.append({
+                "segmento": numero,
+                "inicio_s": round(desde / fps, 3),
+                "fin_s": round(hasta / fps, 3)
+            })
+
+    if not ventanas:
+        return np.zeros((0, NUM_FRAMES, NUM_FEATURES), dtype=np.float32), info
+    return np.stack(ventanas), info
+
+
+def segmentar_video(video_path: str) -> Tuple[np.ndarray, List[dict], dict]:
+    """
+    Extracción + segmentación de un video con varias señas (pool de videos)
+    Retorna (ventanas (M, 30, 126), info de cada ventana, estadísticas de
+    extracción con fps, duracion_s y segmentos)
+    """
+    estadisticas = {"frames_decodificados": 0}
+    frames, fps = extraer_keypoints_continuos(
+        video_path, settings.SENTENCE_FPS, settings.SENTENCE_MAX_SECONDS, estadisticas
+    )
+    segmentos = segmentar(
+        frames, fps,
+        settings.SENTENCE_MOTION_THRESHOLD,
+        settings.SENTENCE_MIN_PAUSE_SECONDS,
+        settings.SENTENCE_MIN_SIGN_SECONDS
+    )
+    ventanas, info = ventanas_candidatas(
+        frames, segmentos, fps,
+        settings.SENTENCE_MAX_SIGN_SECONDS,
+        settings.SENTENCE_WINDOW_STRIDE_SECONDS
+    )
+    estadisticas["fps"] = fps
+    estadisticas["duracion_s"] = round(len(frames) / fps, 3) if fps else 0.0
+    estadisticas["segmentos"] = len(segmentos)
+    return ventanas, info, estadisticas
+
+
+def unir_predicciones(info: List[dict], predicciones: List[tuple], umbral: float) -> List[dict]:
+    """
+    Detalle por seña a partir de las predicciones de cada ventana
+    Las ventanas solapadas de un mismo segmento con la misma palabra se unen
+    (queda la mayor confianza); segmentos distintos nunca se unen
+    """
+    detalles: List[dict] = []
+    for entrada, (palabra, confianza) in zip(info, predicciones):
+        anterior = detalles[-1] if detalles else None
+        if (
+            anterior is not None
+            and anterior["segmento"] == entrada["segmento"]
+            and anterior["palabra"] == palabra
+        ):
+            anterior["fin_s"] = entrada["fin_s"]
+            anterior["confianza"] = max(anterior["confianza"], float(confianza))
+            anterior["aceptada"] = anterior["confianza"] >= umbral
+            continue
+        detalles.append({
+            **entrada,
+            "palabra": palabra,
+            "confianza": float(confianza),
+            "aceptada": confianza >= umbral
+        })
+
+    for posicion, detalle in enumerate(detalles, start=1):
+        detalle["posicion"] = posicion
+    return detalles
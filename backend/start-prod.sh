@@ -18,10 +18,7 @@ python -c "import transformers; print(f'Transformers: {transformers.__version__}
 
 # Iniciar la aplicación
 echo "🎯 Iniciando servidor..."
-exec uvicorn api:app \
-    --host 0.0.0.0 \
-    --port 8002 \
-    --workers 1 \
-    --access-log \
-    --log-level info \
-    --no-server-header
+# gunicorn precarga T5 en el master y hace fork de API_WORKERS workers uvicorn
+exec gunicorn api:app \
+    -c gunicorn.conf.py \
+    --bind 0.0.0.0:8002
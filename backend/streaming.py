@@ -0,0 +1,81 @@
+"""
+Reconocimiento en tiempo real por WebSocket
+Cada conexión mantiene su propio tracker de MediaPipe y una ventana
+deslizante de los últimos 30 frames de keypoints
+"""
+
+from collections import deque
+
+import cv2
+import numpy as np
+
+from keypoints import (
+    NUM_FEATURES, NUM_FRAMES, convertir_a_rgb, crear_hands, escribir_keypoints_frame
+)
+
+
+class SesionStreaming:
+    """
+    Estado de una conexión de streaming
+    Los frames deben procesarse en orden y de a uno (el tracker es stateful)
+    """
+
+    def __init__(self, predecir_cada: int):
+        self.predecir_cada = max(1, predecir_cada)
+        self.ventana = deque(maxlen=NUM_FRAMES)
+        self.frames_recibidos = 0
+        self._desde_ultima = 0
+        self._hands = None
+
+    def procesar_jpeg(self, datos: bytes) -> np.ndarray:
+        """
+        Decodifica un frame JPEG/PNG, corre MediaPipe y agrega sus keypoints
+        a la ventana (se ejecuta en el pool de inferencia)
+        """
+        frame = cv2.imdecode(np.frombuffer(datos, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("No se pudo decodificar la imagen")
+
+        if self._hands is None:
+            self._hands = crear_hands()
+
+        results = self._hands.process(convertir_a_rgb(frame))
+
+        fila = np.zeros(NUM_FEATURES, dtype=np.float32)
+        escribir_keypoints_frame(results, fila)
+        self.agregar_keypoints(fila)
+        return fila
+
+    def agregar_keypoints(self, fila) -> np.ndarray:
+        """Agrega un vector de 126 keypoints ya extraído por el cliente"""
+        fila = np.asarray(fila, dtype=np.float32)
+        if fila.shape != (NUM_FEATURES,):
+            raise ValueError(f"Shape incorrecto: {fila.shape}, esperado ({NUM_FEATURES},)")
+        # JSON admite NaN/Infinity y un valor fuera de rango se vuelve inf en float32:
+        # la fila no entra a la ventana (ni al lote compartido del clasificador)
+        if not np.isfinite(fila).all():
+            raise ValueError("Los keypoints contienen NaN o infinitos")
+        self.ventana.append(fila)
+        self.frames_recibidos += 1
+        self._desde_ultima += 1
+        return fila
+
+    def lista_para_predecir(self) -> bool:
+        """True cuando la ventana está llena y pasaron predecir_cada frames"""
+        return len(self.ventana) == NUM_FRAMES and self._desde_ultima >= self.predecir_cada
+
+    def tomar_ventana(self) -> np.ndarray:
+        """Copia (30, 126) de la ventana actual y reinicia el contador de frames"""
+        self._desde_ultima = 0
+        return np.stack(self.ventana)
+
+    def reiniciar(self):
+        self.ventana.clear()
+        self._desde_ultima = 0
+        if self._hands is not None:
+            self._hands.reset()
+
+    def cerrar(self):
+        if self._hands is not None:
+            self._hands.close()
+            self._hands = None
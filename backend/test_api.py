@@ -4,12 +4,31 @@ Script de prueba para la API
 Verifica que todos los endpoints funcionen correctamente
 """
 
+import os
 import requests
 import sys
+import time
 from pathlib import Path
 
 
 API_URL = "http://localhost:8000"
+# Si la API exige API key (API_KEY en el .env) se envía la primera
+HEADERS = {"X-API-Key": os.getenv("API_KEY").split(",")[0]} if os.getenv("API_KEY") else {}
+
+
+def esperar_ready(timeout: int = 120) -> bool:
+    """Espera a que la API termine de cargar los modelos (GET /ready)"""
+    print("⏳ Esperando a que carguen los modelos...")
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            if requests.get(f"{API_URL}/ready", timeout=5).status_code == 200:
+                return True
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(1)
+    print(f"   ❌ La API no quedó lista en {timeout}s")
+    return False
 
 
 def test_health():
@@ -90,7 +109,7 @@ def test_predict(video_path=None):
     try:
         with open(video_file, 'rb') as f:
             files = {'file': (video_file.name, f, 'video/mp4')}
-            response = requests.post(f"{API_URL}/predict", files=files, timeout=30)
+            response = requests.post(f"{API_URL}/predict", files=files, headers=HEADERS, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
@@ -107,6 +126,31 @@ def test_predict(video_path=None):
         return False
 
 
+def test_predict_keypoints():
+    """Test del endpoint de keypoints (no requiere video)"""
+    print("\n🔍 Testing /predict-keypoints...")
+    try:
+        # 30 frames x 126 valores float32 en cero (sin manos detectadas)
+        payload = bytes(30 * 126 * 4)
+        response = requests.post(
+            f"{API_URL}/predict-keypoints",
+            data=payload,
+            headers={**HEADERS, "Content-Type": "application/octet-stream"},
+            timeout=10
+        )
+        if response.status_code == 200:
+            data = response.json()
+            print(f"   ✅ Palabra: {data.get('palabra')}")
+            print(f"   ✅ Confianza: {data.get('confianza', 0):.2%}")
+            return True
+        else:
+            print(f"   ❌ Error: Status code {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        return False
+
+
 def main():
     """Ejecuta todos los tests"""
     print("="*60)
@@ -115,9 +159,11 @@ def main():
     
     # Tests básicos
     results = []
+    esperar_ready()
     results.append(("Health Check", test_health()))
     results.append(("Root Endpoint", test_root()))
     results.append(("Palabras Disponibles", test_palabras_disponibles()))
+    results.append(("Predicción por Keypoints", test_predict_keypoints()))
     
     # Test de predicción (opcional)
     if len(sys.argv) > 1:
@@ -0,0 +1,28 @@
+"""
+Configuración común de los tests (correr desde backend/: python -m pytest)
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def crear_video(ruta: Path, frames: int = 60, ancho: int = 160, alto: int = 120, fps: int = 30) -> Path:
+    """Video sintético con un círculo que se mueve (sin manos, alcanza para decodificar)"""
+    escritor = cv2.VideoWriter(str(ruta), cv2.VideoWriter_fourcc(*"mp4v"), fps, (ancho, alto))
+    for i in range(frames):
+        frame = np.zeros((alto, ancho, 3), np.uint8)
+        cv2.circle(frame, ((i * 3) % ancho, alto // 2), 10, (255, 255, 255), -1)
+        escritor.write(frame)
+    escritor.release()
+    return ruta
+
+
+@pytest.fixture
+def video(tmp_path) -> Path:
+    return crear_video(tmp_path / "video.mp4")
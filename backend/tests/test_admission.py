@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from admission import ControlAdmision, LimiteExcedidoError, LimitadorClientes
+
+
+def test_limitador_costo_dentro_de_la_rafaga():
+    limitador = LimitadorClientes(por_minuto=60, rafaga=10)
+    limitador.consumir("a", 4)
+    limitador.consumir("a", 6)
+    with pytest.raises(LimiteExcedidoError) as error:
+        limitador.consumir("a", 1)
+    assert error.value.motivo == "tasa"
+    assert error.value.retry_after >= 1
+    assert limitador.rechazadas == 1
+
+
+def test_limitador_costo_mayor_que_la_rafaga_queda_en_deuda():
+    """Una request de 20 videos con ráfaga 5 pasa una vez y se paga completa"""
+    limitador = LimitadorClientes(por_minuto=60, rafaga=5)
+    limitador.consumir("a", 20)
+    with pytest.raises(LimiteExcedidoError) as error:
+        limitador.consumir("a", 1)
+    # 15 tokens de deuda más 1 de costo a 1 token por segundo
+    assert 15 <= error.value.retry_after <= 16
+    with pytest.raises(LimiteExcedidoError):
+        limitador.consumir("a", 20)
+
+
+def test_limitador_rechazo_no_descuenta():
+    limitador = LimitadorClientes(por_minuto=60, rafaga=5)
+    limitador.consumir("a", 3)
+    with pytest.raises(LimiteExcedidoError):
+        limitador.consumir("a", 5)
+    limitador.consumir("a", 2)
+
+
+def test_limitador_clientes_independientes_y_acotados():
+    limitador = LimitadorClientes(por_minuto=60, rafaga=2, max_clientes=2)
+    limitador.consumir("a", 2)
+    limitador.consumir("b", 2)
+    with pytest.raises(LimiteExcedidoError):
+        limitador.consumir("b", 1)
+    limitador.consumir("c", 1)
+    assert limitador.estado()["clientes"] == 2
+    # "a" fue el menos reciente: se olvidó y vuelve con la cubeta llena
+    limitador.consumir("a", 2)
+
+
+def test_admision_orden_de_llegada():
+    async def escenario():
+        control = ControlAdmision(max_unidades=2, max_espera_s=5, max_cola=10, retry_after=1)
+        orden = []
+
+        async def request(nombre, costo):
+            unidades = await control.adquirir(costo)
+            orden.append(nombre)
+            return unidades
+
+        ocupadas = await control.adquirir(1)
+        tareas = []
+        for nombre, costo in [("grande", 2), ("chica1", 1), ("chica2", 1)]:
+            tareas.append(asyncio.create_task(request(nombre, costo)))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        # Hay una unidad libre pero "chica1" no se adelanta a "grande"
+        assert orden == []
+        assert control.esperando == 3
+
+        control.liberar(ocupadas)
+        await asyncio.sleep(0.01)
+        assert orden == ["grande"]
+
+        control.liberar(await tareas[0])
+        await asyncio.gather(*tareas[1:])
+        assert orden == ["grande", "chica1", "chica2"]
+        assert control.en_uso == 2
+
+    asyncio.run(escenario())
+
+
+def test_admision_timeout_rechaza_y_no_deja_esperas():
+    async def escenario():
+        control = ControlAdmision(max_unidades=1, max_espera_s=0.05, max_cola=10, retry_after=3)
+        ocupada = await control.adquirir()
+        with pytest.raises(LimiteExcedidoError) as error:
+            await control.adquirir()
+        assert error.value.motivo == "capacidad"
+        assert error.value.retry_after == 3
+        assert control.esperando == 0
+        assert control.rechazadas == 1
+
+        control.liberar(ocupada)
+        assert control.en_uso == 0
+        assert await control.adquirir() == 1
+
+    asyncio.run(escenario())
+
+
+def test_admision_cola_llena_rechaza_sin_esperar():
+    async def escenario():
+        control = ControlAdmision(max_unidades=1, max_espera_s=5, max_cola=1, retry_after=1)
+        await control.adquirir()
+        en_espera = asyncio.create_task(control.adquirir())
+        await asyncio.sleep(0)
+        with pytest.raises(LimiteExcedidoError):
+            await asyncio.wait_for(control.adquirir(), 0.5)
+        en_espera.cancel()
+
+    asyncio.run(escenario())
+
+
+def test_admision_libera_con_error_y_cancelacion():
+    async def escenario():
+        control = ControlAdmision(max_unidades=2, max_espera_s=5, max_cola=10, retry_after=1)
+        with pytest.raises(RuntimeError):
+            async with control.admitir(2):
+                assert control.en_uso == 2
+                raise RuntimeError("falla del modelo")
+        assert control.en_uso == 0
+
+        ocupadas = await control.adquirir(2)
+        cancelada = asyncio.create_task(control.adquirir(1))
+        siguiente = asyncio.create_task(control.adquirir(1))
+        await asyncio.sleep(0.01)
+        cancelada.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelada
+
+        # La espera cancelada no retiene lugar ni bloquea a la siguiente
+        control.liberar(ocupadas)
+        assert await siguiente == 1
+        assert control.en_uso == 1
+        assert control.esperando == 0
+
+    asyncio.run(escenario())
+
+
+def test_admision_costo_mayor_que_el_tope_reserva_el_tope():
+    async def escenario():
+        control = ControlAdmision(max_unidades=4, max_espera_s=0, max_cola=10, retry_after=1)
+        unidades = await control.adquirir(20)
+        assert unidades == 4
+        assert control.intentar(1) == 0
+        control.liberar(unidades)
+        assert control.intentar(1) == 1
+
+    asyncio.run(escenario())
+
+
+def test_admision_sin_espera_cede_el_lugar():
+    async def escenario():
+        control = ControlAdmision(max_unidades=1, max_espera_s=5, max_cola=10, retry_after=1)
+        with control.admitir_sin_espera():
+            assert control.en_uso == 1
+            with pytest.raises(LimiteExcedidoError):
+                with control.admitir_sin_espera():
+                    pass
+        assert control.en_uso == 0
+
+        # Con una request esperando no toma la unidad libre
+        control.max_unidades = 2
+        ocupada = await control.adquirir()
+        en_espera = asyncio.create_task(control.adquirir(2))
+        await asyncio.sleep(0)
+        assert control.en_uso == 1
+        with pytest.raises(LimiteExcedidoError):
+            with control.admitir_sin_espera():
+                pass
+        control.liberar(ocupada)
+        assert await en_espera == 2
+        assert control.rechazadas == 2
+
+    asyncio.run(escenario())
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from batching import AgrupadorLotes
+from executor import crear_ejecutor_hilos
+
+
+@pytest.fixture
+def ejecutor():
+    ejecutor = crear_ejecutor_hilos(max_workers=2, max_cola=8, nombre="test")
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+def _ejecutar(agrupador, corrutina):
+    async def escenario():
+        try:
+            return await corrutina()
+        finally:
+            await agrupador.detener()
+
+    return asyncio.run(escenario())
+
+
+def test_agrupa_requests_concurrentes(ejecutor):
+    lotes = []
+
+    def procesar(elementos):
+        lotes.append(list(elementos))
+        return [e * 10 for e in elementos]
+
+    agrupador = AgrupadorLotes(procesar, ejecutor, max_lote=4, max_espera_ms=50)
+
+    async def escenario():
+        return await asyncio.gather(*(agrupador.enviar(i) for i in range(6)))
+
+    assert _ejecutar(agrupador, escenario) == [0, 10, 20, 30, 40, 50]
+    assert [len(lote) for lote in lotes] == [4, 2]
+    assert agrupador.estado()["lotes_procesados"] == 2
+
+
+def test_espera_maxima_con_un_solo_elemento(ejecutor):
+    agrupador = AgrupadorLotes(lambda elementos: elementos, ejecutor, max_lote=16, max_espera_ms=50)
+
+    async def escenario():
+        inicio = time.perf_counter()
+        resultado = await agrupador.enviar("a")
+        return resultado, time.perf_counter() - inicio
+
+    resultado, segundos = _ejecutar(agrupador, escenario)
+    assert resultado == "a"
+    # Espera a que lleguen más elementos, pero no más que max_espera_ms
+    assert 0.04 <= segundos < 0.5
+
+
+def test_lote_lleno_no_espera(ejecutor):
+    agrupador = AgrupadorLotes(lambda elementos: elementos, ejecutor, max_lote=2, max_espera_ms=5000)
+
+    async def escenario():
+        inicio = time.perf_counter()
+        await asyncio.gather(agrupador.enviar(1), agrupador.enviar(2))
+        return time.perf_counter() - inicio
+
+    assert _ejecutar(agrupador, escenario) < 1.0
+
+
+def test_error_se_propaga_a_todo_el_lote(ejecutor):
+    llamadas = []
+
+    def procesar(elementos):
+        llamadas.append(list(elementos))
+        if len(llamadas) == 1:
+            raise ValueError("modelo no disponible")
+        return [e + 1 for e in elementos]
+
+    agrupador = AgrupadorLotes(procesar, ejecutor, max_lote=4, max_espera_ms=20)
+
+    async def escenario():
+        resultados = await asyncio.gather(
+            *(agrupador.enviar(i) for i in range(3)), return_exceptions=True
+        )
+        # El bucle sigue vivo después del error
+        return resultados, await agrupador.enviar(10)
+
+    resultados, siguiente = _ejecutar(agrupador, escenario)
+    assert all(isinstance(r, ValueError) for r in resultados)
+    assert siguiente == 11
+    assert agrupador.lotes_procesados == 1
+
+
+def test_descarta_requests_canceladas(ejecutor):
+    lotes = []
+
+    def procesar(elementos):
+        lotes.append(list(elementos))
+        return elementos
+
+    agrupador = AgrupadorLotes(procesar, ejecutor, max_lote=4, max_espera_ms=50)
+
+    async def escenario():
+        cancelada = asyncio.create_task(agrupador.enviar("cancelada"))
+        activa = asyncio.create_task(agrupador.enviar("activa"))
+        await asyncio.sleep(0.01)
+        cancelada.cancel()
+        return await activa
+
+    assert _ejecutar(agrupador, escenario) == "activa"
+    assert lotes == [["activa"]]
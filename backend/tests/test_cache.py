@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import numpy as np
+
+from cache import CacheLRU, CacheResultados
+
+
+class RedisMemoria:
+    """Lo mínimo de redis.asyncio que usa CacheResultados, en un dict"""
+
+    def __init__(self, falla: bool = False):
+        self.datos = {}
+        self.falla = falla
+
+    async def mget(self, *claves):
+        if self.falla:
+            raise ConnectionError("redis caído")
+        return [self.datos.get(clave) for clave in claves]
+
+    def pipeline(self):
+        return _PipelineMemoria(self)
+
+
+class _PipelineMemoria:
+    def __init__(self, redis):
+        self.redis = redis
+        self.pendientes = []
+
+    def set(self, clave, valor, ex=None):
+        self.pendientes.append((clave, valor))
+
+    async def execute(self):
+        if self.redis.falla:
+            raise ConnectionError("redis caído")
+        self.redis.datos.update(self.pendientes)
+
+
+def test_lru_descarta_el_menos_usado():
+    cache = CacheLRU(max_items=2)
+    cache.guardar(("hola", "mundo"), "Hola mundo.")
+    cache.guardar(("yo", "comer"), "Yo como.")
+    assert cache.obtener(("hola", "mundo")) == "Hola mundo."
+    cache.guardar(("casa",), "Casa.")
+
+    assert cache.obtener(("yo", "comer")) is None
+    assert cache.obtener(("hola", "mundo")) == "Hola mundo."
+    assert cache.obtener(("casa",)) == "Casa."
+    assert cache.estado()["hits"] == 3
+    assert cache.estado()["misses"] == 1
+
+
+def test_lru_expira_por_ttl():
+    cache = CacheLRU(max_items=10, ttl_segundos=0.05)
+    cache.guardar("frase", "Hola.")
+    assert cache.obtener("frase") == "Hola."
+    time.sleep(0.08)
+    assert cache.obtener("frase") is None
+    assert len(cache) == 0
+
+
+def test_lru_desactivada():
+    cache = CacheLRU(max_items=0)
+    cache.guardar("frase", "Hola.")
+    assert cache.obtener("frase") is None
+    assert len(cache) == 0
+
+
+def _keypoints():
+    return np.random.default_rng(0).random((30, 126), dtype=np.float32)
+
+
+def test_resultados_prediccion_depende_de_la_version_del_modelo():
+    redis = RedisMemoria()
+    keypoints = _keypoints()
+
+    async def escenario():
+        v1 = CacheResultados(10, 0, "ext1", "modelo1", redis)
+        assert await v1.obtener("abc") == (None, None)
+        await v1.guardar("abc", keypoints, ("hola", 0.9))
+        kp, prediccion = await v1.obtener("abc")
+        assert prediccion == ("hola", 0.9)
+        np.testing.assert_array_equal(kp, keypoints)
+
+        # Otro proceso con un modelo nuevo reutiliza los keypoints desde Redis
+        v2 = CacheResultados(10, 0, "ext1", "modelo2", redis)
+        kp, prediccion = await v2.obtener("abc")
+        assert prediccion is None
+        np.testing.assert_array_equal(kp, keypoints)
+        assert v2.estado()["hits_keypoints"] == 1
+        assert v2.redis_hits == 1
+
+        # Con otra extracción no sirve nada
+        v3 = CacheResultados(10, 0, "ext2", "modelo1", redis)
+        assert await v3.obtener("abc") == (None, None)
+
+    asyncio.run(escenario())
+
+
+def test_resultados_prediccion_desde_redis():
+    redis = RedisMemoria()
+
+    async def escenario():
+        await CacheResultados(10, 0, "ext", "modelo", redis).guardar(
+            "abc", _keypoints(), ("gracias", 0.75)
+        )
+        otro = CacheResultados(10, 0, "ext", "modelo", redis)
+        _, prediccion = await otro.obtener("abc")
+        assert prediccion == ("gracias", 0.75)
+        assert otro.estado()["hits"] == 1
+
+    asyncio.run(escenario())
+
+
+def test_resultados_redis_caido_usa_la_cache_local():
+    redis = RedisMemoria(falla=True)
+
+    async def escenario():
+        cache = CacheResultados(10, 0, "ext", "modelo", redis)
+        await cache.guardar("abc", _keypoints(), ("hola", 0.9))
+        assert await cache.obtener("xyz") == (None, None)
+        _, prediccion = await cache.obtener("abc")
+        assert prediccion == ("hola", 0.9)
+        assert cache.estado()["redis_errores"] == 2
+
+    asyncio.run(escenario())
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import ColaSaturadaError, crear_ejecutor_hilos
+
+
+@pytest.fixture
+def ejecutor():
+    ejecutor = crear_ejecutor_hilos(max_workers=1, max_cola=1, nombre="test", retry_after=3)
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+def test_satura_y_libera(ejecutor):
+    liberar = threading.Event()
+
+    async def escenario():
+        tareas = [asyncio.create_task(ejecutor.ejecutar(liberar.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert ejecutor.pendientes == 2
+        with pytest.raises(ColaSaturadaError) as error:
+            await ejecutor.ejecutar(lambda: None)
+        assert error.value.retry_after == 3
+
+        liberar.set()
+        await asyncio.gather(*tareas)
+        await asyncio.sleep(0)
+        assert ejecutor.pendientes == 0
+
+    asyncio.run(escenario())
+
+
+def test_cancelar_la_espera_no_libera_el_worker_ocupado(ejecutor):
+    """El trabajo cancelado sigue contando mientras el hilo lo ejecuta"""
+    liberar = threading.Event()
+
+    async def escenario():
+        en_curso = asyncio.create_task(ejecutor.ejecutar(liberar.wait))
+        en_cola = asyncio.create_task(ejecutor.ejecutar(lambda: "cola"))
+        await asyncio.sleep(0.01)
+        en_curso.cancel()
+        en_cola.cancel()
+        await asyncio.gather(en_curso, en_cola, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+        # El que esperaba en la cola se canceló sin empezar; el otro sigue corriendo
+        assert ejecutor.pendientes == 1
+        liberar.set()
+        for _ in range(100):
+            if ejecutor.pendientes == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert ejecutor.pendientes == 0
+
+    asyncio.run(escenario())
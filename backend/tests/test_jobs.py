@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from jobs import CANCELADO, EN_COLA, PROCESANDO, AlmacenTrabajos
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenTrabajos(str(tmp_path / "trabajos.db"))
+    yield almacen
+    almacen.cerrar()
+
+
+def _crear(almacen, trabajo_id, videos=3):
+    almacen.crear(
+        trabajo_id, "upload", 0.7,
+        [(f"v{i}.mp4", f"/tmp/v{i}.mp4") for i in range(1, videos + 1)]
+    )
+
+
+def test_tomar_siguiente_en_orden_y_una_sola_vez(almacen):
+    _crear(almacen, "a")
+    time.sleep(0.01)
+    _crear(almacen, "b")
+    assert almacen.tomar_siguiente("worker-1") == "a"
+    assert almacen.tomar_siguiente("worker-2") == "b"
+    assert almacen.tomar_siguiente("worker-3") is None
+    assert almacen.obtener("a")["propietario"] == "worker-1"
+
+
+def test_recupera_trabajo_sin_latido(almacen):
+    _crear(almacen, "a")
+    assert almacen.tomar_siguiente("worker-1") == "a"
+    assert almacen.recuperar_huerfanos(60) == 0
+
+    time.sleep(0.01)
+    assert almacen.recuperar_huerfanos(0) == 1
+    trabajo = almacen.obtener("a")
+    assert trabajo["estado"] == EN_COLA
+    assert trabajo["propietario"] is None
+    # Otro worker lo retoma
+    assert almacen.tomar_siguiente("worker-2") == "a"
+    assert almacen.obtener("a")["estado"] == PROCESANDO
+
+
+def test_latido_evita_la_recuperacion(almacen):
+    _crear(almacen, "a")
+    almacen.tomar_siguiente("worker-1")
+    time.sleep(0.2)
+    assert almacen.latir("a") == PROCESANDO
+    assert almacen.recuperar_huerfanos(0.1) == 0
+    assert almacen.obtener("a")["propietario"] == "worker-1"
+
+
+def test_recuperado_conserva_los_resultados_ya_guardados(almacen):
+    _crear(almacen, "a", videos=3)
+    almacen.tomar_siguiente("worker-1")
+    almacen.guardar_resultados("a", [(1, "hola", 0.9, None), (2, None, None, "video ilegible")])
+
+    time.sleep(0.01)
+    almacen.recuperar_huerfanos(0)
+    almacen.tomar_siguiente("worker-2")
+    assert almacen.videos_pendientes("a") == [(3, "v3.mp4", "/tmp/v3.mp4")]
+    trabajo = almacen.obtener("a")
+    assert trabajo["procesados"] == 2
+    assert trabajo["errores"] == 1
+    # El inicio es el de la primera vez que se tomó
+    assert trabajo["iniciado"] < trabajo["latido"]
+
+
+def test_no_recupera_trabajos_cancelados_ni_en_cola(almacen):
+    _crear(almacen, "a")
+    _crear(almacen, "b")
+    almacen.tomar_siguiente("worker-1")
+    assert almacen.cancelar("a") == PROCESANDO
+    time.sleep(0.01)
+    assert almacen.recuperar_huerfanos(0) == 0
+    assert almacen.obtener("a")["estado"] == CANCELADO
+    assert almacen.obtener("b")["estado"] == EN_COLA
+
+
+def test_cancelar_informa_el_estado_anterior(almacen):
+    _crear(almacen, "a")
+    _crear(almacen, "b")
+    assert almacen.cancelar("a") == EN_COLA
+    # Ya cancelado no se puede tomar ni volver a cancelar
+    assert almacen.tomar_siguiente("worker-1") == "b"
+    assert almacen.cancelar("a") is None
+    assert almacen.cancelar("b") == PROCESANDO
+    assert almacen.cancelar("no-existe") is None
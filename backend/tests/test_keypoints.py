@@ -0,0 +1,59 @@
+import pytest
+
+import keypoints
+from config import settings
+
+
+def _recorrer_con_pool(crear_frames, tamano_cola: int):
+    """Recorre canalizar() y retorna (frames entregados, pool usado)"""
+    pools = []
+
+    def crear(buferes):
+        pools.append(buferes)
+        return crear_frames(buferes)
+
+    frames = sum(1 for frame in keypoints.canalizar(crear, tamano_cola) if frame is not None)
+    return frames, pools[0]
+
+
+DECODIFICADORES = [
+    pytest.param(keypoints._frames_continuos_opencv, id="opencv"),
+    pytest.param(keypoints._frames_continuos_pyav, id="pyav"),
+]
+
+
+@pytest.mark.parametrize("tamano_cola", [0, 4])
+@pytest.mark.parametrize("iterador", DECODIFICADORES)
+def test_pool_acotado_continuos(video, iterador, tamano_cola):
+    if iterador is keypoints._frames_continuos_pyav:
+        pytest.importorskip("av")
+    frames, pool = _recorrer_con_pool(
+        lambda buferes: iterador(str(video), 1, 0, None, buferes), tamano_cola
+    )
+    assert frames == 60
+    # Solo vuelven al pool los frames que salieron de él
+    assert pool.libres <= tamano_cola + 2
+    assert pool.creados <= tamano_cola + 2
+
+
+@pytest.mark.parametrize("backend", ["opencv", "pyav"])
+def test_pool_acotado_muestreados(video, monkeypatch, backend):
+    if backend == "pyav":
+        pytest.importorskip("av")
+    monkeypatch.setattr(settings, "DECODE_BACKEND", backend)
+    iterador = keypoints._frames_pyav if backend == "pyav" else keypoints._frames_uniformes
+    frames, pool = _recorrer_con_pool(
+        lambda buferes: iterador(str(video), None, None, buferes), 0
+    )
+    assert frames >= keypoints.NUM_FRAMES
+    assert pool.libres <= 2
+
+
+def test_devolver_ignora_frames_ajenos():
+    pool = keypoints.BuferesFrames()
+    propio = pool.tomar(4, 4)
+    pool.devolver(keypoints.np.zeros((4, 4, 3), keypoints.np.uint8))
+    assert pool.libres == 0
+    pool.devolver(propio)
+    assert pool.libres == 1
+    assert pool.tomar(4, 4) is propio
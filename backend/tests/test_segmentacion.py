@@ -0,0 +1,101 @@
+import numpy as np
+
+from keypoints import MANOS_POR_FRAME, NUM_FEATURES, NUM_FRAMES, VALORES_POR_MANO
+from segmentacion import segmentar, unir_predicciones, ventanas_candidatas
+
+FPS = 15.0
+
+
+def _frames(tramos, total):
+    """
+    Keypoints sintéticos: sin manos fuera de los tramos; en cada tramo
+    (inicio, fin, se_mueve) la primera mano está presente y se desplaza o no
+    """
+    frames = np.zeros((total, NUM_FEATURES), dtype=np.float32)
+    manos = frames.reshape(total, MANOS_POR_FRAME, VALORES_POR_MANO)
+    for inicio, fin, se_mueve in tramos:
+        for i in range(inicio, fin):
+            manos[i, 0, :] = 0.5 + (0.02 * i if se_mueve else 0.0)
+    return frames
+
+
+def _segmentar(frames, pausa_min_s=0.3, sena_min_s=0.4):
+    return segmentar(frames, FPS, 0.08, pausa_min_s, sena_min_s)
+
+
+def test_sin_manos_no_hay_senas():
+    assert _segmentar(np.zeros((60, NUM_FEATURES), dtype=np.float32)) == []
+
+
+def test_separa_senas_por_pausa_sin_movimiento():
+    frames = _frames([(15, 45, True), (45, 60, False), (60, 90, True)], 105)
+    segmentos = _segmentar(frames)
+    assert len(segmentos) == 2
+    (inicio1, fin1), (inicio2, fin2) = segmentos
+    assert abs(inicio1 - 15) <= 3 and abs(fin1 - 45) <= 3
+    assert abs(inicio2 - 60) <= 3 and abs(fin2 - 90) <= 3
+
+
+def test_separa_senas_por_manos_ausentes():
+    frames = _frames([(10, 40, True), (50, 80, True)], 90)
+    assert len(_segmentar(frames)) == 2
+
+
+def test_une_pausas_cortas():
+    frames = _frames([(15, 45, True), (45, 60, False), (60, 90, True)], 105)
+    segmentos = _segmentar(frames, pausa_min_s=2.0)
+    assert len(segmentos) == 1
+    inicio, fin = segmentos[0]
+    assert inicio <= 18 and fin >= 87
+
+
+def test_descarta_tramos_cortos():
+    frames = _frames([(10, 40, True), (60, 63, True)], 90)
+    segmentos = _segmentar(frames)
+    assert len(segmentos) == 1
+    assert segmentos[0][1] <= 45
+
+
+def test_manos_quietas_son_una_sola_sena():
+    """Sin movimiento sobre el umbral se toma todo el tramo con manos"""
+    frames = _frames([(20, 50, False)], 70)
+    assert _segmentar(frames) == [(20, 50)]
+
+
+def test_ventanas_deslizantes_en_senas_largas():
+    frames = _frames([(0, 100, True)], 100)
+    ventanas, info = ventanas_candidatas(frames, [(0, 10), (20, 100)], FPS, 2.0, 0.5)
+    assert ventanas.shape == (len(info), NUM_FRAMES, NUM_FEATURES)
+    assert ventanas.dtype == np.float32
+
+    assert info[0] == {"segmento": 0, "inicio_s": 0.0, "fin_s": round(10 / FPS, 3)}
+    largas = [i for i in info if i["segmento"] == 1]
+    assert len(largas) > 1
+    # Ventanas de 2 s (30 frames) que cubren el segmento hasta el final
+    assert largas[0]["inicio_s"] == round(20 / FPS, 3)
+    assert largas[-1]["fin_s"] == round(100 / FPS, 3)
+    assert all(abs(i["fin_s"] - i["inicio_s"] - 2.0) < 1e-6 for i in largas)
+
+
+def test_sin_segmentos_no_hay_ventanas():
+    ventanas, info = ventanas_candidatas(np.zeros((10, NUM_FEATURES)), [], FPS, 2.0, 0.5)
+    assert ventanas.shape == (0, NUM_FRAMES, NUM_FEATURES)
+    assert info == []
+
+
+def test_unir_predicciones_por_segmento():
+    info = [
+        {"segmento": 0, "inicio_s": 0.0, "fin_s": 2.0},
+        {"segmento": 0, "inicio_s": 0.5, "fin_s": 2.5},
+        {"segmento": 0, "inicio_s": 1.0, "fin_s": 3.0},
+        {"segmento": 1, "inicio_s": 4.0, "fin_s": 5.0},
+    ]
+    predicciones = [("hola", 0.6), ("hola", 0.8), ("gracias", 0.9), ("gracias", 0.5)]
+    detalles = unir_predicciones(info, predicciones, umbral=0.7)
+
+    assert [(d["posicion"], d["palabra"], d["segmento"]) for d in detalles] == [
+        (1, "hola", 0), (2, "gracias", 0), (3, "gracias", 1)
+    ]
+    assert detalles[0]["fin_s"] == 2.5
+    assert detalles[0]["confianza"] == 0.8 and detalles[0]["aceptada"]
+    assert not detalles[2]["aceptada"]
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from keypoints import NUM_FEATURES, NUM_FRAMES
+from streaming import SesionStreaming
+
+
+@pytest.mark.parametrize("valor", [float("nan"), float("inf"), 1e39])
+def test_rechaza_keypoints_no_finitos(valor):
+    sesion = SesionStreaming(predecir_cada=1)
+    fila = [0.0] * NUM_FEATURES
+    fila[5] = valor
+    with pytest.raises(ValueError, match="NaN o infinitos"):
+        sesion.agregar_keypoints(fila)
+    assert sesion.frames_recibidos == 0
+    assert len(sesion.ventana) == 0
+
+
+def test_ventana_deslizante():
+    sesion = SesionStreaming(predecir_cada=5)
+    for i in range(NUM_FRAMES):
+        sesion.agregar_keypoints(np.full(NUM_FEATURES, i, dtype=np.float32))
+    assert sesion.lista_para_predecir()
+    ventana = sesion.tomar_ventana()
+    assert ventana.shape == (NUM_FRAMES, NUM_FEATURES)
+    assert not sesion.lista_para_predecir()
+
+    with pytest.raises(ValueError, match="Shape incorrecto"):
+        sesion.agregar_keypoints([0.0] * 10)
@@ -0,0 +1,130 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from uploads import (
+    LimiteTamanoMiddleware, UploadDemasiadoGrandeError, UploadInvalidoError, recibir_archivos
+)
+
+MAX_ARCHIVO = 1024
+MAX_BODY = 8 * 1024
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    return tmp_path / "uploads"
+
+
+@pytest.fixture
+def cliente(directorio):
+    """App mínima que recibe videos como los endpoints de api.py"""
+    directorio.mkdir()
+    app = FastAPI()
+    app.add_middleware(LimiteTamanoMiddleware, max_bytes=MAX_BODY)
+    app.state.llamadas = 0
+
+    @app.post("/subir")
+    async def subir(request: Request):
+        app.state.llamadas += 1
+        try:
+            archivos = await recibir_archivos(
+                request, "files", MAX_ARCHIVO, str(directorio), (".mp4", ".mov"), max_archivos=3
+            )
+        except UploadDemasiadoGrandeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UploadInvalidoError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return [
+            {
+                "nombre": a.nombre,
+                "digest": a.digest,
+                "tamano": a.tamano,
+                "contenido": Path(a.ruta).read_text(),
+            }
+            for a in archivos
+        ]
+
+    return TestClient(app)
+
+
+def _archivos(*contenidos, extension=".mp4"):
+    return [
+        ("files", (f"v{i}{extension}", contenido, "video/mp4"))
+        for i, contenido in enumerate(contenidos)
+    ]
+
+
+def test_escribe_cada_archivo_con_su_digest(cliente, directorio):
+    respuesta = cliente.post(
+        "/subir", files=_archivos(b"a" * 100, b"b" * MAX_ARCHIVO), data={"umbral": "0.5"}
+    )
+    assert respuesta.status_code == 200
+    archivos = respuesta.json()
+    assert [a["nombre"] for a in archivos] == ["v0.mp4", "v1.mp4"]
+    assert [a["tamano"] for a in archivos] == [100, MAX_ARCHIVO]
+    assert archivos[0]["digest"] == hashlib.sha256(b"a" * 100).hexdigest()
+    assert archivos[1]["contenido"] == "b" * MAX_ARCHIVO
+    assert len(list(directorio.iterdir())) == 2
+
+
+def test_archivo_mayor_al_limite_da_413_y_no_deja_temporales(cliente, directorio):
+    respuesta = cliente.post("/subir", files=_archivos(b"a" * 10, b"b" * (MAX_ARCHIVO + 1)))
+    assert respuesta.status_code == 413
+    assert list(directorio.iterdir()) == []
+
+
+@pytest.mark.parametrize("archivos, mensaje", [
+    (_archivos(b"a", extension=".txt"), "Formato no soportado"),
+    (_archivos(b"a", b"b", b"c", b"d"), "Máximo 3 archivos"),
+])
+def test_archivos_rechazados_dan_400_y_no_dejan_temporales(cliente, directorio, archivos, mensaje):
+    respuesta = cliente.post("/subir", files=archivos)
+    assert respuesta.status_code == 400
+    assert mensaje in respuesta.json()["detail"]
+    assert list(directorio.iterdir()) == []
+
+
+def test_body_que_no_es_multipart_da_400(cliente):
+    respuesta = cliente.post("/subir", json={"files": []})
+    assert respuesta.status_code == 400
+
+
+def test_body_multipart_incompleto_da_400(cliente, directorio):
+    body = (
+        b"--limite\r\n"
+        b'Content-Disposition: form-data; name="files"; filename="v.mp4"\r\n'
+        b"Content-Type: video/mp4\r\n\r\n"
+        b"datos sin cierre"
+    )
+    respuesta = cliente.post(
+        "/subir", content=body, headers={"Content-Type": "multipart/form-data; boundary=limite"}
+    )
+    assert respuesta.status_code == 400
+    assert list(directorio.iterdir()) == []
+
+
+def test_middleware_rechaza_por_content_length_sin_leer_el_body(cliente):
+    respuesta = cliente.post("/subir", files=_archivos(b"a" * (MAX_BODY + 1)))
+    assert respuesta.status_code == 413
+    assert cliente.app.state.llamadas == 0
+
+
+def test_middleware_rechaza_body_chunked_excedido(cliente, directorio):
+    def trozos():
+        yield (
+            b"--limite\r\n"
+            b'Content-Disposition: form-data; name="otro"; filename="v.mp4"\r\n\r\n'
+        )
+        for _ in range(MAX_BODY // 512 + 2):
+            yield b"x" * 512
+
+    # Sin Content-Length; la parte no es del campo pedido, así que solo la corta el middleware
+    respuesta = cliente.post(
+        "/subir", content=trozos(), headers={"Content-Type": "multipart/form-data; boundary=limite"}
+    )
+    assert respuesta.status_code == 413
+    assert cliente.app.state.llamadas == 1
+    assert list(directorio.iterdir()) == []
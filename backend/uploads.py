@@ -0,0 +1,291 @@
+"""
+Subida de videos por streaming
+Lee el body multipart a medida que llega y escribe cada archivo una sola vez,
+directo en su destino, calculando el hash mientras escribe. Corta la subida
+apenas un archivo supera el límite, sin cargarlo entero en memoria ni en disco
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from metrics import metricas
+
+
+class UploadDemasiadoGrandeError(Exception):
+    """El archivo (o el body completo) supera el tamaño máximo permitido"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Archivo demasiado grande (máximo {max_bytes // (1024 * 1024)} MB)")
+        self.max_bytes = max_bytes
+
+
+class UploadInvalidoError(ValueError):
+    """Body que no es multipart, mal formado o con un archivo de formato no soportado"""
+
+
+class ArchivoSubido:
+    """Un archivo del body ya escrito en disco"""
+
+    def __init__(self, nombre: str, ruta: str, digest: str, tamano: int):
+        self.nombre = nombre
+        self.ruta = ruta
+        self.digest = digest
+        self.tamano = tamano
+
+
+class _ReceptorMultipart:
+    """
+    Callbacks de python-multipart: cada parte con filename del campo pedido se
+    escribe en un archivo temporal propio; el resto de las partes se descarta
+    """
+
+    def __init__(
+        self,
+        campo: str,
+        max_bytes: int,
+        directorio: Optional[str],
+        extensiones: Optional[Sequence[str]],
+        max_archivos: int
+    ):
+        self.campo = campo
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self.extensiones = extensiones
+        self.max_archivos = max_archivos
+        self.archivos: List[ArchivoSubido] = []
+        self.segundos_escritura = 0.0
+        self._rutas: List[str] = []
+        self._encabezados: Dict[bytes, bytes] = {}
+        self._campo_actual = b""
+        self._valor_actual = b""
+        self._destino = None
+        self._hasher = None
+        self._nombre = ""
+        self._tamano = 0
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._encabezados = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._campo_actual += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._valor_actual += data[start:end]
+
+    def on_header_end(self):
+        self._encabezados[self._campo_actual.lower()] = self._valor_actual
+        self._campo_actual = b""
+        self._valor_actual = b""
+
+    def on_headers_finished(self):
+        _, opciones = parse_options_header(self._encabezados.get(b"content-disposition", b""))
+        nombre_campo = opciones.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" not in opciones or nombre_campo != self.campo:
+            return
+
+        self._nombre = opciones[b"filename"].decode("utf-8", "replace")
+        extension = os.path.splitext(self._nombre)[1].lower()
+        if self.extensiones is not None and extension not in self.extensiones:
+            raise UploadInvalidoError(
+                f"Formato no soportado: {self._nombre}. Use: {', '.join(self.extensiones)}"
+            )
+        if len(self.archivos) >= self.max_archivos:
+            raise UploadInvalidoError(f"Máximo {self.max_archivos} archivos por request")
+
+        fd, ruta = tempfile.mkstemp(suffix=extension, dir=self.directorio)
+        self._rutas.append(ruta)
+        self._destino = os.fdopen(fd, "wb")
+        self._hasher = hashlib.sha256()
+        self._tamano = 0
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._destino is None:
+            return
+        self._tamano += end - start
+        if self._tamano > self.max_bytes:
+            raise UploadDemasiadoGrandeError(self.max_bytes)
+        bloque = data[start:end]
+        self._hasher.update(bloque)
+        inicio = time.perf_counter()
+        self._destino.write(bloque)
+        self.segundos_escritura += time.perf_counter() - inicio
+
+    def on_part_end(self):
+        if self._destino is None:
+            return
+        self._destino.close()
+        self._destino = None
+        self.archivos.append(
+            ArchivoSubido(self._nombre, self._rutas[-1], self._hasher.hexdigest(), self._tamano)
+        )
+
+    @property
+    def abierto(self) -> bool:
+        """Quedó un archivo a medio escribir (el body terminó antes que la parte)"""
+        return self._destino is not None
+
+    def descartar(self):
+        """Cierra y borra todo lo escrito (subida rechazada o cortada)"""
+        if self._destino is not None:
+            self._destino.close()
+            self._destino = None
+        for ruta in self._rutas:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+
+
+def es_multipart(request: Request) -> bool:
+    return request.headers.get("content-type", "").startswith("multipart/form-data")
+
+
+async def recibir_archivos(
+    request: Request,
+    campo: str,
+    max_bytes: int,
+    directorio: Optional[str] = None,
+    extensiones: Optional[Sequence[str]] = None,
+    max_archivos: int = 1000
+) -> List[ArchivoSubido]:
+    """
+    Lee el body multipart por streaming y escribe cada archivo del campo pedido
+    directo en directorio (sin la copia intermedia de UploadFile), con su sha256
+    
+    Lanza UploadDemasiadoGrandeError apenas un archivo supera max_bytes y
+    UploadInvalidoError si el body no es multipart, está mal formado o un archivo
+    no tiene una de las extensiones; en ambos casos borra lo ya escrito
+    """
+    if not es_multipart(request):
+        raise UploadInvalidoError("Se esperaba un body multipart/form-data")
+    _, parametros = parse_options_header(request.headers["content-type"])
+    if b"boundary" not in parametros:
+        raise UploadInvalidoError("Falta el boundary del multipart")
+
+    inicio_upload = time.perf_counter()
+    receptor = _ReceptorMultipart(campo, max_bytes, directorio, extensiones, max_archivos)
+    parser = MultipartParser(parametros[b"boundary"], receptor.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+        if receptor.abierto:
+            raise UploadInvalidoError("Body multipart incompleto")
+    except MultipartParseError as e:
+        receptor.descartar()
+        raise UploadInvalidoError(f"Body multipart mal formado: {e}")
+    except BaseException:
+        receptor.descartar()
+        raise
+
+    metricas.observar("escritura_temporal", receptor.segundos_escritura)
+    metricas.observar("upload", time.perf_counter() - inicio_upload)
+    return receptor.archivos
+
+
+def esquema_multipart(campo: str, varios: bool = False, requerido: bool = True) -> dict:
+    """openapi_extra para documentar en /docs un endpoint que lee el multipart él mismo"""
+    archivo = {"type": "string", "format": "binary"}
+    return {
+        "requestBody": {
+            "required": requerido,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            campo: {"type": "array", "items": archivo} if varios else archivo
+                        },
+                        "required": [campo] if requerido else [],
+                    }
+                }
+            },
+        }
+    }
+
+
+class _BodyExcedido(HTTPException):
+    """HTTPException para que FastAPI la propague como 413 si salta al parsear el form"""
+
+    def __init__(self, max_bytes: int):
+        mb = max_bytes // (1024 * 1024)
+        super().__init__(status_code=413, detail=f"Request demasiado grande (máximo {mb} MB)")
+
+
+class LimiteTamanoMiddleware:
+    """
+    Middleware ASGI que rechaza con 413 los bodies mayores a max_bytes:
+    de inmediato si Content-Length lo declara, o en cuanto se reciben
+    más bytes de los permitidos (subidas chunked), antes de que el parser
+    multipart termine de escribir el archivo
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > self.max_bytes:
+                await self._rechazar(send)
+                return
+
+        recibidos = 0
+        respuesta_iniciada = False
+
+        async def receive_limitado():
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > self.max_bytes:
+                    raise _BodyExcedido(self.max_bytes)
+            return mensaje
+
+        async def send_registrado(mensaje):
+            nonlocal respuesta_iniciada
+            if mensaje["type"] == "http.response.start":
+                respuesta_iniciada = True
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive_limitado, send_registrado)
+        except _BodyExcedido:
+            if not respuesta_iniciada:
+                await self._rechazar(send)
+
+    async def _rechazar(self, send):
+        body = json.dumps({"detail": _BodyExcedido(self.max_bytes).detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})